@@ -0,0 +1,93 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the run time of the slicing engines, e.g.:
+
+    python benchmark.py model.stl --layer-height 0.1 --repeat 3 --processes 4
+"""
+
+import argparse
+import time
+
+import model
+import slicer
+
+
+def slicer_config(args, engine):
+    cfg = slicer.SlicerConfig()
+    cfg.first_layer_height = args.first_layer_height
+    cfg.layer_height = args.layer_height
+    cfg.processes = args.processes
+    cfg.slicing_engine = engine
+
+    return cfg
+
+
+def contour_signature(contours):
+    """
+    :param contours: List of slicer.Contour as returned by slicer.Slicer.slice_contours()
+    :return: Points of the intersections of each contour of each layer, used to check that all engines agree
+    """
+    return [[loop.tolist() for loop in contour] for contour in contours]
+
+
+def benchmark(filename, args):
+    m = model.Model.from_file(filename)
+    print(f"{filename}: {m.facet_count} facets")
+
+    signatures = {}
+
+    for engine in slicer.SlicingEngine:
+        cfg = slicer_config(args, engine)
+        executor = slicer.create_executor(cfg) if cfg.processes > 1 else None
+        times = []
+
+        for _ in range(args.repeat):
+            s = slicer.Slicer(cfg, m)
+
+            # Only intersecting and assembling the contours is timed, creating the
+            # layers from the contours does not depend on the engine
+            start = time.perf_counter()
+            contours = s.slice_contours(executor)
+            times.append(time.perf_counter() - start)
+
+        if executor is not None:
+            executor.shutdown()
+
+        signatures[engine] = contour_signature(contours)
+        print(f"  {engine.name:<12} {s.layer_count:>6} layers  best {min(times):8.3f}s  "
+              f"mean {sum(times) / len(times):8.3f}s")
+
+    first, *others = signatures.values()
+    if any(signature != first for signature in others):
+        print("  WARNING: engines created different contours")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the slicing engines")
+    parser.add_argument("filenames", nargs="+", metavar="STL", help="STL files to slice")
+    parser.add_argument("--first-layer-height", type=float, default=0.2)
+    parser.add_argument("--layer-height", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each engine")
+    parser.add_argument("--processes", type=int, default=1, help="Number of processes slicing z bands")
+    args = parser.parse_args()
+
+    for filename in args.filenames:
+        benchmark(filename, args)
+
+
+if __name__ == "__main__":
+    main()
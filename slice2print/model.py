@@ -14,12 +14,40 @@
 # along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
 
 import collections
+import concurrent.futures
 import enum
-import functools
+import mmap
+import os
+import re
 import struct
 
 import numpy.linalg
 
+STL_BINARY_HEADER_SIZE = 80 + 4  # Header size + size of facet count field
+
+# Layout of one facet in a binary STL file
+STL_BINARY_FACET = numpy.dtype([("normal", "<f4", (3,)),
+                                ("vertices", "<f4", (3, 3)),
+                                ("attribute", "<u2")])
+
+STL_ASCII_CHUNK_SIZE = 32 * 1024 * 1024  # ASCII files are parsed in chunks of whole facets of about this size
+WELD_PARTITION_SIZE = 1024 * 1024  # Vertices are welded in partitions of about this number of vertices
+
+# Tokens of one facet in an ASCII STL file, None marks a number
+STL_ASCII_FACET_TOKENS = (b"facet", b"normal", None, None, None,
+                          b"outer", b"loop",
+                          b"vertex", None, None, None,
+                          b"vertex", None, None, None,
+                          b"vertex", None, None, None,
+                          b"endloop",
+                          b"endfacet")
+STL_ASCII_NUMBER_COLUMNS = [i for i, token in enumerate(STL_ASCII_FACET_TOKENS) if token is None]
+STL_ASCII_TOKEN = re.compile(rb"\S")
+
+# VERTEX_NORMAL merges vertices with equal position and normal, as needed for rendering
+# POSITION merges vertices with equal position only, which is sufficient for slicing
+WeldMode = enum.Enum("WeldMode", "VERTEX_NORMAL POSITION")
+
 
 class Model:
     def __init__(self, vertices, normals, indices, bounding_box, facet_count):
@@ -35,6 +63,9 @@ class Model:
         self.indices = indices
         self.bounding_box = bounding_box
         self.facet_count = facet_count
+        # Data derived from the model, e.g. by the slicer. A model is never changed after
+        # it has been created, so the data is reused as long as the model is.
+        self.cache = {}
 
     @property
     def dimensions(self):
@@ -48,8 +79,16 @@ class Model:
                                  self.bounding_box.z_max-self.bounding_box.z_min))
 
     @classmethod
-    def from_file(cls, filename):
-        return cls(*StlFileParser(filename).parse())
+    def from_file(cls, filename, use_mmap=False, weld_mode=WeldMode.VERTEX_NORMAL, weld_tolerance=None, processes=1):
+        """
+        :param filename: Path to STL file
+        :param use_mmap: Map binary STL files into memory instead of reading them
+        :param weld_mode: Instance of WeldMode
+        :param weld_tolerance: Vertices closer than this are merged, see weld_vertices()
+        :param processes: Number of processes for parsing large ASCII files
+        :return: Instance of Model
+        """
+        return cls(*StlFileParser(filename, use_mmap, weld_mode, weld_tolerance, processes).parse())
 
 
 class BoundingBox:
@@ -73,44 +112,41 @@ class BoundingBox:
                               numpy.array([self.x_max, self.y_max, self.z_max]))
 
 
-StlParserState = enum.Enum("StlParserState",
-                           "START SOLID FACET_NORMAL OUTER_LOOP VERTEX1 VERTEX2 VERTEX3 ENDLOOP ENDFACET ENDSOLID")
-
-
 class StlParserError(RuntimeError):
     def __init__(self, filename, line_no, msg):
         RuntimeError.__init__(self, "File '%s', line %s: %s" % (filename, line_no, msg))
 
-
-class StlFileParser:
-    def __init__(self, filename):
         self.filename = filename
-        self.line_no = 1
-        self.parser_state = StlParserState.START
+        self.line_no = line_no
+        self.msg = msg
 
-        self.normal = None
-        self.vertex1 = None
-        self.vertex2 = None
-        self.vertex3 = None
+    def __reduce__(self):
+        # Needed to pass the exception from a worker process
+        return StlParserError, (self.filename, self.line_no, self.msg)
 
-        self.x_min = self.y_min = self.z_min = float("inf")
-        self.x_max = self.y_max = self.z_max = float("-inf")
-        self.bb = BoundingBox()
 
-        self.index = 0
-        self.index_mapping = dict()  # key: (vertex, normal), value: index
-
-        self.indices = []
-        self.vertices = []
-        self.normals = []
-
-        self.facet_count = 0
+class StlFileParser:
+    def __init__(self, filename, use_mmap=False, weld_mode=WeldMode.VERTEX_NORMAL, weld_tolerance=None,
+                 processes=1):
+        """
+        :param filename: Path to STL file
+        :param use_mmap: Map binary STL files into memory instead of reading them, so the content
+                         of the file is not copied into memory as a whole
+        :param weld_mode: Instance of WeldMode
+        :param weld_tolerance: Vertices closer than this are merged, see weld_vertices()
+        :param processes: Number of processes for parsing ASCII files which are larger than STL_ASCII_CHUNK_SIZE
+        """
+        self.filename = filename
+        self.use_mmap = use_mmap
+        self.weld_mode = weld_mode
+        self.weld_tolerance = weld_tolerance
+        self.processes = processes
+        self.bb = BoundingBox()
 
     def parse(self):
         """
         :return: Tuple (vertices, normals, indices, bounding box, facet count)
-        :raises AssertionError: Thrown when something mismatches the STL ASCII format
-        :raises ValueError: Thrown when vertices or normals cannot be parsed
+        :raises StlParserError: Thrown when something mismatches the STL ASCII format
         :raises struct.error: Thrown when parsing of binary STL fails
         """
         with open(self.filename, "rb") as f:
@@ -121,188 +157,404 @@ class StlFileParser:
 
             if ln1.startswith(b"solid") and ln2.startswith(b"facet"):
                 return self._parse_ascii(f)
+            elif self.use_mmap and os.fstat(f.fileno()).st_size > STL_BINARY_HEADER_SIZE:
+                return self._parse_binary_mmap(f)
             else:
                 return self._parse_binary(f)
 
-    def _add_vertex(self, vertex, normal):
-        t = (vertex, normal)
+    def _parse_binary(self, f):
+        """
+        :param f: File handle
+        :return: Tuple (vertices, normals, indices, bounding box, facet count)
+        :raises struct.error: Thrown when parsing fails
+        """
+        f.seek(STL_BINARY_HEADER_SIZE)
+        data = f.read()
+
+        if len(data) % STL_BINARY_FACET.itemsize:
+            raise struct.error("unpack requires a buffer of %d bytes" % STL_BINARY_FACET.itemsize)
 
-        if t in self.index_mapping:
-            self.indices.append(self.index_mapping[t])
-        else:
-            self.vertices.append(vertex)
-            self.normals.append(normal)
-            self.indices.append(self.index)
-
-            self.index_mapping[t] = self.index
-            self.index += 1
-
-        # This is faster than using min()/max()
-        if vertex[0] < self.x_min:
-            self.x_min = vertex[0]
-        if vertex[0] > self.x_max:
-            self.x_max = vertex[0]
-        if vertex[1] < self.y_min:
-            self.y_min = vertex[1]
-        if vertex[1] > self.y_max:
-            self.y_max = vertex[1]
-        if vertex[2] < self.z_min:
-            self.z_min = vertex[2]
-        if vertex[2] > self.z_max:
-            self.z_max = vertex[2]
+        facets = numpy.frombuffer(data, STL_BINARY_FACET)
 
-    def _parse_binary(self, f):
+        return self._create_mesh(facets["normal"], facets["vertices"])
+
+    def _parse_binary_mmap(self, f):
         """
+        Same as _parse_binary() but the facets are a view on the memory mapped file,
+        so the raw triangle block is never copied into memory as a whole
+
         :param f: File handle
         :return: Tuple (vertices, normals, indices, bounding box, facet count)
         :raises struct.error: Thrown when parsing fails
         """
-        facet_structure = struct.Struct("<12fH")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if (len(m) - STL_BINARY_HEADER_SIZE) % STL_BINARY_FACET.itemsize:
+                raise struct.error("unpack requires a buffer of %d bytes" % STL_BINARY_FACET.itemsize)
+
+            facets = self.map_facets(m)
+            result = self._create_mesh(facets["normal"], facets["vertices"])
+
+            # The mapping can only be closed if no view on it exists anymore
+            del facets
+
+        return result
+
+    @staticmethod
+    def map_facets(buffer):
+        """
+        :param buffer: Content of a binary STL file, e.g. an instance of mmap.mmap
+        :return: numpy.array() with dtype STL_BINARY_FACET which is a view on the buffer
+        """
+        count = (len(buffer) - STL_BINARY_HEADER_SIZE) // STL_BINARY_FACET.itemsize
 
-        f.seek(80 + 4)  # Header size + size of facet count field
+        return numpy.frombuffer(buffer, STL_BINARY_FACET, count, STL_BINARY_HEADER_SIZE)
 
-        for facet in iter(functools.partial(f.read, facet_structure.size), b''):
-            result = facet_structure.unpack(facet)
+    def _create_mesh(self, facet_normals, facet_vertices):
+        """
+        Creates the indexed mesh from the facets of a STL file in one go
 
-            normal = result[0:3]
-            vertex1 = result[3:6]
-            vertex2 = result[6:9]
-            vertex3 = result[9:12]
+        :param facet_normals: numpy.array() of shape (facet count, 3)
+        :param facet_vertices: numpy.array() of shape (facet count, 3, 3)
+        :return: Tuple (vertices, normals, indices, bounding box, facet count)
+        """
+        facet_count = len(facet_vertices)
+        facet_normals = numpy.array(facet_normals, numpy.float32)
 
-            if normal == (0.0, 0.0, 0.0):
-                normal = self._calc_normal(vertex1, vertex2, vertex3)
+        missing = numpy.all(facet_normals == 0.0, axis=1)
+        if numpy.any(missing):
+            # Calculated normals are welded with double precision, normals read from the file are float32 values
+            facet_normals = facet_normals.astype(numpy.float64)
+            facet_normals[missing] = self._calc_normals(facet_vertices[missing])
 
-            self._add_vertex(vertex1, normal)
-            self._add_vertex(vertex2, normal)
-            self._add_vertex(vertex3, normal)
+        if facet_count:
+            v_min = facet_vertices.min(axis=(0, 1)).tolist()
+            v_max = facet_vertices.max(axis=(0, 1)).tolist()
+            self.bb.set_boundaries(v_min[0], v_max[0], v_min[1], v_max[1], v_min[2], v_max[2])
 
-            self.facet_count += 1
+        def rows_of(i):
+            # Rows are only created for the corners welded at once, not for all corners of all facets
+            facet, corner = numpy.divmod(i, 3)
+            return _rows(facet_vertices[facet, corner], facet_normals[facet])
 
-        self.bb.set_boundaries(self.x_min, self.x_max, self.y_min, self.y_max, self.z_min, self.z_max)
+        vertices, normals, indices = _weld(facet_count * 3, rows_of, self.weld_mode, self.weld_tolerance)
 
-        return \
-            numpy.array(self.vertices, numpy.float32), \
-            numpy.array(self.normals, numpy.float32), \
-            numpy.array(self.indices, numpy.uint32), \
-            self.bb, self.facet_count
+        return vertices, normals, indices, self.bb, facet_count
 
     def _parse_ascii(self, f):
         """
+        Parses the facets in chunks, each chunk is tokenized at once and its structure
+        is checked by the count and the positions of the keywords. The chunks are parsed
+        in parallel if more than one process is configured.
+
+        :param f: File handle
         :return: Tuple (vertices, normals, indices, bounding box, facet count)
-        :raises AssertionError: Thrown when something mismatches the STL ASCII format
-        :raises ValueError: Thrown when vertices or normals cannot be parsed
-        """
-        states = {StlParserState.START: self._do_start,
-                  StlParserState.SOLID: self._do_solid,
-                  StlParserState.ENDFACET: self._do_solid,
-                  StlParserState.FACET_NORMAL: self._do_facet_normal,
-                  StlParserState.OUTER_LOOP: self._do_outer_loop,
-                  StlParserState.VERTEX1: self._do_vertex1,
-                  StlParserState.VERTEX2: self._do_vertex2,
-                  StlParserState.VERTEX3: self._do_vertex3,
-                  StlParserState.ENDLOOP: self._do_endloop}
-
-        for line in f:
-            ln = line.decode("ascii").strip()
-
-            if not states[self.parser_state](ln):
-                break
+        :raises StlParserError: Thrown when something mismatches the STL ASCII format
+        """
+        data = f.read()
+        chunks = []
+
+        line_no, counted = 1, 0
+        for start, end in self._split_solids(data):
+            line_no += data.count(b"\n", counted, start)
 
-            self.line_no += 1
+            for chunk_start, chunk_end in self._split_facets(data, start, end):
+                chunks.append((chunk_start, chunk_end, line_no))
+                line_no += data.count(b"\n", chunk_start, chunk_end)
 
-        self.bb.set_boundaries(self.x_min, self.x_max, self.y_min, self.y_max, self.z_min, self.z_max)
+            counted = end
 
-        return \
-            numpy.array(self.vertices, numpy.float32), \
-            numpy.array(self.normals, numpy.float32), \
-            numpy.array(self.indices, numpy.uint32), \
-            self.bb, self.facet_count
+        if self.processes > 1 and len(chunks) > 1:
+            # Workers read their chunk from the file, so only the parsed facets have to be transferred
+            with concurrent.futures.ProcessPoolExecutor(min(self.processes, len(chunks))) as executor:
+                results = list(executor.map(self._parse_ascii_file_chunk,
+                                            [self.filename] * len(chunks), *zip(*chunks)))
+        else:
+            results = [self._parse_ascii_chunk(self.filename, data[chunk_start:chunk_end], line_no)
+                       for chunk_start, chunk_end, line_no in chunks]
+
+        facet_normals, facet_vertices = zip(*results)
 
-    def _do_start(self, line):
-        assert line.startswith("solid"), "Expected keyword 'solid'"
-        self.parser_state = StlParserState.SOLID
+        return self._create_mesh(numpy.concatenate(facet_normals), numpy.concatenate(facet_vertices))
 
-        return True
+    def _split_solids(self, data):
+        """
+        Yields tuples (start, end) of the facets of each solid in data. CAD programs often
+        export assemblies as several consecutive solids, their facets are merged.
+        Data following the last solid is ignored.
 
-    def _do_solid(self, line):
-        assert line.startswith("facet normal") or line.startswith("endsolid"), "Expected keyword 'facet normal'"
+        :param data: Content of the file
+        :raises StlParserError: Thrown when something mismatches the STL ASCII format
+        """
+        position = 0
+        solid_count = 0
+
+        while True:
+            match = STL_ASCII_TOKEN.search(data, position)
+            if match is None:
+                break
+
+            position = match.start()
+            # Anything after the last solid is ignored
+            if not data.startswith(b"solid", position):
+                break
 
-        if line.startswith("facet normal"):
-            self.parser_state = StlParserState.FACET_NORMAL
+            # Skip line with keyword 'solid'
+            start = data.find(b"\n", position) + 1 or len(data)
+            end_solid = data.find(b"endsolid", start)
+            end_solid = len(data) if end_solid < 0 else end_solid
 
-            data = line.split(" ")[2:]
-            assert len(data) == 3, "Normal requires 3 elements"
-            self.normal = float(data[0]), float(data[1]), float(data[2])
+            end = data.rfind(b"endfacet", start, end_solid)
+            end = start if end < 0 else end + len(b"endfacet")
 
-            return True
+            # Only line with keyword 'endsolid' is allowed after last facet
+            if data[end:end_solid].strip() or end == start and solid_count == 0:
+                raise StlParserError(self.filename,
+                                     *self._find_error(data[end:end_solid], data.count(b"\n", 0, end) + 1))
 
-        if line.startswith("endsolid"):
-            return False
+            if end > start:
+                yield start, end
 
-    def _do_facet_normal(self, line):
-        assert line == "outer loop", "Expected keyword 'outer loop'"
-        self.parser_state = StlParserState.OUTER_LOOP
+            solid_count += 1
+            position = data.find(b"\n", end_solid) + 1 or len(data)
 
-        return True
+    @staticmethod
+    def _split_facets(data, start, end, chunk_size=STL_ASCII_CHUNK_SIZE):
+        """
+        Yields tuples (start, end) of chunks in data which contain whole facets only
 
-    def _do_outer_loop(self, line):
-        assert line.startswith("vertex"), "Expected keyword 'vertex'"
+        :param data: Content of the file
+        :param start: Position of first facet
+        :param end: Position behind last facet
+        :param chunk_size: Approximate size of a chunk
+        """
+        while start < end:
+            chunk_end = data.find(b"endfacet", start + chunk_size, end)
+            chunk_end = end if chunk_end < 0 else chunk_end + len(b"endfacet")
 
-        self.parser_state = StlParserState.VERTEX1
-        self.vertex1 = self._parse_vertex(line)
+            yield start, chunk_end
 
-        return True
+            start = chunk_end
 
     @staticmethod
-    def _parse_vertex(line):
-        data = line.split(" ")[1:]
-        assert len(data) == 3, "Vertex requires 3 elements"
-        return float(data[0]), float(data[1]), float(data[2])
+    def _parse_ascii_file_chunk(filename, start, end, line_no):
+        """
+        Same as _parse_ascii_chunk() but reads the chunk from the file, used by worker processes
+
+        :param filename: Path to STL file
+        :param start: Position of chunk in file
+        :param end: Position behind chunk in file
+        :param line_no: Line number of first line in chunk
+        :return: Tuple (normals, vertices) as numpy.arrays() of shape (n, 3) and (n, 3, 3)
+        :raises StlParserError: Thrown when something mismatches the STL ASCII format
+        """
+        with open(filename, "rb") as f:
+            f.seek(start)
+            chunk = f.read(end - start)
 
-    def _do_vertex1(self, line):
-        assert line.startswith("vertex"), "Expected keyword 'vertex'"
+        return StlFileParser._parse_ascii_chunk(filename, chunk, line_no)
 
-        self.parser_state = StlParserState.VERTEX2
-        self.vertex2 = self._parse_vertex(line)
+    @staticmethod
+    def _parse_ascii_chunk(filename, chunk, line_no):
+        """
+        :param filename: Name of the file, needed for error messages
+        :param chunk: Part of the file which contains whole facets only
+        :param line_no: Line number of first line in chunk
+        :return: Tuple (normals, vertices) as numpy.arrays() of shape (n, 3) and (n, 3, 3)
+        :raises StlParserError: Thrown when something mismatches the STL ASCII format
+        """
+        tokens = chunk.split()
+
+        if len(tokens) % len(STL_ASCII_FACET_TOKENS):
+            raise StlParserError(filename, *StlFileParser._find_error(chunk, line_no))
 
-        return True
+        facet_count = len(tokens) // len(STL_ASCII_FACET_TOKENS)
 
-    def _do_vertex2(self, line):
-        assert line.startswith("vertex"), "Expected keyword 'vertex'"
+        for column, keyword in enumerate(STL_ASCII_FACET_TOKENS):
+            if keyword is not None and tokens[column::len(STL_ASCII_FACET_TOKENS)].count(keyword) != facet_count:
+                raise StlParserError(filename, *StlFileParser._find_error(chunk, line_no))
 
-        self.parser_state = StlParserState.VERTEX3
-        self.vertex3 = self._parse_vertex(line)
+        # An array of objects avoids copying the tokens into fixed size strings
+        tokens = numpy.reshape(numpy.array(tokens, object), (-1, len(STL_ASCII_FACET_TOKENS)))
 
-        return True
+        try:
+            # Converting to float first gives the same result as parsing the numbers with float()
+            values = tokens[:, STL_ASCII_NUMBER_COLUMNS].astype(numpy.float64).astype(numpy.float32)
+        except ValueError:
+            raise StlParserError(filename, *StlFileParser._find_error(chunk, line_no))
 
-    def _do_vertex3(self, line):
-        assert line == "endloop", "Expected keyword 'endloop'"
+        return values[:, :3], numpy.reshape(values[:, 3:], (-1, 3, 3))
 
-        self.parser_state = StlParserState.ENDLOOP
+    @staticmethod
+    def _find_error(chunk, line_no):
+        """
+        Walks token by token through the facets of a chunk to find the location of an error.
+        This is slow and only done after an error was detected.
 
-        if self.normal == (0.0, 0.0, 0.0):
-            self.normal = self._calc_normal(self.vertex1, self.vertex2, self.vertex3)
+        :param chunk: Part of the file which starts with a facet
+        :param line_no: Line number of first line in chunk
+        :return: Tuple (line number, message)
+        """
+        i = 0
+        keyword, keyword_line_no = None, line_no
 
-        self._add_vertex(self.vertex1, self.normal)
-        self._add_vertex(self.vertex2, self.normal)
-        self._add_vertex(self.vertex3, self.normal)
+        for line_no, line in enumerate(chunk.split(b"\n"), line_no):
+            for token in line.split():
+                expected = STL_ASCII_FACET_TOKENS[i % len(STL_ASCII_FACET_TOKENS)]
 
-        self.facet_count += 1
+                if expected is None:
+                    try:
+                        float(token)
+                    except ValueError:
+                        return keyword_line_no, "Expected number after keyword '%s'" % keyword.decode()
+                elif token != expected:
+                    return line_no, "Expected keyword '%s'" % expected.decode()
+                else:
+                    keyword, keyword_line_no = token, line_no
 
-        return True
+                i += 1
 
-    def _do_endloop(self, line):
-        assert line == "endfacet", "Expected keyword 'endfacet'"
-        self.parser_state = StlParserState.ENDFACET
+        if i % len(STL_ASCII_FACET_TOKENS):
+            return line_no, "Unexpected end of file"
 
-        return True
+        return line_no, "Malformed facet"
 
-    def _calc_normal(self, vertex1, vertex2, vertex3):
-        v1 = numpy.array(vertex1)
-        v2 = numpy.array(vertex2)
-        v3 = numpy.array(vertex3)
-        n = numpy.cross(v2-v1, v3-v1)
+    @staticmethod
+    def _calc_normals(facet_vertices):
+        """
+        :param facet_vertices: numpy.array() of shape (n, 3, 3)
+        :return: numpy.array() of shape (n, 3) containing the normalized normals of the facets
+        """
+        v = numpy.asarray(facet_vertices, numpy.float64)
+        n = numpy.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
 
         with numpy.errstate(invalid='ignore', divide='ignore'):
-            return tuple(n / numpy.linalg.norm(n))
+            return n / numpy.linalg.norm(n, axis=1)[:, numpy.newaxis]
+
+
+def weld_vertices(vertices, normals, mode=WeldMode.VERTEX_NORMAL, tolerance=None):
+    """
+    Merges duplicate vertices by sorting them, the merged vertices keep the order of their first occurrence
+
+    :param vertices: numpy.array() of shape (n, 3), e.g. one vertex for each corner of each facet
+    :param normals: numpy.array() of shape (n, 3)
+    :param mode: Instance of WeldMode, with WeldMode.POSITION the normal of the first occurrence is kept
+    :param tolerance: If given, positions are snapped to a grid of this size before they are compared
+    :return: Tuple (vertices, normals, indices)
+    """
+    return _weld(len(vertices), lambda i: _rows(vertices[i], normals[i]), mode, tolerance)
+
+
+def _rows(vertices, normals):
+    """
+    :return: numpy.array() of shape (n, 6) with dtype numpy.float32 or numpy.float64 if the normals are float64
+             values, each row is a vertex followed by its normal
+    """
+    rows = numpy.empty((len(vertices), 6), numpy.result_type(numpy.float32, normals.dtype))
+    rows[:, :3] = vertices
+    rows[:, 3:] = normals
+
+    return rows
+
+
+def _weld(count, rows_of, mode, tolerance):
+    """
+    Vertices are split by a hash of their key into partitions of about WELD_PARTITION_SIZE vertices.
+    Equal vertices end up in the same partition, so each partition is welded on its own and only the
+    memory for sorting one partition is needed at a time.
+
+    :param count: Number of vertices
+    :param rows_of: Function returning the rows of the vertices with the given indices, see _rows()
+    :param mode: Instance of WeldMode
+    :param tolerance: Grid size for snapping positions or None
+    :return: Tuple (vertices, normals, indices)
+    """
+    partition_count = max(1, -(-count // WELD_PARTITION_SIZE))
+
+    if partition_count > 1:
+        partitions = numpy.empty(count, numpy.min_scalar_type(partition_count))
+
+        for start in range(0, count, WELD_PARTITION_SIZE):
+            keys = _weld_keys(rows_of(numpy.arange(start, min(start + WELD_PARTITION_SIZE, count))), mode, tolerance)
+            partitions[start:start + len(keys)] = _hash_keys(keys) % partition_count
+
+    # Pages of the array are only allocated when it is filled with the first occurrences of distinct vertices
+    first_occurrences = numpy.empty(count, numpy.uint32)
+    indices = numpy.empty(count, numpy.uint32)
+    distinct_count = 0
+
+    for partition in range(partition_count):
+        if partition_count > 1:
+            positions = numpy.flatnonzero(partitions == partition)
+        else:
+            positions = numpy.arange(count)
+
+        keys = _weld_keys(rows_of(positions), mode, tolerance)
+        keys = keys.view(numpy.dtype((numpy.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+        _, first, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+
+        end = distinct_count + len(first)
+        first_occurrences[distinct_count:end] = positions[first]
+        indices[positions] = distinct_count + numpy.ravel(inverse)
+        distinct_count = end
+
+    first_occurrences = first_occurrences[:distinct_count]
+
+    # numpy.unique() sorts its result, restore order of first occurrence. First occurrences are
+    # distinct positions, so their rank is the number of first occurrences before them.
+    is_first = numpy.zeros(count, bool)
+    is_first[first_occurrences] = True
+    rank = numpy.cumsum(is_first, dtype=numpy.uint32)[first_occurrences] - numpy.uint32(1)
+    del is_first
+
+    # Rows of the merged vertices are created again instead of keeping them for all partitions
+    vertices = numpy.empty((distinct_count, 3), numpy.float32)
+    normals = numpy.empty((distinct_count, 3), numpy.float32)
+
+    for start in range(0, distinct_count, WELD_PARTITION_SIZE):
+        end = min(start + WELD_PARTITION_SIZE, distinct_count)
+        rows = rows_of(first_occurrences[start:end])
+        rows += rows.dtype.type(0.0)
+
+        vertices[rank[start:end]] = rows[:, :3]
+        normals[rank[start:end]] = rows[:, 3:]
+
+    return vertices, normals, rank[indices]
+
+
+def _weld_keys(rows, mode, tolerance):
+    """
+    :param rows: numpy.array() of shape (n, 6), see _rows(), negative zeros are replaced in place
+    :param mode: Instance of WeldMode
+    :param tolerance: Grid size for snapping positions or None
+    :return: numpy.array() of shape (n, 3) or (n, 6), rows with equal keys are merged
+    """
+    # Adding 0.0 turns -0.0 into 0.0, both have to be considered equal
+    rows += rows.dtype.type(0.0)
+
+    if tolerance:
+        keys = numpy.empty_like(rows)
+        numpy.multiply(numpy.round(rows[:, :3] / tolerance), tolerance, out=keys[:, :3], casting="unsafe")
+        keys[:, :3] += rows.dtype.type(0.0)
+        keys[:, 3:] = rows[:, 3:]
+    else:
+        keys = rows
+
+    if mode == WeldMode.POSITION:
+        keys = keys[:, :3]
+
+    return numpy.ascontiguousarray(keys)
+
+
+def _hash_keys(keys):
+    """
+    :param keys: numpy.array() as returned by _weld_keys()
+    :return: numpy.array() with a hash of each key as numpy.uint64
+    """
+    words = keys.view(numpy.uint32).astype(numpy.uint64)
+    h = numpy.zeros(len(keys), numpy.uint64)
+
+    for column in range(words.shape[1]):
+        h = (h ^ words[:, column]) * numpy.uint64(0x100000001b3)
 
+    return h ^ (h >> numpy.uint64(29))
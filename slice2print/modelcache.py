@@ -0,0 +1,161 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy
+
+import model
+
+
+class ModelCache:
+    """
+    Cache for parsed models on disk
+
+    Each entry is a folder named after the hash of the content of the STL file, it contains
+    the arrays of the model as raw .npy files which are loaded memory mapped. The least
+    recently used entries are deleted when the size of the cache exceeds its limit.
+    """
+    VERSION = 1  # Increase when the format of an entry changes
+    HASH_BLOCK_SIZE = 1024 * 1024
+    ARRAYS = ("vertices", "normals", "indices")
+    INFO_FILE_NAME = "model.json"
+    TMP_PREFIX = ".tmp"  # Prefix of the folders entries are written to before they are renamed into place
+    # Options of model.Model.from_file() which do not change the resulting model
+    IGNORED_OPTIONS = ("use_mmap", "processes")
+
+    def __init__(self, path_to_folder, size_limit):
+        """
+        :param path_to_folder: Folder for the entries of the cache, will be created if needed
+        :param size_limit: Maximum size of the cache in bytes
+        """
+        self.path_to_folder = path_to_folder
+        self.size_limit = size_limit
+
+    def load(self, filename, **kwargs):
+        """
+        Returns the model from the cache or parses the file and adds the model to the cache
+
+        :param filename: Path to STL file
+        :param kwargs: Passed to model.Model.from_file()
+        :return: Instance of model.Model
+        """
+        key = self._key(filename, kwargs)
+        path = os.path.join(self.path_to_folder, key)
+
+        try:
+            result = self._read_entry(path)
+            os.utime(path)  # mark entry as recently used
+        except (IOError, ValueError, KeyError):
+            # A partial or corrupt entry would keep the new entry from being renamed into place
+            shutil.rmtree(path, ignore_errors=True)
+
+            result = model.Model.from_file(filename, **kwargs)
+
+            try:
+                self._write_entry(path, result)
+            except IOError:
+                pass  # Caching is optional, the model is valid anyway
+
+        try:
+            self._evict(keep=key)
+        except IOError:
+            pass
+
+        return result
+
+    def clear(self):
+        """
+        Deletes all entries of the cache
+        """
+        shutil.rmtree(self.path_to_folder, ignore_errors=True)
+
+    def _key(self, filename, kwargs):
+        """
+        :return: Hash of the content of the file and the options used for parsing it
+        """
+        h = hashlib.sha256()
+        options = sorted((k, str(v)) for k, v in kwargs.items() if k not in self.IGNORED_OPTIONS)
+        h.update(repr((self.VERSION, options)).encode())
+
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK_SIZE), b""):
+                h.update(block)
+
+        return h.hexdigest()
+
+    def _read_entry(self, path):
+        with open(os.path.join(path, self.INFO_FILE_NAME), "r") as f:
+            info = json.load(f)
+
+        arrays = [numpy.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in self.ARRAYS]
+
+        bounding_box = model.BoundingBox()
+        bounding_box.set_boundaries(*info["bounding_box"])
+
+        return model.Model(*arrays, bounding_box, info["facet_count"])
+
+    def _write_entry(self, path, m):
+        os.makedirs(self.path_to_folder, exist_ok=True)
+
+        # Write entry to a temporary folder first, so an incomplete entry will never be read
+        tmp_path = tempfile.mkdtemp(dir=self.path_to_folder, prefix=self.TMP_PREFIX)
+
+        try:
+            for name in self.ARRAYS:
+                numpy.save(os.path.join(tmp_path, name + ".npy"), getattr(m, name))
+
+            bb = m.bounding_box
+            info = {"bounding_box": [bb.x_min, bb.x_max, bb.y_min, bb.y_max, bb.z_min, bb.z_max],
+                    "facet_count": m.facet_count}
+
+            with open(os.path.join(tmp_path, self.INFO_FILE_NAME), "w") as f:
+                json.dump(info, f)
+
+            # Replace an entry written by another instance in the meantime
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp_path, path)
+        except IOError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def _evict(self, keep):
+        """
+        Deletes least recently used entries until the size of the cache is within its limit
+
+        :param keep: Key of the entry which must not be deleted
+        """
+        entries = []
+        total_size = 0
+
+        for entry in os.scandir(self.path_to_folder):
+            # Temporary folders may still be written by another instance, which renames them afterwards
+            if entry.is_dir() and not entry.name.startswith(self.TMP_PREFIX):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry))
+                total_size += size
+
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.size_limit:
+                break
+
+            if entry.name != keep:
+                # Entries which are still memory mapped cannot be deleted on every platform
+                shutil.rmtree(entry.path, ignore_errors=True)
+                total_size -= size
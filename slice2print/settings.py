@@ -35,11 +35,18 @@ DEFAULT_SETTINGS = {
             "z": 200
         },
         "nozzle_diameter": 0.4,
-        "filament_diameter": 1.75
+        "filament_diameter": 1.75,
+        "nozzle_temperature": 200,
+        "bed_temperature": 60,
+        "arc_fitting": False,
+        "arc_tolerance": 0.02
     },
     "print_options": {
         "first_layer_height": 0.2,
         "layer_height": 0.2,
+        "adaptive_layer_height": False,
+        "min_layer_height": 0.1,
+        "max_layer_height": 0.3,
         "first_layer_speed": 35,
         "print_speed": 50,
         "travel_speed": 150,
@@ -48,13 +55,42 @@ DEFAULT_SETTINGS = {
         "bottom_layers": 4,
         "infill_overlap": 25,
         "infill_angle": 45
+    },
+    "model_cache": {
+        "enabled": True,
+        "size_limit": 1024
+    },
+    "performance": {
+        "processes": 0,
+        "slicing_engine": "plane_batch",
+        "two_opt": False
     }
 }
 
 
+def merge_settings(defaults, settings):
+    """
+    Merges settings recursively into a copy of defaults, so entries missing in settings are added
+
+    :param defaults: Dict with default settings
+    :param settings: Dict with settings e.g. from a file
+    :return: Merged dict
+    """
+    result = copy.deepcopy(defaults)
+
+    for key, value in settings.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_settings(result[key], value)
+        else:
+            result[key] = value
+
+    return result
+
+
 class Settings:
     APP_NAME = "Slice2Print"
     FILE_NAME = "settings.json"
+    MODEL_CACHE_FOLDER_NAME = "cache"
 
     def __init__(self):
         if sys.platform == "win32":
@@ -71,6 +107,7 @@ class Settings:
 
         self.path_to_folder = os.path.join(self.path_to_folder, self.APP_NAME)
         self.path_to_file = os.path.join(self.path_to_folder, self.FILE_NAME)
+        self.path_to_model_cache = os.path.join(self.path_to_folder, self.MODEL_CACHE_FOLDER_NAME)
         self.settings = copy.deepcopy(DEFAULT_SETTINGS)
 
     def load_from_file(self):
@@ -82,9 +119,8 @@ class Settings:
                 try:
                     s = json.load(f)
 
-                    # TODO Join DEFAULT_SETTINGS and settings from file in a way that missing entries will be added
                     # TODO Check data types during joining
-                    self.settings = {**DEFAULT_SETTINGS, **s}  # https://www.python.org/dev/peps/pep-0448/
+                    self.settings = merge_settings(DEFAULT_SETTINGS, s)
                 except json.JSONDecodeError:
                     pass
         except IOError:
@@ -105,8 +141,17 @@ class Settings:
         cfg = slicer.SlicerConfig()
         cfg.first_layer_height = self.first_layer_height
         cfg.layer_height = self.layer_height
+        cfg.adaptive_layer_height = self.adaptive_layer_height
+        cfg.min_layer_height = self.min_layer_height
+        cfg.max_layer_height = self.max_layer_height
         cfg.nozzle_diameter = self.nozzle_diameter
         cfg.filament_diameter = self.filament_diameter
+        cfg.nozzle_temperature = self.nozzle_temperature
+        cfg.bed_temperature = self.bed_temperature
+        # The origin of the printer is the front left corner of the bed
+        cfg.bed_center = (self.build_volume[0] / 2, self.build_volume[1] / 2)
+        cfg.arc_fitting = self.arc_fitting
+        cfg.arc_tolerance = self.arc_tolerance
         cfg.first_layer_speed = self.first_layer_speed
         cfg.print_speed = self.print_speed
         cfg.travel_speed = self.travel_speed
@@ -115,6 +160,9 @@ class Settings:
         cfg.bottom_layers = self.bottom_layers
         cfg.infill_overlap = self.infill_overlap
         cfg.infill_angle = self.infill_angle
+        cfg.processes = self.processes
+        cfg.slicing_engine = self.slicing_engine
+        cfg.two_opt = self.two_opt
 
         return cfg
 
@@ -171,6 +219,71 @@ class Settings:
         """
         self.settings["application"]["window"]["maximized"] = maximized
 
+    @property
+    def model_cache_enabled(self):
+        """
+        :return: True if parsed models shall be cached on disk else False
+        """
+        return self.settings["model_cache"]["enabled"]
+
+    @model_cache_enabled.setter
+    def model_cache_enabled(self, enabled):
+        self.settings["model_cache"]["enabled"] = enabled
+
+    @property
+    def model_cache_size_limit(self):
+        """
+        :return: Maximum size of the model cache in MB
+        """
+        return self.settings["model_cache"]["size_limit"]
+
+    @model_cache_size_limit.setter
+    def model_cache_size_limit(self, size_limit):
+        self.settings["model_cache"]["size_limit"] = size_limit
+
+    @property
+    def processes(self):
+        """
+        :return: Number of processes for parallel work, defaults to the number of CPUs
+        """
+        return self.settings["performance"]["processes"] or os.cpu_count() or 1
+
+    @processes.setter
+    def processes(self, processes):
+        """
+        :param processes: Number of processes for parallel work, 0 for the number of CPUs
+        """
+        self.settings["performance"]["processes"] = processes
+
+    @property
+    def slicing_engine(self):
+        """
+        Falls back to default value in case of an error
+        :return: Instance of slicer.SlicingEngine
+        """
+        try:
+            return slicer.SlicingEngine[self.settings["performance"]["slicing_engine"].upper()]
+        except (KeyError, AttributeError):
+            return slicer.SlicingEngine[DEFAULT_SETTINGS["performance"]["slicing_engine"].upper()]
+
+    @slicing_engine.setter
+    def slicing_engine(self, slicing_engine):
+        """
+        :param slicing_engine: Instance of slicer.SlicingEngine
+        """
+        self.settings["performance"]["slicing_engine"] = slicing_engine.name.lower()
+
+    @property
+    def two_opt(self):
+        """
+        :return: True if the order of paths shall be refined by 2-opt else False
+        """
+        return self.settings["performance"]["two_opt"]
+
+    @two_opt.setter
+    def two_opt(self, enabled):
+        self.settings["performance"]["two_opt"] = enabled
+
     @property
     def first_layer_height(self):
         return self.settings["print_options"]["first_layer_height"]
@@ -187,6 +300,30 @@ class Settings:
     def layer_height(self, h):
         self.settings["print_options"]["layer_height"] = h
 
+    @property
+    def adaptive_layer_height(self):
+        return self.settings["print_options"]["adaptive_layer_height"]
+
+    @adaptive_layer_height.setter
+    def adaptive_layer_height(self, enabled):
+        self.settings["print_options"]["adaptive_layer_height"] = enabled
+
+    @property
+    def min_layer_height(self):
+        return self.settings["print_options"]["min_layer_height"]
+
+    @min_layer_height.setter
+    def min_layer_height(self, h):
+        self.settings["print_options"]["min_layer_height"] = h
+
+    @property
+    def max_layer_height(self):
+        return self.settings["print_options"]["max_layer_height"]
+
+    @max_layer_height.setter
+    def max_layer_height(self, h):
+        self.settings["print_options"]["max_layer_height"] = h
+
     @property
     def nozzle_diameter(self):
         return self.settings["printer"]["nozzle_diameter"]
@@ -227,6 +364,47 @@ class Settings:
     def filament_diameter(self, d):
         self.settings["printer"]["filament_diameter"] = d
 
+    @property
+    def nozzle_temperature(self):
+        """
+        :return: Nozzle temperature in °C
+        """
+        return self.settings["printer"]["nozzle_temperature"]
+
+    @nozzle_temperature.setter
+    def nozzle_temperature(self, t):
+        self.settings["printer"]["nozzle_temperature"] = t
+
+    @property
+    def bed_temperature(self):
+        """
+        :return: Bed temperature in °C
+        """
+        return self.settings["printer"]["bed_temperature"]
+
+    @bed_temperature.setter
+    def bed_temperature(self, t):
+        self.settings["printer"]["bed_temperature"] = t
+
+    @property
+    def arc_fitting(self):
+        """
+        :return: True if perimeters shall be printed with arcs (G2/G3) else False
+        """
+        return self.settings["printer"]["arc_fitting"]
+
+    @arc_fitting.setter
+    def arc_fitting(self, enabled):
+        self.settings["printer"]["arc_fitting"] = enabled
+
+    @property
+    def arc_tolerance(self):
+        return self.settings["printer"]["arc_tolerance"]
+
+    @arc_tolerance.setter
+    def arc_tolerance(self, tolerance):
+        self.settings["printer"]["arc_tolerance"] = tolerance
+
     @property
     def perimeters(self):
         return self.settings["print_options"]["perimeters"]
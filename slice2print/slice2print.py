@@ -21,7 +21,9 @@ import sys
 import wx
 
 import model
+import modelcache
 import settings
+import slicer
 
 import ui
 
@@ -56,14 +58,19 @@ class MainFrameController:
     def _load_file(self, filename):
         try:
             with wx.BusyInfo("Loading model...", self.frame):
-                self.model = model.Model.from_file(filename)
+                if self.settings.model_cache_enabled:
+                    cache = modelcache.ModelCache(self.settings.path_to_model_cache,
+                                                  self.settings.model_cache_size_limit * 1024 * 1024)
+                    self.model = cache.load(filename, use_mmap=True, processes=self.settings.processes)
+                else:
+                    self.model = model.Model.from_file(filename, use_mmap=True, processes=self.settings.processes)
                 self.frame.model_view.set_model(self.model)
                 self.show_model_mesh()
 
             self.toolbar.enable_model_tools()
             self.frame.status_bar.SetStatusText(
                 "Model size: {:.2f} x {:.2f} x {:.2f} mm".format(*self.model.dimensions))
-        except (AssertionError, IOError, ValueError, struct.error) as e:
+        except (model.StlParserError, IOError, ValueError, struct.error) as e:
             d = wx.MessageDialog(self.frame, str(e), "Error while open file", style=wx.OK | wx.ICON_ERROR)
             d.ShowModal()
             return False
@@ -75,6 +82,21 @@ class MainFrameController:
 
         self.sliced_model.layers[layer_no].to_svg(filename)
 
+    def export_gcode(self, event=None):
+        with wx.FileDialog(self.frame, "Export G-code", wildcard="G-code (*.gcode)|*.gcode",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() == wx.ID_CANCEL:
+                return
+
+            filename = dlg.GetPath()
+
+        try:
+            with wx.BusyInfo("Exporting G-code...", self.frame):
+                slicer.GCodeWriter(self.sliced_model.cfg).save(self.sliced_model, filename)
+        except IOError as e:
+            d = wx.MessageDialog(self.frame, str(e), "Error while export G-code", style=wx.OK | wx.ICON_ERROR)
+            d.ShowModal()
+
     def view_all(self, event=None):
         self.frame.model_view.view_all()
 
@@ -91,6 +113,8 @@ class MainFrameController:
                     self.frame.model_view.set_sliced_model(self.sliced_model)
                     self.toolbar.enable_layer_view_tool()
                     self.show_layer_mesh()
+                    self.frame.status_bar.SetStatusText(
+                        "Travel moves shortened by {:.0f} mm".format(dlg.travel_saved))
 
     def show_model_mesh(self, event=None):
         self.toolbar.toggle_model_view()
@@ -122,6 +146,9 @@ class MainFrameController:
     def init_options(self, panel):
         panel.ctrl_first_layer_height.SetValue(self.settings.first_layer_height)
         panel.ctrl_layer_height.SetValue(self.settings.layer_height)
+        panel.ctrl_adaptive_layer_height.SetValue(self.settings.adaptive_layer_height)
+        panel.ctrl_min_layer_height.SetValue(self.settings.min_layer_height)
+        panel.ctrl_max_layer_height.SetValue(self.settings.max_layer_height)
         panel.ctrl_first_layer_speed.SetValue(self.settings.first_layer_speed)
         panel.ctrl_print_speed.SetValue(self.settings.print_speed)
         panel.ctrl_travel_speed.SetValue(self.settings.travel_speed)
@@ -134,6 +161,9 @@ class MainFrameController:
     def update_print_options(self, panel):
         self.settings.first_layer_height = panel.ctrl_first_layer_height.GetValue()
         self.settings.layer_height = panel.ctrl_layer_height.GetValue()
+        self.settings.adaptive_layer_height = panel.ctrl_adaptive_layer_height.GetValue()
+        self.settings.min_layer_height = panel.ctrl_min_layer_height.GetValue()
+        self.settings.max_layer_height = panel.ctrl_max_layer_height.GetValue()
         self.settings.first_layer_speed = panel.ctrl_first_layer_speed.GetValue()
         self.settings.print_speed = panel.ctrl_print_speed.GetValue()
         self.settings.travel_speed = panel.ctrl_travel_speed.GetValue()
@@ -151,6 +181,10 @@ class MainFrameController:
         panel.ctrl_build_volume_height.SetValue(height)
         panel.ctrl_nozzle_diameter.SetValue(self.settings.nozzle_diameter)
         panel.ctrl_filament_diameter.SetValue(self.settings.filament_diameter)
+        panel.ctrl_nozzle_temperature.SetValue(self.settings.nozzle_temperature)
+        panel.ctrl_bed_temperature.SetValue(self.settings.bed_temperature)
+        panel.ctrl_arc_fitting.SetValue(self.settings.arc_fitting)
+        panel.ctrl_arc_tolerance.SetValue(self.settings.arc_tolerance)
 
     def update_printer_settings(self, panel):
         width = panel.ctrl_build_volume_width.GetValue()
@@ -161,6 +195,10 @@ class MainFrameController:
         self.settings.build_volume = build_volume
         self.settings.nozzle_diameter = panel.ctrl_nozzle_diameter.GetValue()
         self.settings.filament_diameter = panel.ctrl_filament_diameter.GetValue()
+        self.settings.nozzle_temperature = panel.ctrl_nozzle_temperature.GetValue()
+        self.settings.bed_temperature = panel.ctrl_bed_temperature.GetValue()
+        self.settings.arc_fitting = panel.ctrl_arc_fitting.GetValue()
+        self.settings.arc_tolerance = panel.ctrl_arc_tolerance.GetValue()
 
         self.frame.model_view.set_build_volume(build_volume)
         self.frame.Refresh()
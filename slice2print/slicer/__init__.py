@@ -1,3 +1,4 @@
-from .config import SlicerConfig
+from .config import SlicerConfig, SlicingEngine
+from .gcode import GCodeWriter
 from .slicer import Slicer
-from .sliced_model import SlicedModel
+from .sliced_model import SlicedModel, create_executor
@@ -0,0 +1,376 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+import numpy
+
+from .paths import Paths
+
+MIN_ARC_SEGMENTS = 3  # An arc replaces at least this number of segments
+MAX_ARC_ANGLE = math.pi  # Longer arcs are split
+MAX_ARC_TURN = math.radians(45)  # Points where a path turns by a larger angle are corners
+BISECTION_LEVELS = 4  # Steps of the bisection searching the longest arc whose end points are tested at once
+PREVIEW_TOLERANCE = 0.02  # Maximum deviation of tessellated arcs from the true arcs in mm
+
+
+class ArcPaths(Paths):
+    """
+    Closed paths whose segments are straight lines or circular arcs
+
+    The segment of a path ending at point i is an arc around centers[i] if directions[i] is 1
+    (counterclockwise) or -1 (clockwise) and a straight line if it is 0. The segment ending at
+    the first point of a path closes it. The preview shows segment i as segments[i] straight
+    segments, so node_count is the number of points of the tessellated paths.
+    """
+    __slots__ = ["centers", "directions", "segments"]
+
+    def __init__(self, coords=None, offsets=None, centers=None, directions=None, segments=None):
+        """
+        :param coords: numpy.array() of shape (n, 2) with the points of all paths
+        :param offsets: numpy.array() with the index of the first point of each path and the number of points
+        :param centers: numpy.array() of shape (n, 2) with the center of the arc ending at each point
+        :param directions: numpy.array() with the direction of the arc ending at each point, 0 for a line
+        :param segments: numpy.array() with the number of straight segments of the preview for each segment
+        """
+        Paths.__init__(self, coords, offsets)
+        n = len(self.coords)
+        self.centers = numpy.zeros((n, 2), numpy.float64) if centers is None else centers
+        self.directions = numpy.zeros(n, numpy.int8) if directions is None else directions
+        self.segments = numpy.ones(n, numpy.int64) if segments is None else segments
+
+    @property
+    def node_count(self):
+        return int(numpy.sum(self.segments))
+
+    def segment_starts(self):
+        """
+        :return: numpy.array() with the index of the start point of the segment ending at each point
+        """
+        starts = numpy.arange(len(self.coords)) - 1
+        starts[self.offsets[:-1]] = self.offsets[1:] - 1
+
+        return starts
+
+    def sweeps(self):
+        """
+        :return: numpy.array() with the signed angle of each arc, positive if counterclockwise, 0 for lines
+        """
+        start = self.coords[self.segment_starts()] - self.centers
+        end = self.coords - self.centers
+
+        angles = numpy.arctan2(start[:, 0] * end[:, 1] - start[:, 1] * end[:, 0], numpy.sum(start * end, axis=1))
+        # Bring each angle into the direction of its arc
+        angles = numpy.mod(angles * self.directions, 2 * math.pi) * self.directions
+
+        return angles
+
+    def segment_lengths(self):
+        """
+        :return: numpy.array() with the length of each segment
+        """
+        start = self.coords[self.segment_starts()].astype(numpy.float64)
+        radii = numpy.hypot(*(start - self.centers).T)
+
+        return numpy.where(self.directions != 0,
+                           radii * numpy.abs(self.sweeps()),
+                           numpy.hypot(*(self.coords - start).T))
+
+    def tessellate(self):
+        """
+        :return: Instance of Paths with each arc replaced by straight segments
+        """
+        if not len(self):
+            return Paths()
+
+        counts = self.segments
+        segment = numpy.repeat(numpy.arange(len(counts)), counts)
+        # Number of each point within its segment, starting at 1, the last one is the end point of the segment
+        piece = numpy.arange(len(segment)) - numpy.repeat(numpy.cumsum(counts) - counts, counts) + 1
+
+        start = self.coords[self.segment_starts()].astype(numpy.float64) - self.centers
+        start_angles = numpy.arctan2(start[:, 1], start[:, 0])
+        radii = numpy.hypot(start[:, 0], start[:, 1])
+
+        angles = start_angles[segment] + self.sweeps()[segment] * piece / counts[segment]
+        points = self.centers[segment] + radii[segment, None] * numpy.column_stack((numpy.cos(angles),
+                                                                                    numpy.sin(angles)))
+
+        # Segment end points and lines keep their exact coordinates
+        is_end = piece == counts[segment]
+        points[is_end] = self.coords[segment[is_end]]
+
+        offsets = numpy.zeros(len(self) + 1, numpy.int64)
+        numpy.cumsum(numpy.add.reduceat(counts, self.offsets[:-1]), out=offsets[1:])
+
+        return Paths(numpy.rint(points).astype(numpy.int32), offsets)
+
+
+def fit_arcs(paths, tolerance, preview_tolerance):
+    """
+    Replaces runs of points of closed paths which lie on a circle by circular arcs
+
+    The turn direction at all points of a path is computed at once. Runs of points turning in
+    the same direction, or so little that the direction is within tolerance, are covered by arcs
+    from their start on. Each arc is extended as long as all of its points and segments lie within
+    tolerance of the circle through its first, middle and last point. The longest arc is searched
+    by doubling and bisecting its length, testing several candidate end points at once.
+
+    :param paths: Instance of Paths with closed paths
+    :param tolerance: Maximum deviation of the arcs from the points as integer
+    :param preview_tolerance: Maximum deviation of the tessellated arcs from the arcs as integer
+    :return: Instance of ArcPaths
+    """
+    coords = []
+    centers = []
+    directions = []
+
+    for path in paths:
+        keep, path_centers, path_directions = _fit_path(path, tolerance)
+        coords.append(path[keep])
+        centers.append(path_centers)
+        directions.append(path_directions)
+
+    if not coords:
+        return ArcPaths()
+
+    lengths = [len(path) for path in coords]
+    offsets = numpy.zeros(len(lengths) + 1, numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+
+    result = ArcPaths(numpy.concatenate(coords), offsets, numpy.concatenate(centers), numpy.concatenate(directions))
+
+    # Each straight segment of the preview may deviate by preview_tolerance from its arc
+    radii = numpy.hypot(*(result.coords - result.centers).T)
+    max_angles = 2 * numpy.arccos(numpy.clip(1 - preview_tolerance / numpy.maximum(radii, 1), -1, 1))
+    segments = numpy.ceil(numpy.abs(result.sweeps()) / numpy.maximum(max_angles, 1e-3)).astype(numpy.int64)
+    result.segments = numpy.maximum(segments, 1)
+
+    return result
+
+
+def _fit_path(path, tolerance):
+    """
+    :param path: numpy.array() of shape (n, 2) with the points of a closed path
+    :param tolerance: Maximum deviation of the arcs from the points
+    :return: Tuple (numpy.array() which is True for each point kept, centers and directions of the
+             segments ending at the kept points as in ArcPaths)
+    """
+    # The first point is repeated at the end, segment j runs from point j to point j + 1
+    points = numpy.concatenate((path, path[:1])).astype(numpy.float64)
+    segment_count = len(points) - 1
+
+    keep = numpy.ones(segment_count, bool)
+    segment_centers = numpy.zeros((segment_count, 2))
+    segment_directions = numpy.zeros(segment_count, numpy.int8)
+
+    if segment_count >= MIN_ARC_SEGMENTS:
+        # Turn direction at points 1 ... segment_count - 1, 1 for left turns and -1 for right turns
+        vectors = numpy.diff(points, axis=0)
+        cross = vectors[:-1, 0] * vectors[1:, 1] - vectors[:-1, 1] * vectors[1:, 0]
+        dot = numpy.sum(vectors[:-1] * vectors[1:], axis=1)
+        turns = numpy.sign(cross).astype(numpy.int8)
+
+        # Points within tolerance of the line through their neighbours fit arcs of both directions,
+        # the direction of their turn is mostly rounding noise, e.g. on large circles
+        chords = numpy.hypot(*(points[2:] - points[:-2]).T)
+        flat = numpy.abs(cross) <= tolerance * chords
+        turns[flat] = 0
+
+        # Runs of segments which may form arcs end at sharp corners and where the turns change their direction
+        turning = numpy.flatnonzero(turns)
+        direction_changes = turning[1:][turns[turning[1:]] != turns[turning[:-1]]]
+        corners = numpy.flatnonzero((numpy.abs(numpy.arctan2(cross, dot)) > MAX_ARC_TURN) & ~flat)
+        bounds = [0] + (numpy.union1d(corners, direction_changes) + 1).tolist() + [segment_count]
+
+        for first, run_last in zip(bounds[:-1], bounds[1:]):
+            while run_last - first >= MIN_ARC_SEGMENTS:
+                arc = _longest_arc(points, first, run_last, tolerance)
+
+                if arc is None:
+                    first += 1
+                    continue
+
+                last, center, radius, direction = arc
+
+                # Arcs which deviate by at most tolerance from their chord are straight lines
+                chord = math.hypot(*(points[last] - points[first]))
+                if radius - math.sqrt(max(radius ** 2 - (chord / 2) ** 2, 0)) <= tolerance:
+                    first = max(first + 1, (first + last) // 2)
+                    continue
+
+                # Segments first ... last - 1 become one arc ending at point last
+                keep[first + 1:last] = False
+                segment_centers[last - 1] = center
+                segment_directions[last - 1] = direction
+                first = last
+
+    # The segment ending at point j + 1 is segment j, the one ending at the repeated first point closes the path
+    kept_segments = numpy.roll(numpy.flatnonzero(numpy.concatenate((keep[1:], [True]))), 1)
+
+    return keep, segment_centers[kept_segments], segment_directions[kept_segments]
+
+
+def _longest_arc(points, first, end, tolerance):
+    """
+    Finds the longest arc starting at point first by doubling its length as long as it fits and
+    bisecting between the longest arc which fits and the shortest one which does not. All doubled
+    lengths are tested at once, as are the middles of BISECTION_LEVELS steps of the bisection.
+
+    :param points: numpy.array() of shape (n, 2)
+    :param first: Index of the first point of the arc
+    :param end: Index of the last point the arc may reach
+    :param tolerance: Maximum deviation of the arc from the points
+    :return: Tuple (index of last point, center, radius, direction) or None if no arc fits
+    """
+    lengths = MIN_ARC_SEGMENTS << numpy.arange(max(1, (end - first) // MIN_ARC_SEGMENTS).bit_length())
+    lengths = lengths[first + lengths <= end]
+    if len(lengths) == 0:
+        return None
+
+    fits, centers, radii, directions = _fit_arcs(points, first, first + lengths, tolerance)
+    count = int(numpy.argmin(fits)) if not numpy.all(fits) else len(fits)
+    if count == 0:
+        return None
+
+    i = count - 1
+    result = (first + int(lengths[i]), centers[i], float(radii[i]), int(directions[i]))
+
+    low, high = result[0], min(first + 2 * int(lengths[i]), end + 1)
+    while high - low > 1:
+        lasts = _bisection_middles(low, high, BISECTION_LEVELS)
+        fits, centers, radii, directions = _fit_arcs(points, first, lasts, tolerance)
+
+        for _ in range(BISECTION_LEVELS):
+            if high - low <= 1:
+                break
+
+            middle = (low + high) // 2
+            i = numpy.searchsorted(lasts, middle)
+
+            if fits[i]:
+                low = middle
+                result = (middle, centers[i], float(radii[i]), int(directions[i]))
+            else:
+                high = middle
+
+    return result
+
+
+def _bisection_middles(low, high, levels):
+    """
+    :return: Sorted numpy.array() with the middles the next levels steps of a bisection of low ... high may test
+    """
+    middles = []
+    ranges = [(low, high)]
+
+    for _ in range(levels):
+        ranges = [r for r in ranges if r[1] - r[0] > 1]
+        middles.extend((lo + hi) // 2 for lo, hi in ranges)
+        ranges = [r for lo, hi in ranges for r in ((lo, (lo + hi) // 2), ((lo + hi) // 2, hi))]
+
+    return numpy.array(sorted(middles))
+
+
+def _fit_arcs(points, first, lasts, tolerance):
+    """
+    Tests arcs through the points first ... last for several last points at once, each arc fits if
+    the points lie within tolerance of the circle through its first, middle and last point, run around
+    it in one direction and do not span more than MAX_ARC_ANGLE
+
+    :param points: numpy.array() of shape (n, 2)
+    :param first: Index of the first point of the arcs
+    :param lasts: numpy.array() with the index of the last point of each arc
+    :param tolerance: Maximum deviation of the arcs from the points
+    :return: Tuple (numpy.array() which is True for each arc which fits, centers, radii, directions)
+    """
+    a = points[first]
+    b = points[(first + lasts) // 2]
+    c = points[lasts]
+
+    centers, radii = _fit_circles(a, b, c)
+    directions = numpy.where((b[:, 0] - a[0]) * (c[:, 1] - b[:, 1]) - (b[:, 1] - a[1]) * (c[:, 0] - b[:, 0]) > 0,
+                             1, -1)
+
+    # One row for each arc, the points behind its last point are masked
+    span = numpy.arange(int(numpy.max(lasts)) - first + 1)
+    outside = span[1:] > (lasts - first)[:, numpy.newaxis]
+    arc_points = points[first + span]
+    r = radii[:, numpy.newaxis]
+
+    with numpy.errstate(invalid="ignore"):
+        x = arc_points[:, 0] - centers[:, 0, numpy.newaxis]
+        y = arc_points[:, 1] - centers[:, 1, numpy.newaxis]
+
+        # All points lie within tolerance of the circle
+        squared_distances = x[:, 1:] ** 2 + y[:, 1:] ** 2
+        on_circle = ((squared_distances >= numpy.maximum(r - tolerance, 0) ** 2) &
+                     (squared_distances <= (r + tolerance) ** 2))
+
+        # Points may step back by rounding noise, but not by more than tolerance. Each step
+        # moves along the circle by about cross / r.
+        cross = (x[:, :-1] * y[:, 1:] - y[:, :-1] * x[:, 1:]) * directions[:, numpy.newaxis]
+        forward = cross >= -tolerance * r
+
+        # The steps run around the circle in one direction, so the angle covered by the arc is the
+        # angle from its first to its middle point plus the angle from there to its last point
+        i = numpy.arange(len(lasts))
+        last = lasts - first
+        middle = last // 2
+        sweeps = (_angles(x[:, 0], y[:, 0], x[i, middle], y[i, middle]) +
+                  _angles(x[i, middle], y[i, middle], x[i, last], y[i, last])) * directions
+
+        # The arc bulges out of each segment by the height of the circular segment over it,
+        # which is largest for the longest segment
+        chords = numpy.maximum.accumulate(numpy.hypot(*numpy.diff(arc_points, axis=0).T))[last - 1]
+        heights = radii - numpy.sqrt(numpy.maximum(radii ** 2 - (chords / 2) ** 2, 0))
+
+        fits = numpy.isfinite(radii)
+        fits &= numpy.all((on_circle & forward) | outside, axis=1)
+        fits &= (0 < sweeps) & (sweeps <= MAX_ARC_ANGLE)
+        fits &= heights <= tolerance
+
+    return fits, centers, radii, directions
+
+
+def _angles(x1, y1, x2, y2):
+    """
+    :return: numpy.array() with the angles in (-pi, pi] from the vectors (x1, y1) to the vectors (x2, y2)
+    """
+    return numpy.arctan2(x1 * y2 - y1 * x2, x1 * x2 + y1 * y2)
+
+
+def _fit_circles(a, b, c):
+    """
+    :param a: Point a
+    :param b: numpy.array() of shape (n, 2) with points b
+    :param c: numpy.array() of shape (n, 2) with points c
+    :return: Tuple (centers, radii) of the circles through the points a, b and c, radius inf if they are collinear
+    """
+    ab = a - b
+    cb = c - b
+
+    d = 2 * (ab[:, 0] * cb[:, 1] - ab[:, 1] * cb[:, 0])
+
+    ab2 = numpy.sum(ab ** 2, axis=1)
+    cb2 = numpy.sum(cb ** 2, axis=1)
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        offsets = numpy.column_stack((cb[:, 1] * ab2 - ab[:, 1] * cb2, ab[:, 0] * cb2 - cb[:, 0] * ab2)) / d[:, None]
+
+    radii = numpy.where(d == 0, math.inf, numpy.hypot(offsets[:, 0], offsets[:, 1]))
+    centers = numpy.where((d == 0)[:, numpy.newaxis], b, b + offsets)
+
+    return centers, radii
@@ -13,8 +13,13 @@
 # You should have received a copy of the GNU General Public License
 # along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
 
+import enum
 import math
 
+# PLANE_BATCH intersects chunks of triangles with all planes at once, SWEEP_PLANE sweeps
+# the planes upwards and intersects each plane only with the triangles spanning it
+SlicingEngine = enum.Enum("SlicingEngine", "PLANE_BATCH SWEEP_PLANE")
+
 
 class SlicerConfig:
     VERTEX_PRECISION = 1000.0
@@ -22,9 +27,17 @@ class SlicerConfig:
     def __init__(self):
         self.first_layer_height = None
         self.layer_height = None
+        self.adaptive_layer_height = False
+        self.min_layer_height = None
+        self.max_layer_height = None
 
         self.nozzle_diameter = None
         self.filament_diameter = None
+        self.nozzle_temperature = None
+        self.bed_temperature = None
+
+        # Position of the model center on the print bed in mm, added to the X and Y coordinates of the G-code
+        self.bed_center = (0.0, 0.0)
 
         self.first_layer_speed = None
         self.print_speed = None
@@ -37,6 +50,16 @@ class SlicerConfig:
         self.infill_overlap = None
         self.infill_angle = None
 
+        # Refine the nearest neighbour order of paths by 2-opt, see SlicedModel.order_paths()
+        self.two_opt = False
+
+        # Replace runs of perimeter points on circles by arcs (G2/G3), see SlicedModel.fit_arcs()
+        self.arc_fitting = False
+        self.arc_tolerance = None
+
+        self.processes = 1
+        self.slicing_engine = SlicingEngine.PLANE_BATCH
+
     @property
     def extrusion_overlap_factor(self):
         # https://manual.slic3r.org/advanced/flow-math
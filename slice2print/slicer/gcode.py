@@ -0,0 +1,207 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+import numpy
+
+from .arcs import ArcPaths
+
+HEADER = """; generated by Slice2Print
+G21 ; millimeters
+G90 ; absolute positioning
+M83 ; relative extrusion
+M140 S%(bed_temperature)d ; heat bed
+M104 S%(nozzle_temperature)d ; heat nozzle
+G28 ; home all axes
+M190 S%(bed_temperature)d ; wait for bed
+M109 S%(nozzle_temperature)d ; wait for nozzle
+G0 X%(x).3f Y%(y).3f Z%(z).3f F%(travel_speed)d
+G1 X%(x_end).3f E%(e).5f F%(speed)d ; prime nozzle
+"""
+
+FOOTER = """M104 S0 ; turn off nozzle heater
+M140 S0 ; turn off bed heater
+M84 ; disable motors
+"""
+
+# The nozzle is primed by a line along the front edge of the bed, starting at this position in mm
+PRIME_LINE_START = (5.0, 5.0)
+PRIME_LINE_LENGTH = 50.0
+
+
+class GCodeWriter:
+    """
+    Writes G-code of a sliced model layer by layer to a stream
+
+    Only the G-code of one layer is held in memory. Extrusion lengths are computed from the
+    volume of each segment, assuming a rectangle with semicircular ends as cross section
+    (see https://manual.slic3r.org/advanced/flow-math), and are given as relative values (M83).
+    The sliced model is centered on the origin, cfg.bed_center is added to all X and Y coordinates.
+    """
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, cfg):
+        """
+        :param cfg: Instance of SlicerConfig
+        """
+        self.cfg = cfg
+        self.filament_area = math.pi * (cfg.filament_diameter / 2) ** 2
+
+    def save(self, sliced_model, filename, update_func=None):
+        """
+        :param sliced_model: Instance of SlicedModel
+        :param filename: Path of G-code file
+        :param update_func: Function to call to indicate progress
+        :return: False if cancelled else True
+        :raises IOError:
+        """
+        with open(filename, "w", buffering=self.BUFFER_SIZE) as f:
+            return self.write(sliced_model.layers, f, update_func)
+
+    def write(self, layers, stream, update_func=None):
+        """
+        :param layers: Sequence of sliced_model.Layer ordered bottom-up
+        :param stream: Text stream the G-code is written to
+        :param update_func: Function to call to indicate progress
+        :return: False if cancelled else True
+        """
+        stream.write(self.header())
+
+        for i, layer in enumerate(layers):
+            stream.write(self.layer_gcode(layer, first_layer=(i == 0)))
+
+            if update_func is not None:
+                msg = "%s/%s layers written" % (i + 1, len(layers))
+
+                if update_func(int((i + 1) / len(layers) * 100), msg):
+                    return False
+
+        stream.write(FOOTER)
+
+        return True
+
+    def header(self):
+        """
+        :return: G-code which heats up the printer, homes it and primes the nozzle
+        """
+        x, y = PRIME_LINE_START
+        z = self.cfg.first_layer_height
+
+        return HEADER % {"bed_temperature": self.cfg.bed_temperature,
+                         "nozzle_temperature": self.cfg.nozzle_temperature,
+                         "x": x, "y": y, "z": z, "x_end": x + PRIME_LINE_LENGTH,
+                         "e": PRIME_LINE_LENGTH * self.e_per_mm(self.cfg.extrusion_width, z),
+                         "travel_speed": self.cfg.travel_speed * 60,
+                         "speed": self.cfg.first_layer_speed * 60}
+
+    def e_per_mm(self, extrusion_width, layer_height):
+        """
+        :param extrusion_width: Width of extruded lines
+        :param layer_height: Height of extruded lines
+        :return: Filament needed for each mm of a line
+        """
+        area = layer_height * (extrusion_width - layer_height * self.cfg.extrusion_overlap_factor)
+
+        return area / self.filament_area
+
+    def layer_gcode(self, layer, first_layer=False):
+        """
+        :param layer: Instance of sliced_model.Layer
+        :param first_layer: True if layer is printed first
+        :return: G-code of layer as string
+        """
+        speed = self.cfg.first_layer_speed if first_layer else self.cfg.print_speed
+        z = layer.z / self.cfg.VERTEX_PRECISION
+
+        result = [";LAYER:%d\n" % layer.layer_no,
+                  "G0 Z%.3f F%d\n" % (z, self.cfg.travel_speed * 60)]
+
+        for perimeter_no, perimeter in enumerate(layer.perimeters):
+            width = (self.cfg.extrusion_width_external_perimeter if perimeter_no == 0 else
+                     self.cfg.extrusion_width)
+            result.append(self.paths_gcode(perimeter, True, width, layer.layer_height, speed))
+
+        result.append(self.paths_gcode(layer.infill, False, self.cfg.extrusion_width_infill,
+                                       layer.layer_height, speed))
+
+        return "".join(result)
+
+    def paths_gcode(self, paths, closed, extrusion_width, layer_height, speed):
+        """
+        :param paths: Instance of paths.Paths or of arcs.ArcPaths, which are closed
+        :param closed: True if the paths are closed loops
+        :param extrusion_width: Width of extruded lines
+        :param layer_height: Height of extruded lines
+        :param speed: Print speed in mm/s
+        :return: G-code of paths as string
+        """
+        if not len(paths):
+            return ""
+
+        e_per_mm = self.e_per_mm(extrusion_width, layer_height)
+        coords = paths.coords / self.cfg.VERTEX_PRECISION + self.cfg.bed_center
+        travel = "G0 X%%.3f Y%%.3f F%d\nG1 F%d\n" % (self.cfg.travel_speed * 60, speed * 60)
+
+        if isinstance(paths, ArcPaths):
+            return self.arc_paths_gcode(paths, coords, travel, e_per_mm)
+
+        result = []
+        for start, end in zip(paths.offsets[:-1].tolist(), paths.offsets[1:].tolist()):
+            path = coords[start:end]
+            if closed:
+                path = numpy.concatenate((path, path[:1]))
+
+            e = numpy.hypot(*numpy.diff(path, axis=0).T) * e_per_mm
+            moves = numpy.column_stack((path[1:], e))
+
+            result.append(travel % tuple(path[0]))
+            result.append(("G1 X%.3f Y%.3f E%.5f\n" * len(moves)) % tuple(moves.ravel().tolist()))
+
+        return "".join(result)
+
+    def arc_paths_gcode(self, paths, coords, travel, e_per_mm):
+        """
+        :param paths: Instance of arcs.ArcPaths
+        :param coords: Points of paths in mm on the print bed
+        :param travel: Format of the travel move to the start of a path
+        :param e_per_mm: Filament needed for each mm of a path
+        :return: G-code of paths as string, arcs as G2 (clockwise) and G3 (counterclockwise) moves
+        """
+        starts = paths.segment_starts()
+        # Arc centers relative to the start of the arc
+        offsets = (paths.centers - paths.coords[starts]) / self.cfg.VERTEX_PRECISION
+        e = paths.segment_lengths() / self.cfg.VERTEX_PRECISION * e_per_mm
+
+        moves = {0: "G1 X%.3f Y%.3f E%.5f\n", 1: "G3 X%.3f Y%.3f I%.3f J%.3f E%.5f\n",
+                 -1: "G2 X%.3f Y%.3f I%.3f J%.3f E%.5f\n"}
+
+        coords = coords.tolist()
+        offsets = offsets.tolist()
+        directions = paths.directions.tolist()
+        e = e.tolist()
+
+        result = []
+        for start, end in zip(paths.offsets[:-1].tolist(), paths.offsets[1:].tolist()):
+            result.append(travel % tuple(coords[start]))
+
+            # The segment ending at the first point closes the path
+            for i in list(range(start + 1, end)) + [start]:
+                if directions[i]:
+                    result.append(moves[directions[i]] % (*coords[i], *offsets[i], e[i]))
+                else:
+                    result.append(moves[0] % (*coords[i], e[i]))
+
+        return "".join(result)
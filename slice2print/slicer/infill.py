@@ -18,6 +18,12 @@ import math
 import numpy as np
 import pyclipper
 
+# Infill lines of adjacent scan lines are only linked if their ends are not farther apart
+# than this number of line distances
+MAX_LINK_DISTANCE = 3
+# Distance within which a point counts as lying on a line, covers rounding of clipped coordinates
+LINK_TOLERANCE = 2
+
 
 def line_infill(cfg, layer_no, outlines):
     """
@@ -37,7 +43,7 @@ def line_infill(cfg, layer_no, outlines):
     y0 = bounds.top + (bounds.bottom - bounds.top) / 2
 
     line_length = max(bounds.bottom-bounds.top, bounds.right-bounds.left)
-    line_distance = int((cfg.extrusion_width_infill - cfg.extrusion_overlap_factor/2) * cfg.VERTEX_PRECISION)
+    line_distance = infill_line_distance(cfg)
     infill_inc = int(math.ceil(line_length / line_distance))
 
     if infill_inc > 0:
@@ -50,11 +56,7 @@ def line_infill(cfg, layer_no, outlines):
             infill.append([[x, -line_length, 1], [x, line_length, 1]])
             infill.append([[-x, -line_length, 1], [-x, line_length, 1]])
 
-        infill_angle = cfg.infill_angle
-        if layer_no % 2:
-            infill_angle += 90
-
-        infill_angle = np.radians(infill_angle)
+        infill_angle = np.radians(infill_angle_of_layer(cfg, layer_no))
 
         infill = np.reshape(infill, (-1, 3))
 
@@ -86,3 +88,162 @@ def line_infill(cfg, layer_no, outlines):
                 result.append(child.Contour)
 
     return result
+
+
+def infill_line_distance(cfg):
+    """
+    :param cfg: Instance of SlicerConfig
+    :return: Distance between adjacent infill lines as integer
+    """
+    return int((cfg.extrusion_width_infill - cfg.extrusion_overlap_factor/2) * cfg.VERTEX_PRECISION)
+
+
+def infill_angle_of_layer(cfg, layer_no):
+    """
+    :param cfg: Instance of SlicerConfig
+    :param layer_no: Layer number
+    :return: Angle of the infill lines in degrees, alternating between odd and even layers
+    """
+    if layer_no % 2:
+        return cfg.infill_angle + 90
+
+    return cfg.infill_angle
+
+
+def link_lines(cfg, layer_no, lines, outlines):
+    """
+    Links the infill lines of adjacent scan lines into zig-zag paths
+
+    The end of a line is linked to the end on the same side of the nearest line of the next
+    scan line, if the straight link between them lies within the outlines. Links follow the
+    boundary of the outlines only where it is straight or convex, elsewhere the paths end.
+
+    :param cfg: Instance of SlicerConfig
+    :param layer_no: Layer number
+    :param lines: List of lines as returned by line_infill()
+    :param outlines: List of closed paths which were infilled
+    :return: List of open paths
+    """
+    if not lines:
+        return []
+
+    line_distance = infill_line_distance(cfg)
+    angle = np.radians(infill_angle_of_layer(cfg, layer_no))
+
+    points = np.array(lines, np.int64).reshape((-1, 2, 2))
+
+    # Scan lines run along direction (sin, cos) and follow each other in direction (cos, -sin)
+    along = points @ np.array([np.sin(angle), np.cos(angle)])
+    across = points.mean(axis=1) @ np.array([np.cos(angle), -np.sin(angle)])
+
+    # Let each line run in scan direction, so end 0 is at the start and end 1 at the end of its scan line
+    backwards = along[:, 0] > along[:, 1]
+    points[backwards] = points[backwards, ::-1]
+    along[backwards] = along[backwards, ::-1]
+
+    scan_lines = np.rint((across - across.min()) / line_distance).astype(np.int64)
+
+    order = np.lexsort((along[:, 0], scan_lines))
+    scan_line_starts = np.searchsorted(scan_lines[order], np.arange(scan_lines.max() + 2))
+
+    # links[i, side]: line of the next scan line whose end at side is linked to the end at side of line i, or -1
+    links = np.full((len(points), 2), -1, np.int64)
+    max_distance = MAX_LINK_DISTANCE * line_distance
+
+    for scan_line in range(len(scan_line_starts) - 2):
+        current = order[scan_line_starts[scan_line]:scan_line_starts[scan_line + 1]]
+        following = order[scan_line_starts[scan_line + 1]:scan_line_starts[scan_line + 2]]
+
+        if len(current) and len(following):
+            for side in (0, 1):
+                offsets = points[current, side][:, None] - points[following, side][None]
+                distances = np.hypot(offsets[..., 0], offsets[..., 1])
+                nearest = np.argmin(distances, axis=1)
+                linked = distances[np.arange(len(current)), nearest] <= max_distance
+                links[current[linked], side] = following[nearest[linked]]
+
+    candidates = np.flatnonzero(links.ravel() >= 0)
+    sides = candidates % 2
+    starts = points[candidates // 2, sides]
+    ends = points[links.ravel()[candidates], sides]
+
+    invalid = ~_links_within(starts, ends, outlines)
+    links.ravel()[candidates[invalid]] = -1
+
+    result = []
+    used = np.zeros(len(points), bool)
+
+    for line in order.tolist():
+        if used[line]:
+            continue
+
+        used[line] = True
+        path = [points[line, 0], points[line, 1]]
+        side = 1
+
+        # Zig-zag: each line is entered at the side where the previous line ended
+        while links[line, side] >= 0 and not used[links[line, side]]:
+            line = links[line, side]
+            used[line] = True
+
+            if not np.array_equal(path[-1], points[line, side]):
+                path.append(points[line, side])
+            path.append(points[line, 1 - side])
+            side = 1 - side
+
+        result.append(np.array(path))
+
+    return result
+
+
+def _links_within(starts, ends, outlines):
+    """
+    A link whose ends lie on the outlines lies within them if it crosses no edge of the outlines
+    and its midpoint lies within them or on one of their edges.
+
+    :param starts: numpy.array() of shape (n, 2) with the start points of the links
+    :param ends: numpy.array() of shape (n, 2) with the end points of the links
+    :param outlines: List of closed paths
+    :return: numpy.array() which is True for each link within the outlines
+    """
+    edge_starts = np.concatenate([np.asarray(outline, np.int64).reshape((-1, 2)) for outline in outlines])
+    edge_ends = np.concatenate([np.roll(np.asarray(outline, np.int64).reshape((-1, 2)), -1, axis=0)
+                                for outline in outlines])
+
+    def side(a, b, c):
+        """
+        :return: 1 if c is left of the line through a and b, -1 if right of it, 0 if within LINK_TOLERANCE
+        """
+        cross = (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+        length = np.hypot(b[..., 0] - a[..., 0], b[..., 1] - a[..., 1])
+
+        return np.sign(cross) * (np.abs(cross) > LINK_TOLERANCE * length)
+
+    result = np.zeros(len(starts), bool)
+    # Links are tested against all edges in chunks to limit the memory needed
+    chunk_size = max(1, 2**20 // len(edge_starts))
+
+    for chunk in range(0, len(starts), chunk_size):
+        a = starts[chunk:chunk + chunk_size, None]
+        b = ends[chunk:chunk + chunk_size, None]
+        c = edge_starts[None]
+        d = edge_ends[None]
+
+        # Proper crossings only, links touch the outlines at their ends
+        crossing = (side(a, b, c) * side(a, b, d) < 0) & (side(c, d, a) * side(c, d, b) < 0)
+
+        # Even-odd rule for the midpoint with a ray in x direction
+        midpoints = (a + b) / 2
+        straddling = (c[..., 1] > midpoints[..., 1]) != (d[..., 1] > midpoints[..., 1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = c[..., 0] + (midpoints[..., 1] - c[..., 1]) * (d[..., 0] - c[..., 0]) / (d[..., 1] - c[..., 1])
+        inside = np.count_nonzero(straddling & (x > midpoints[..., 0]), axis=1) % 2 == 1
+
+        # Links along a straight part of the outlines have their midpoint on an edge
+        t = np.clip(np.sum((midpoints - c) * (d - c), axis=-1) / np.maximum(np.sum((d - c) ** 2, axis=-1), 1), 0, 1)
+        closest = c + t[..., None] * (d - c)
+        on_edge = np.any(np.hypot(*np.moveaxis(midpoints - closest, -1, 0)) <= LINK_TOLERANCE, axis=1)
+
+        result[chunk:chunk + chunk_size] = (inside | on_edge) & ~np.any(crossing, axis=1)
+
+    return result
@@ -0,0 +1,125 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+import numpy
+
+# The layer height of the print options is used on surfaces with this slope,
+# steeper surfaces get thicker layers and shallower surfaces thinner layers
+ADAPTIVE_REFERENCE_ANGLE = 45
+# Smallest layer height in mm, smaller minimum layer heights are raised to it
+ADAPTIVE_MIN_LAYER_HEIGHT = 0.05
+# Size of the z bins in mm which store the layer height allowed by the triangles within them
+ADAPTIVE_BIN_SIZE = 0.05
+# Maximum number of pairs of triangle and bin processed at once, bounds the memory needed
+ADAPTIVE_BIN_BATCH_SIZE = 1 << 22
+
+
+def uniform_layers(cfg, height):
+    """
+    :param cfg: Instance of SlicerConfig
+    :param height: Height of the model
+    :return: Tuple (numpy.array() with z coordinates of the planes as integers, list of layer heights)
+    """
+    first_layer_height = int(cfg.first_layer_height * cfg.VERTEX_PRECISION)
+    layer_height = int(cfg.layer_height * cfg.VERTEX_PRECISION)
+
+    layer_count = max(0, math.ceil((height - cfg.first_layer_height) / cfg.layer_height + 1))
+    planes = first_layer_height + numpy.arange(layer_count, dtype=numpy.int64) * layer_height
+    heights = [cfg.first_layer_height] + [cfg.layer_height] * (layer_count - 1)
+
+    return planes, heights[:layer_count]
+
+
+def adaptive_layers(cfg, triangles, height):
+    """
+    Chooses the height of each layer by the slope of the surfaces within it
+
+    The height of the stairs a layer leaves on a surface (its cusp height) is the layer height
+    times the z component of the surface normal. Each layer gets the largest height within
+    [cfg.min_layer_height, cfg.max_layer_height] which keeps the cusp height of all surfaces it
+    intersects below the cusp height of cfg.layer_height on a surface with a slope of
+    ADAPTIVE_REFERENCE_ANGLE. Vertical walls get the maximum layer height. Layers are never
+    thinner than ADAPTIVE_MIN_LAYER_HEIGHT.
+
+    :param cfg: Instance of SlicerConfig
+    :param triangles: Instance of TriangleTable
+    :param height: Height of the model
+    :return: Tuple (numpy.array() with z coordinates of the planes as integers, list of layer heights)
+    """
+    precision = cfg.VERTEX_PRECISION
+    min_height = int(max(cfg.min_layer_height, ADAPTIVE_MIN_LAYER_HEIGHT) * precision)
+    max_height = max(min_height, int(cfg.max_layer_height * precision))
+    cusp_height = cfg.layer_height * precision * math.cos(math.radians(ADAPTIVE_REFERENCE_ANGLE))
+    top = int(height * precision)
+
+    # The model is divided into bins, each bin stores the maximum layer height
+    # which is allowed by all triangles within it
+    bin_size = int(ADAPTIVE_BIN_SIZE * precision)
+    allowed = numpy.full(top // bin_size + 2, max_height, numpy.int64)
+
+    normal_z = _normal_z(triangles)
+    with numpy.errstate(divide="ignore"):
+        triangle_height = numpy.clip(cusp_height / normal_z, min_height, max_height).astype(numpy.int64)
+
+    constraining = numpy.flatnonzero(triangle_height < max_height)
+    first_bin = triangles.v_min[constraining, 2].astype(numpy.int64) // bin_size
+    last_bin = numpy.minimum(triangles.v_max[constraining, 2].astype(numpy.int64) // bin_size, len(allowed) - 1)
+    counts = numpy.maximum(last_bin - first_bin + 1, 0)
+
+    # Triangles are processed in batches of about ADAPTIVE_BIN_BATCH_SIZE pairs of triangle and bin
+    ends = numpy.cumsum(counts)
+    batches = numpy.searchsorted(ends, numpy.arange(ADAPTIVE_BIN_BATCH_SIZE, ends[-1] if len(ends) else 0,
+                                                    ADAPTIVE_BIN_BATCH_SIZE))
+
+    for start, end in zip([0] + batches.tolist(), batches.tolist() + [len(counts)]):
+        batch_counts = counts[start:end]
+        bins = numpy.repeat(first_bin[start:end] - numpy.cumsum(batch_counts) + batch_counts, batch_counts) + \
+            numpy.arange(numpy.sum(batch_counts))
+        numpy.minimum.at(allowed, bins, numpy.repeat(triangle_height[constraining[start:end]], batch_counts))
+
+    z = int(cfg.first_layer_height * precision)
+    planes = [z]
+    heights = [cfg.first_layer_height]
+
+    while z < top:
+        # A thinner layer may reach fewer bins, so the height is reduced until it is allowed by all bins it reaches
+        layer_height = max_height
+        while True:
+            limit = max(min_height, int(numpy.min(allowed[z // bin_size:(z + layer_height) // bin_size + 1])))
+            if limit >= layer_height:
+                break
+
+            layer_height = limit
+
+        z += layer_height
+        planes.append(z)
+        heights.append(layer_height / precision)
+
+    return numpy.array(planes, numpy.int64), heights
+
+
+def _normal_z(triangles):
+    """
+    :param triangles: Instance of TriangleTable
+    :return: numpy.array() with the absolute z component of the unit normal of each triangle, 0 if degenerated
+    """
+    a = triangles.v_med.astype(numpy.float64) - triangles.v_min
+    b = triangles.v_max.astype(numpy.float64) - triangles.v_min
+    normals = numpy.cross(a, b)
+    length = numpy.linalg.norm(normals, axis=1)
+
+    return numpy.divide(numpy.abs(normals[:, 2]), length, out=numpy.zeros_like(length), where=length > 0)
@@ -0,0 +1,279 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+import numpy
+
+from .paths import Paths
+
+TWO_OPT_MAX_PATHS = 1000  # 2-opt needs quadratic time, larger tours keep their nearest neighbour order
+TWO_OPT_MAX_PASSES = 5
+
+
+class EntryGrid:
+    """
+    Uniform grid over the entry points of paths, used to find the entry point nearest to
+    the nozzle which belongs to a path not visited yet.
+
+    The entries of each grid column are stored consecutively, so the cells of a square
+    around a position are a few slices of one array. Entries of visited paths are skipped
+    and dropped by rebuilding the grid as soon as they are the majority.
+    """
+
+    def __init__(self, points, path_ids, path_count):
+        """
+        :param points: numpy.array() of shape (n, 2) with the entry points
+        :param path_ids: numpy.array() with the number of the path of each entry point
+        :param path_count: Number of paths
+        """
+        self.points = points.astype(numpy.float64)
+        self.path_ids = path_ids
+        self.entries_per_path = numpy.bincount(path_ids, minlength=path_count)
+        self.visited = numpy.zeros(path_count, bool)
+        self.alive_count = len(points)
+
+        self._build(numpy.arange(len(points)))
+
+    def _build(self, entries):
+        points = self.points[entries]
+
+        self.origin = points.min(axis=0)
+        extent = points.max(axis=0) - self.origin
+        # About one entry per cell, also for long thin layers
+        self.cell_size = max(1.0, math.ceil(extent.max() / math.sqrt(len(entries))))
+
+        cells = ((points - self.origin) // self.cell_size).astype(numpy.int64)
+        self.columns, self.rows = (int(n) + 1 for n in cells.max(axis=0))
+
+        cell_ids = cells[:, 0] * self.rows + cells[:, 1]
+        order = numpy.argsort(cell_ids, kind="stable")
+
+        self.entries = entries[order]
+        self.cell_starts = numpy.searchsorted(cell_ids[order], numpy.arange(self.columns * self.rows + 1))
+
+    def visit(self, path_id):
+        """
+        :param path_id: Number of the path whose entry points are removed
+        """
+        self.visited[path_id] = True
+        self.alive_count -= self.entries_per_path[path_id]
+
+        if 0 < self.alive_count < len(self.entries) // 2:
+            self._build(self.entries[~self.visited[self.path_ids[self.entries]]])
+
+    def nearest(self, position):
+        """
+        :param position: Position as numpy.array() (x, y)
+        :return: Index of the nearest entry point of a path not visited yet, there has to be one
+        """
+        cx, cy = ((position - self.origin) // self.cell_size).astype(numpy.int64).tolist()
+        radius = 0
+
+        while True:
+            candidates = self._square(cx, cy, radius)
+
+            if len(candidates):
+                distances = numpy.hypot(*(self.points[candidates] - position).T)
+                best = numpy.argmin(distances)
+
+                # Entry points outside the square can be nearer than the best one within it
+                reach = int(math.ceil(distances[best] / self.cell_size))
+                if reach > radius:
+                    candidates = self._square(cx, cy, reach)
+                    distances = numpy.hypot(*(self.points[candidates] - position).T)
+                    best = numpy.argmin(distances)
+
+                return candidates[best]
+
+            radius = 2 * radius + 1
+
+    def _square(self, cx, cy, radius):
+        """
+        :return: numpy.array() with the entries of unvisited paths within the cells around cell (cx, cy)
+        """
+        x0, x1 = max(cx - radius, 0), min(cx + radius, self.columns - 1)
+        y0, y1 = max(cy - radius, 0), min(cy + radius, self.rows - 1)
+
+        if x0 > x1 or y0 > y1:
+            return numpy.zeros(0, numpy.int64)
+
+        starts = self.cell_starts[numpy.arange(x0, x1 + 1) * self.rows + y0].tolist()
+        ends = self.cell_starts[numpy.arange(x0, x1 + 1) * self.rows + y1 + 1].tolist()
+
+        entries = numpy.concatenate([self.entries[start:end] for start, end in zip(starts, ends)])
+
+        return entries[~self.visited[self.path_ids[entries]]]
+
+
+def travel_distance(paths, position, closed):
+    """
+    :param paths: Instance of Paths, printed in their order
+    :param position: Position of the nozzle before the first path as numpy.array() (x, y)
+    :param closed: True if the paths are closed loops which end at their start point
+    :return: Tuple (sum of the travel moves to the start of each path, position after the last path)
+    """
+    if not len(paths):
+        return 0.0, position
+
+    starts = paths.coords[paths.offsets[:-1]].astype(numpy.float64)
+    ends = starts if closed else paths.coords[paths.offsets[1:] - 1].astype(numpy.float64)
+
+    moves = starts - numpy.vstack((position, ends[:-1]))
+    distance = numpy.sum(numpy.hypot(*moves.T))
+
+    return float(distance), ends[-1]
+
+
+def order_paths(paths, position, closed, two_opt=False):
+    """
+    Orders paths by a greedy nearest neighbour tour, starting at position. Open paths may be
+    reversed and closed loops start at their point nearest to the nozzle.
+
+    :param paths: Instance of Paths
+    :param position: Position of the nozzle before the first path as numpy.array() (x, y)
+    :param closed: True if the paths are closed loops which end at their start point
+    :param two_opt: Refine the tour by 2-opt moves
+    :return: Ordered instance of Paths
+    """
+    path_count = len(paths)
+    if path_count == 0:
+        return paths
+
+    lengths = paths.lengths
+    first = paths.offsets[:-1]
+    last = paths.offsets[1:] - 1
+
+    if closed:
+        # Loops can be entered at each of their points
+        entries = numpy.arange(paths.node_count)
+        path_ids = numpy.repeat(numpy.arange(path_count), lengths)
+    else:
+        entries = numpy.column_stack((first, last)).ravel()
+        path_ids = numpy.repeat(numpy.arange(path_count), 2)
+
+    grid = EntryGrid(paths.coords[entries], path_ids, path_count)
+    points = grid.points
+    start = position
+
+    order = numpy.zeros(path_count, numpy.int64)
+    entry_vertices = numpy.zeros(path_count, numpy.int64)
+
+    for i in range(path_count):
+        entry = grid.nearest(position)
+        path_id = path_ids[entry]
+        grid.visit(path_id)
+
+        order[i] = path_id
+        entry_vertices[i] = entries[entry]
+
+        if closed:
+            position = points[entry]
+        else:
+            # The other end of the path
+            position = points[entry ^ 1]
+
+    reverse = numpy.zeros(path_count, bool) if closed else entry_vertices == last[order]
+
+    if two_opt and 1 < path_count <= TWO_OPT_MAX_PATHS:
+        exit_vertices = entry_vertices if closed else numpy.where(reverse, first[order], last[order])
+
+        permutation, flipped = _two_opt(start,
+                                        paths.coords[entry_vertices].astype(numpy.float64),
+                                        paths.coords[exit_vertices].astype(numpy.float64))
+        order = order[permutation]
+
+        if closed:
+            entry_vertices = entry_vertices[permutation]
+        else:
+            # A reversed line is entered at its other end
+            reverse = reverse[permutation] ^ flipped
+            entry_vertices = numpy.where(reverse, last[order], first[order])
+
+    return _reorder(paths, order, entry_vertices, reverse)
+
+
+def _two_opt(position, entry_points, exit_points):
+    """
+    Improves a tour by reversing parts of it as long as this shortens the travel moves.
+    Reversing a part also reverses the direction of each path within it.
+
+    :param position: Position of the nozzle before the first path
+    :param entry_points: numpy.array() of shape (n, 2) with the entry point of each path in tour order
+    :param exit_points: numpy.array() of shape (n, 2) with the exit point of each path in tour order
+    :return: Tuple (permutation of the tour, numpy.array() which is True for each path with reversed direction)
+    """
+    count = len(entry_points)
+    permutation = numpy.arange(count)
+    flipped = numpy.zeros(count, bool)
+
+    entry_points = entry_points.copy()
+    exit_points = exit_points.copy()
+
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+
+        for i in range(count):
+            previous = position if i == 0 else exit_points[i - 1]
+
+            # Reverse the part from path i to path j, the last path has no successor
+            following = numpy.vstack((entry_points[i + 1:], entry_points[-1:]))
+            has_following = numpy.arange(i, count) < count - 1
+
+            old = numpy.hypot(*(entry_points[i] - previous)) + \
+                numpy.hypot(*(following - exit_points[i:]).T) * has_following
+            new = numpy.hypot(*(exit_points[i:] - previous).T) + \
+                numpy.hypot(*(following - entry_points[i]).T) * has_following
+
+            gain = old - new
+            j = int(numpy.argmax(gain))
+
+            if gain[j] > 1e-6:
+                j += i + 1
+                entry_points[i:j], exit_points[i:j] = exit_points[i:j][::-1].copy(), entry_points[i:j][::-1].copy()
+                permutation[i:j] = permutation[i:j][::-1].copy()
+                flipped[i:j] = ~flipped[i:j][::-1]
+                improved = True
+
+        if not improved:
+            break
+
+    return permutation, flipped
+
+
+def _reorder(paths, order, entry_vertices, reverse):
+    """
+    :param paths: Instance of Paths
+    :param order: numpy.array() with the numbers of the paths in their new order
+    :param entry_vertices: numpy.array() with the index of the first point of each path in its new order
+    :param reverse: numpy.array() which is True for each path in its new order whose points are reversed
+    :return: New instance of Paths
+    """
+    lengths = paths.lengths[order]
+    first = paths.offsets[:-1][order]
+
+    offsets = numpy.zeros(len(order) + 1, numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+
+    # Position of each point within its new path
+    local = numpy.arange(offsets[-1]) - numpy.repeat(offsets[:-1], lengths)
+    point_lengths = numpy.repeat(lengths, lengths)
+
+    rotated = (local + numpy.repeat(entry_vertices - first, lengths)) % point_lengths
+    reversed_ = point_lengths - 1 - local
+
+    source = numpy.repeat(first, lengths) + numpy.where(numpy.repeat(reverse, lengths), reversed_, rotated)
+
+    return Paths(paths.coords[source], offsets)
@@ -0,0 +1,71 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+from multiprocessing import shared_memory
+
+import numpy
+
+
+class SharedArrays:
+    """
+    Places numpy.arrays() in one block of shared memory, so worker processes can use them without copying
+
+    Instances can be pickled, in a worker process they attach to the shared memory of the creating process.
+    """
+    def __init__(self, arrays):
+        """
+        :param arrays: Dict with numpy.arrays() as values
+        """
+        self.layout = []  # List of tuples (key, dtype, shape, offset)
+
+        size = 0
+        for key, a in arrays.items():
+            self.layout.append((key, a.dtype.str, a.shape, size))
+            size += -(-a.nbytes // 8) * 8  # keep all arrays aligned to 8 bytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.owner = True
+
+        for key, a in self.arrays().items():
+            a[...] = arrays[key]
+
+    def arrays(self):
+        """
+        :return: Dict with views on the shared memory
+        """
+        return {key: numpy.ndarray(shape, dtype, self.shm.buf, offset) for key, dtype, shape, offset in self.layout}
+
+    def close(self):
+        """
+        Has to be called when the views returned by arrays() are not used anymore
+        """
+        self.shm.close()
+
+        if self.owner:
+            self.shm.unlink()
+
+    def __getstate__(self):
+        return self.layout, self.shm.name
+
+    def __setstate__(self, state):
+        self.layout, name = state
+        self.shm = shared_memory.SharedMemory(name)
+        self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,102 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+
+
+class Paths:
+    """
+    List of paths with integer coordinates
+
+    All points are stored in one contiguous array of shape (n, 2), path i consists of the
+    points coords[offsets[i]:offsets[i + 1]]. Paths are numpy views on this array, pyclipper
+    accepts them directly, so lists are only created for results returned by pyclipper.
+    """
+    __slots__ = ["coords", "offsets"]
+
+    def __init__(self, coords=None, offsets=None):
+        """
+        :param coords: numpy.array() of shape (n, 2) with the points of all paths
+        :param offsets: numpy.array() with the index of the first point of each path and the number of points
+        """
+        self.coords = numpy.zeros((0, 2), numpy.int32) if coords is None else coords
+        self.offsets = numpy.zeros(1, numpy.int64) if offsets is None else offsets
+
+    @classmethod
+    def from_pyclipper(cls, paths):
+        """
+        :param paths: List of paths [[x1, y1], [x2, y2], ...] as returned by pyclipper or other instance of Paths
+        :return: Instance of Paths
+        """
+        if isinstance(paths, Paths):
+            return paths
+
+        lengths = [len(path) for path in paths]
+        offsets = numpy.zeros(len(lengths) + 1, numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+
+        if offsets[-1] == 0:
+            return cls(offsets=offsets)
+
+        return cls(numpy.concatenate([numpy.asarray(path, numpy.int32).reshape((-1, 2)) for path in paths]), offsets)
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        :param array: numpy.array() of shape (number of paths, points per path, 2)
+        :return: Instance of Paths
+        """
+        count, points, _ = array.shape
+
+        return cls(array.reshape((-1, 2)).astype(numpy.int32), numpy.arange(count + 1, dtype=numpy.int64) * points)
+
+    def tessellate(self):
+        """
+        :return: Instance of Paths with straight segments only, that is self
+        """
+        return self
+
+    @property
+    def node_count(self):
+        return len(self.coords)
+
+    @property
+    def open_node_count(self):
+        """
+        :return: Number of segments if the paths are open, that is one less per path than node_count
+        """
+        return self.node_count - len(self)
+
+    @property
+    def lengths(self):
+        """
+        :return: numpy.array() with the number of points of each path
+        """
+        return numpy.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """
+        :return: View on the points of path i
+        """
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        coords = self.coords
+
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            yield coords[start:end]
@@ -13,219 +13,500 @@
 # You should have received a copy of the GNU General Public License
 # along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
 
-import math
+import collections
+import concurrent.futures
+import hashlib
+import itertools
 import numpy as np
 import pyclipper
 
-from .infill import line_infill
+from .arcs import PREVIEW_TOLERANCE, fit_arcs
+from .infill import line_infill, link_lines
+from .ordering import order_paths, travel_distance
+from .paths import Paths
 
-
-class EmptyLayerException(Exception):
-    pass
+# Instance of SlicerConfig of a worker process, see create_executor()
+_worker_cfg = None
 
 
 class Layer:
     MIN_DIST_BETWEEN_POINTS = 50
 
-    def __init__(self, cfg, contour, layer_no):
-        # List of [[x1, y1], [x2, y2], [x3, y3], ...] each defining an outline
-        self.outlines = []
-        # List of lists of [[x1, y1], [x2, y2], [x3, y3], ...] each defining an perimeter
-        # First list is outer perimeter, second list is first inner perimeter and so on
+    def __init__(self, cfg, layer_no, z, layer_height, outlines):
+        """
+        :param cfg: Instance of SlicerConfig
+        :param layer_no: Number of the layer
+        :param z: z coordinate of the plane of the layer
+        :param layer_height: Height of the layer
+        :param outlines: Instance of Paths, see merge_contour()
+        """
+        # Instance of Paths, each path defining an outline
+        self.outlines = outlines
+        # List of Paths, each path defining a perimeter
+        # First Paths are outer perimeter, second Paths are first inner perimeter and so on
         self.perimeters = []
-        # List of [[x1, y1], [x2, y2]] each defining an infill line
-        self.infill = []
+        # Instance of Paths, each path [[x1, y1], [x2, y2], ...] defining a zig-zag of infill lines
+        self.infill = Paths()
+        # Instance of Paths defining the regions which need solid infill, see SlicedModel.detect_solid_regions()
+        self.solid_regions = Paths()
 
         self.cfg = cfg
-        self.z = contour.z
+        self.z = z
         self.layer_no = layer_no
-        self.layer_height = (cfg.layer_height if layer_no > 0 else cfg.first_layer_height)
-        self.node_count = 0
+        self.layer_height = layer_height
+        # Length of the travel moves saved by order_paths()
+        self.travel_saved = 0.0
+        # Instance of Paths defining the regions within the perimeters which get infill, see create_perimeters()
+        self.regions = None
 
-        self._merge_intersecting_meshes(contour)
+    @property
+    def node_count(self):
+        """
+        :return: Number of segments of the layer, closed perimeters have one per point, open infill paths one less
+        """
+        return sum(perimeter.node_count for perimeter in self.perimeters) + self.infill.open_node_count
+
+    def set_perimeters(self, perimeters, regions=None):
+        """
+        :param perimeters: List of Paths, see create_perimeters(), may be shared with layers with the same outlines
+        :param regions: Regions within the perimeters, see create_perimeters()
+        """
+        self.perimeters = perimeters
+
+        if regions is not None:
+            self.regions = regions
+
+    def set_solid_infill(self, infill):
+        """
+        :param infill: Instance of Paths, see create_solid_infill(), may be shared with layers with the same
+                       solid regions and infill angle
+        """
+        self.infill = infill
+
+    def set_ordered_paths(self, perimeters, infill, travel_saved):
+        """
+        :param perimeters: Ordered perimeters, see order_layer_paths()
+        :param infill: Ordered infill
+        :param travel_saved: Length of the travel moves saved in mm
+        """
+        self.perimeters = perimeters
+        self.infill = infill
+        self.travel_saved = travel_saved
 
-    def _merge_intersecting_meshes(self, contour):
-        def dist_longer_than(p1, p2, d):
-            x = p2[0] - p1[0]
-            y = p2[1] - p1[1]
-            return d*d < x**2 + y**2
+    def to_svg(self, filename):
+        with open(filename, "w") as f:
+            f.write('<?xml version="1.0" standalone="no"?>\n')
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" viewBox="-100 -100 200 200">\n')
+            f.write('<path d="')
 
-        pc = pyclipper.Pyclipper()
+            for outline in self.outlines:
+                first = None
+                for x, y in outline:
+                    if first is None:
+                        f.write(f'M {x/self.cfg.VERTEX_PRECISION} {-y/self.cfg.VERTEX_PRECISION}')
+                        first = (x, y)
+                    else:
+                        f.write(f' L {x/self.cfg.VERTEX_PRECISION} {-y/self.cfg.VERTEX_PRECISION}')
 
-        for intersections in contour:
-            if len(intersections) > 1:
-                path = []
+                f.write(f' L {first[0]/self.cfg.VERTEX_PRECISION} {-first[1]/self.cfg.VERTEX_PRECISION}')
 
-                for intersection in intersections:
-                    if not path or path and dist_longer_than(path[-1], intersection.xy, self.MIN_DIST_BETWEEN_POINTS):
-                        path.append(intersection.xy)
+            f.write('" fill="none" stroke="black" stroke-width="0.1"/>')
+            f.write('</svg>\n')
 
-                if len(path) > 3:
-                    pc.AddPath(path, pyclipper.PT_SUBJECT, True)
 
-        try:
-            solution = pc.Execute(pyclipper.CT_UNION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+def create_executor(cfg):
+    """
+    :param cfg: Instance of SlicerConfig, which is passed to each worker process once
+    :return: Instance of concurrent.futures.ProcessPoolExecutor with cfg.processes worker processes
+    """
+    return concurrent.futures.ProcessPoolExecutor(cfg.processes, initializer=_init_worker, initargs=(cfg,))
 
-            for outline in solution:
-                self.outlines.append(outline)
-        except pyclipper.ClipperException:
-            # Nothing to clip, i.e. no paths were added to the Pyclipper instance
-            raise EmptyLayerException
 
-    def create_perimeters(self):
-        self._create_external_perimeters()
-        self._create_internal_perimeters()
+def _init_worker(cfg):
+    global _worker_cfg
+    _worker_cfg = cfg
 
-    def _create_external_perimeters(self):
-        inset = self.cfg.extrusion_width_external_perimeter / 2
 
-        solution = inset_outlines(self.cfg, self.layer_height, self.outlines, 1, inset)
+def _run_chunk(func, chunk):
+    """
+    Runs in a worker process
 
-        if solution:
-            for path in solution:
-                self.node_count += len(path)
+    :param func: Function called as func(cfg, *args) for each tuple args in chunk
+    :param chunk: List of tuples
+    :return: List with the results of func
+    """
+    return [func(_worker_cfg, *args) for args in chunk]
 
-            self.perimeters.append(solution)
-        else:
-            raise EmptyLayerException
 
-    def _create_internal_perimeters(self):
-        inset = self.cfg.extrusion_width / 2
+def merge_contour(cfg, contour):
+    """
+    Merges the loops of intersections of a layer into closed outlines, runs in a worker process if
+    layers are created in parallel
+
+    :param cfg: Instance of SlicerConfig
+    :param contour: Instance of slicer.Contour
+    :return: Tuple (z, layer height, outlines as instance of Paths) or None if the layer is empty
+    """
+    def dist_longer_than(p1, p2, d):
+        x = p2[0] - p1[0]
+        y = p2[1] - p1[1]
+        return d*d < x**2 + y**2
 
-        for i in range(1, self.cfg.perimeters):
-            solution = inset_outlines(self.cfg, self.layer_height, self.outlines, i + 1, inset)
+    pc = pyclipper.Pyclipper()
 
-            if solution:
-                for path in solution:
-                    self.node_count += len(path)
+    for loop in contour:
+        if len(loop) > 1:
+            path = []
 
-                self.perimeters.append(solution)
-            else:
-                break  # Nothing more to do here
+            for point in loop.tolist():
+                if not path or path and dist_longer_than(path[-1], point, Layer.MIN_DIST_BETWEEN_POINTS):
+                    path.append(point)
+
+            if len(path) > 3:
+                pc.AddPath(path, pyclipper.PT_SUBJECT, True)
+
+    try:
+        solution = pc.Execute(pyclipper.CT_UNION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+    except pyclipper.ClipperException:
+        # Nothing to clip, i.e. no paths were added to the Pyclipper instance
+        return None
+
+    return contour.z, contour.height, Paths.from_pyclipper(solution)
+
+
+def create_perimeters(cfg, layer_height, outlines):
+    """
+    Creates the perimeters of a layer, runs in a worker process if layers are processed in parallel
+
+    :param cfg: Instance of SlicerConfig
+    :param layer_height: Height of the layer
+    :param outlines: Outlines of the layer
+    :return: Tuple (list of Paths, first the outer perimeter, regions within the perimeters which get infill)
+             or None if the layer has no perimeters
+    """
+    offsets = {}
+
+    external = cached_inset_outlines(cfg, offsets, layer_height, outlines, 1,
+                                     cfg.extrusion_width_external_perimeter / 2)
+    if not external:
+        return None
+
+    perimeters = [external]
+
+    for i in range(1, cfg.perimeters):
+        solution = cached_inset_outlines(cfg, offsets, layer_height, outlines, i + 1, cfg.extrusion_width / 2)
 
-    def create_solid_infill(self):
-        # Boundaries for infill
-        inset = self.cfg.extrusion_width * self.cfg.infill_overlap / 100.0
-        solution = inset_outlines(self.cfg, self.layer_height, self.outlines, self.cfg.perimeters, inset)
         if solution:
-            infill = line_infill(self.cfg, self.layer_no, solution)
+            perimeters.append(solution)
+        else:
+            break  # Nothing more to do here
 
-            self.infill.extend(infill)
-            self.node_count += 2 * len(infill)
+    # The innermost perimeter and the regions are insets of the same offset of the outlines
+    regions = cached_inset_outlines(cfg, offsets, layer_height, outlines, cfg.perimeters, infill_inset(cfg))
 
-    def to_svg(self, filename):
-        with open(filename, "w") as f:
-            f.write('<?xml version="1.0" standalone="no"?>\n')
-            f.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" viewBox="-100 -100 200 200">\n')
-            f.write('<path d="')
+    return perimeters, regions
 
-            for outline in self.outlines:
-                first = None
-                for x, y in outline:
-                    if first is None:
-                        f.write(f'M {x/self.cfg.VERTEX_PRECISION} {-y/self.cfg.VERTEX_PRECISION}')
-                        first = (x, y)
-                    else:
-                        f.write(f' L {x/self.cfg.VERTEX_PRECISION} {-y/self.cfg.VERTEX_PRECISION}')
 
-                f.write(f' L {first[0]/self.cfg.VERTEX_PRECISION} {-first[1]/self.cfg.VERTEX_PRECISION}')
+def create_solid_infill(cfg, layer_no, solid_regions):
+    """
+    Creates the solid infill of a layer, runs in a worker process if layers are processed in parallel
 
-            f.write('" fill="none" stroke="black" stroke-width="0.1"/>')
-            f.write('</svg>\n')
+    :param cfg: Instance of SlicerConfig
+    :param layer_no: Number of the layer, the infill angle alternates between odd and even layers
+    :param solid_regions: Regions of the layer which need solid infill
+    :return: Instance of Paths with zig-zags of infill lines
+    """
+    lines = line_infill(cfg, layer_no, solid_regions)
+
+    return Paths.from_pyclipper(link_lines(cfg, layer_no, lines, solid_regions))
+
+
+def exposed_regions(cfg, layer_height, regions, outlines_above, outlines_below):
+    """
+    Computes the regions of a layer which are not covered by the layer above or below, runs in a worker
+    process if layers are processed in parallel
+
+    :param cfg: Instance of SlicerConfig
+    :param layer_height: Height of the layer
+    :param regions: Regions of the layer within its perimeters, see create_perimeters()
+    :param outlines_above: Outlines of the layer above, empty for the last layer, None if not needed
+    :param outlines_below: Outlines of the layer below, empty for the first layer, None if not needed
+    :return: Tuple (Paths exposed at the top, Paths exposed at the bottom)
+    """
+    inset = infill_inset(cfg)
+    result = []
+
+    for covering_outlines in (outlines_above, outlines_below):
+        exposed = Paths()
+
+        if covering_outlines is not None:
+            exposed = clip_paths(regions, covering_outlines, pyclipper.CT_DIFFERENCE)
+            if exposed:
+                # Offset exposed regions by number of perimeters, so that the solid infill of the next layer
+                # has something to sit on
+                exposed = inset_outlines(cfg, layer_height, exposed, -cfg.perimeters, -inset)
+
+        result.append(exposed)
+
+    return tuple(result)
+
+
+def trim_solid_regions(cfg, exposed, regions):
+    """
+    Runs in a worker process if layers are processed in parallel
+
+    :param cfg: Instance of SlicerConfig
+    :param exposed: List of closed paths exposed at the top or the bottom, propagated to the layer
+    :param regions: Regions of the layer within its perimeters
+    :return: Instance of Paths with the regions which need solid infill
+    """
+    return clip_paths(exposed, regions, pyclipper.CT_INTERSECTION)
+
+
+def order_layer_paths(cfg, perimeters, infill, position):
+    """
+    Orders the loops of each perimeter and the infill lines of a layer to shorten the travel moves between
+    them, runs in a worker process if layers are processed in parallel. Paths are printed in the order
+    of the perimeters followed by the infill.
+
+    :param cfg: Instance of SlicerConfig
+    :param perimeters: List of Paths
+    :param infill: Instance of Paths
+    :param position: Position of the nozzle before the layer as numpy.array() (x, y)
+    :return: Tuple (ordered perimeters, ordered infill, length of the travel moves saved in mm)
+    """
+    position_before = position_after = position
+    travel_before = travel_after = 0.0
+
+    ordered = []
+    for paths, closed in [(perimeter, True) for perimeter in perimeters] + [(infill, False)]:
+        travel, position_before = travel_distance(paths, position_before, closed)
+        travel_before += travel
+
+        paths = order_paths(paths, position_after, closed, cfg.two_opt)
+        travel, position_after = travel_distance(paths, position_after, closed)
+        travel_after += travel
+
+        ordered.append(paths)
+
+    # The greedy order is not optimal, it may even be worse than the sliced one
+    if travel_after > travel_before:
+        return list(perimeters), infill, 0.0
+
+    infill = ordered.pop()
+
+    return ordered, infill, (travel_before - travel_after) / cfg.VERTEX_PRECISION
+
+
+def fit_layer_arcs(cfg, perimeters):
+    """
+    Replaces runs of points of the perimeters of a layer on circles by arcs, see arcs.fit_arcs(),
+    runs in a worker process if layers are processed in parallel
+
+    :param cfg: Instance of SlicerConfig
+    :param perimeters: List of Paths
+    :return: List of arcs.ArcPaths
+    """
+    tolerance = cfg.arc_tolerance * cfg.VERTEX_PRECISION
+    preview_tolerance = PREVIEW_TOLERANCE * cfg.VERTEX_PRECISION
+
+    return [fit_arcs(perimeter, tolerance, preview_tolerance) for perimeter in perimeters]
 
 
 class SlicedModel:
-    def __init__(self, cfg, bounding_box, contours):
-        self.layers = []
+    LAYER_CHUNK_SIZE = 8  # Number of layers sent to a worker process at once
+    CHUNKS_PER_PROCESS = 2  # Number of chunks queued for each worker process
+
+    def __init__(self, cfg, bounding_box, contours, executor=None, merged=False):
+        """
+        :param cfg: Instance of SlicerConfig, with cfg.processes > 1 the layers are processed in worker processes
+        :param bounding_box: Instance of model.BoundingBox
+        :param contours: Iterable of slicer.Contour, one for each layer bottom-up, e.g. Slicer.layers()
+        :param executor: Executor returned by create_executor(cfg) or None to create one when needed.
+                         The sliced model shuts it down in close().
+        :param merged: True if contours contains the results of merge_contour() instead, e.g. merged by
+                       the worker processes which sliced the contours
+        """
         self.cfg = cfg
         self.bounding_box = bounding_box
+        self.executor = executor
 
-        for layer_no, contour in enumerate(contours):
-            try:
-                self.layers.append(Layer(cfg, contour, layer_no))
-            except EmptyLayerException:
-                pass
+        if merged:
+            layers = contours
+        else:
+            layers = self._map(merge_contour, ((contour,) for contour in contours))
+        self.layers = [Layer(cfg, layer_no, *layer) for layer_no, layer in enumerate(layers) if layer is not None]
 
-    def create_perimeters(self):
-        try:
-            for layer in self.layers:
-                layer.create_perimeters()
-        except EmptyLayerException:
-            self.layers.remove(layer)
+    def close(self):
+        """
+        Shuts down the worker processes, they are started again if needed
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
 
-    def create_infill(self):
-        bottom_layers = self.cfg.bottom_layers
-        top_layers = self.cfg.top_layers
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _map(self, func, args):
+        """
+        Calls func(cfg, *a) for each tuple a in args, in worker processes if cfg.processes > 1.
+        Only the arguments and the results are transferred, the worker processes are kept for
+        all calls. At most CHUNKS_PER_PROCESS chunks of LAYER_CHUNK_SIZE layers per process
+        are queued, so a generator passed as args is consumed while the results are produced.
+
+        :return: Generator yielding the results of func in the order of args
+        """
+        if self.cfg.processes <= 1:
+            for a in args:
+                yield func(self.cfg, *a)
 
-        if bottom_layers + top_layers >= len(self.layers):
-            bottom_layers = 1
-            top_layers = len(self.layers) - 1
+            return
 
-        if bottom_layers > 0:
-            for layer in self.layers[:bottom_layers]:
-                layer.create_solid_infill()
+        if self.executor is None:
+            self.executor = create_executor(self.cfg)
 
-        if top_layers > 0:
-            for layer in self.layers[-top_layers:]:
-                layer.create_solid_infill()
+        args = iter(args)
+        pending = collections.deque()
 
-        self.create_island_top_layers(bottom_layers, top_layers)
+        for chunk in iter(lambda: list(itertools.islice(args, self.LAYER_CHUNK_SIZE)), []):
+            pending.append(self.executor.submit(_run_chunk, func, chunk))
 
-    # TODO needs work
-    def create_island_top_layers(self, bottom_layers, top_layers):
-        pc = pyclipper.Pyclipper()
+            if len(pending) >= self.cfg.processes * self.CHUNKS_PER_PROCESS:
+                yield from pending.popleft().result()
 
-        inset = self.cfg.extrusion_width * self.cfg.infill_overlap / 100.0
+        while pending:
+            yield from pending.popleft().result()
 
-        # Loop backwards through the layers
-        for i in reversed(range(self.cfg.bottom_layers, len(self.layers))):
-            lower_layer = self.layers[i - 1]
-            current_layer = self.layers[i]
+    def _map_unique(self, func, layers, key, args, apply):
+        """
+        Calls func like _map(), but only with the arguments args(layer) of the first of all layers
+        with the same key. Its result is passed to apply(layer, result) for all of these layers,
+        so they share it.
 
-            # Inset lower layer by number of perimeters
-            lower_layer_inset = inset_outlines(self.cfg, lower_layer.layer_height, lower_layer.outlines,
-                                               self.cfg.perimeters, inset)
-            if lower_layer_inset:
-                # Subtract current layer from inset of lower layer
-                pc.AddPaths(current_layer.outlines, pyclipper.PT_CLIP, True)
-                pc.AddPaths(lower_layer_inset, pyclipper.PT_SUBJECT, True)
+        :return: List of the layers for which the result of func is not None
+        """
+        keys = [key(layer) for layer in layers]
 
-                solution = pc.Execute(pyclipper.CT_DIFFERENCE, pyclipper.PFT_EVENODD, pyclipper.PFT_EVENODD)
-                if solution:   # Found an island
-                    # Offset result by number of perimeters so that next layer has something to sit on
-                    solution = inset_outlines(self.cfg, lower_layer.layer_height, solution,
-                                              -self.cfg.perimeters, -inset)
+        first_layers = {}  # key: key of layers, value: first layer with this key
+        for k, layer in zip(keys, layers):
+            first_layers.setdefault(k, layer)
+
+        results = dict(zip(first_layers, self._map(func, (args(layer) for layer in first_layers.values()))))
+
+        result = []
+        for k, layer in zip(keys, layers):
+            if results[k] is not None:
+                apply(layer, results[k])
+                result.append(layer)
+
+        return result
+
+    def create_perimeters(self):
+        # Prismatic parts have many layers with identical outlines, their perimeters are only created once
+        self.layers = self._map_unique(create_perimeters, self.layers,
+                                       lambda layer: (layer.layer_height, paths_digest(layer.outlines)),
+                                       lambda layer: (layer.layer_height, layer.outlines),
+                                       lambda layer, result: layer.set_perimeters(*result))
+
+    def create_infill(self):
+        self.detect_solid_regions()
+
+        # Infill angle alternates between odd and even layers
+        self._map_unique(create_solid_infill, [layer for layer in self.layers if layer.solid_regions],
+                         lambda layer: (layer.layer_no % 2, paths_digest(layer.solid_regions)),
+                         lambda layer: (layer.layer_no, layer.solid_regions),
+                         Layer.set_solid_infill)
+
+    def order_paths(self):
+        """
+        Orders the perimeters and the infill of each layer to shorten the travel moves between them
+
+        Each layer is ordered starting at the front left corner of the model instead of the
+        end of the layer below, so layers with shared paths can share their ordered paths, too.
+        Layers keep their sliced order if it has shorter travel moves.
+
+        :return: Total length of the travel moves saved in mm
+        """
+        # The sliced model is centered on the origin
+        position = np.array([-(self.bounding_box.x_max - self.bounding_box.x_min) / 2,
+                             -(self.bounding_box.y_max - self.bounding_box.y_min) / 2]) * self.cfg.VERTEX_PRECISION
+
+        # Layers whose infill is empty do not share it, but an empty infill does not change the order
+        self._map_unique(order_layer_paths, self.layers,
+                         lambda layer: (id(layer.perimeters), id(layer.infill) if layer.infill else None),
+                         lambda layer: (layer.perimeters, layer.infill, position),
+                         lambda layer, result: layer.set_ordered_paths(*result))
+
+        return sum(layer.travel_saved for layer in self.layers)
+
+    def fit_arcs(self):
+        """
+        Replaces runs of points of the perimeters on circles by arcs, should be done after order_paths()
+        """
+        self._map_unique(fit_layer_arcs, self.layers,
+                         lambda layer: id(layer.perimeters),
+                         lambda layer: (layer.perimeters,),
+                         Layer.set_perimeters)
+
+    def detect_solid_regions(self):
+        """
+        Sets Layer.solid_regions to the regions of each layer which need solid infill, should be done after
+        create_perimeters()
+
+        A region of a layer is exposed at the top (bottom) if it is not covered by the layer above (below).
+        The layers below a top surface need solid infill for the number of top layers, the layers above a
+        bottom surface for the number of bottom layers. The first and the last layer are entirely exposed.
+
+        Exposed regions are computed once for each layer and propagated with a sliding window in one
+        pass downwards and one pass upwards, so the run time is proportional to the number of layers.
+        Only the propagation runs one layer after another, the exposed and the solid regions of each
+        layer are computed in worker processes if layers are processed in parallel.
+        """
+        top_layers = self.cfg.top_layers
+        bottom_layers = self.cfg.bottom_layers
+        empty = Paths()
 
-                    # Trim result
-                    pc.Clear()
-                    pc.AddPaths(solution, pyclipper.PT_SUBJECT, True)
-                    pc.AddPaths(lower_layer_inset, pyclipper.PT_CLIP, True)
+        def neighbours():
+            for i, layer in enumerate(self.layers):
+                above = self.layers[i + 1].outlines if i + 1 < len(self.layers) else empty
+                below = self.layers[i - 1].outlines if i > 0 else empty
 
-                    infill_boundary = pc.Execute(pyclipper.CT_INTERSECTION, pyclipper.PFT_EVENODD, pyclipper.PFT_EVENODD)
-                    if infill_boundary:
-                        infill = line_infill(self.cfg, lower_layer.layer_no, infill_boundary)
+                yield (layer.layer_height, layer.regions,
+                       above if top_layers > 0 else None,
+                       below if bottom_layers > 0 else None)
 
-                        lower_layer.infill.extend(infill)
-                        lower_layer.node_count += 2 * len(infill)
+        exposed = list(self._map(exposed_regions, neighbours()))
 
-                        for j in range(top_layers):
-                            if i - 1 - j <= self.cfg.bottom_layers:
-                                break
+        below_top = self._propagate_exposed_regions([top for top, _ in exposed],
+                                                    reversed(range(len(self.layers))), top_layers)
+        above_bottom = self._propagate_exposed_regions([bottom for _, bottom in exposed],
+                                                       range(len(self.layers)), bottom_layers)
 
-                            layer = self.layers[i - 1 - j]
+        args = ((top + bottom, layer.regions) for layer, top, bottom in zip(self.layers, below_top, above_bottom))
 
-                            pc.Clear()
-                            pc.AddPaths(infill_boundary, pyclipper.PT_SUBJECT, True)
-                            pc.AddPaths(layer.outlines, pyclipper.PT_CLIP, True)
+        for layer, solid_regions in zip(self.layers, self._map(trim_solid_regions, args)):
+            layer.solid_regions = solid_regions
 
-                            solution = pc.Execute(pyclipper.CT_INTERSECTION, pyclipper.PFT_EVENODD, pyclipper.PFT_EVENODD)
-                            if solution:
-                                infill = line_infill(self.cfg, layer.layer_no, infill_boundary)
+    def _propagate_exposed_regions(self, exposed, order, layer_count):
+        """
+        :param exposed: List with the exposed regions of each layer, see exposed_regions()
+        :param order: Layer numbers in order of propagation, each layer is covered by the layer before it
+        :param layer_count: Number of layers an exposed region is propagated to, including its own layer
+        :return: List with the exposed regions propagated to each layer, not trimmed to its region yet
+        """
+        result = [[] for _ in self.layers]
+        window = collections.deque(maxlen=layer_count)
 
-                                layer.infill.extend(infill)
-                                layer.node_count += 2 * len(infill)
+        for i in order:
+            if layer_count > 0:
+                window.append(exposed[i])
+                result[i] = [path for paths in window for path in paths]
 
-            pc.Clear()
+        return result
 
     @property
     def layer_count(self):
@@ -239,6 +520,29 @@ class SlicedModel:
         return result
 
 
+def infill_inset(cfg):
+    """
+    :return: Inset of the regions within the perimeters which get infill, see inset_outlines()
+    """
+    return cfg.extrusion_width * cfg.infill_overlap / 100.0
+
+
+def cached_inset_outlines(cfg, offsets, layer_height, outlines, nr_of_perimeters, inset):
+    """
+    Same as inset_outlines(), but the offset by the number of perimeters is only computed once
+    for all insets of the outlines
+
+    :param offsets: Dict with the offsets of outlines, key: (nr_of_perimeters, layer_height)
+    :return: Instance of Paths
+    """
+    key = (nr_of_perimeters, layer_height)
+
+    if key not in offsets:
+        offsets[key] = offset_outlines(cfg, layer_height, outlines, nr_of_perimeters)
+
+    return offset_paths(cfg, offsets[key], inset)
+
+
 def inset_outlines(cfg, layer_height, outlines, nr_of_perimeters, inset):
     """
     Offsets the outline of this layer by the given number of perimeters
@@ -247,22 +551,83 @@ def inset_outlines(cfg, layer_height, outlines, nr_of_perimeters, inset):
 
     :param cfg: Instance of SlicerConfig
     :param layer_height: Layer height
-    :param outlines: List of closed paths which should be offset
+    :param outlines: List of closed paths or instance of Paths which should be offset
     :param nr_of_perimeters: How many perimeters should be offset
     :param inset: Value to subtract after offsetting
-    :return: Result of PyclipperOffset.Execute()
+    :return: Instance of Paths
     """
-    pco = pyclipper.PyclipperOffset()
+    return offset_paths(cfg, offset_outlines(cfg, layer_height, outlines, nr_of_perimeters), inset)
+
 
+def offset_outlines(cfg, layer_height, outlines, nr_of_perimeters):
+    """
+    First step of inset_outlines(), offsets the outlines by the given number of perimeters
+
+    :return: Instance of Paths
+    """
     offset = cfg.extrusion_width_external_perimeter
     offset += (nr_of_perimeters - 1) * cfg.extrusion_width
     offset -= (nr_of_perimeters - 1) * layer_height * cfg.extrusion_overlap_factor
 
-    pco.AddPaths(outlines, pyclipper.JT_MITER, pyclipper.ET_CLOSEDPOLYGON)
+    return offset_paths(cfg, outlines, -offset)
+
+
+def offset_paths(cfg, paths, offset):
+    """
+    :param cfg: Instance of SlicerConfig
+    :param paths: List of closed paths or instance of Paths
+    :param offset: Offset in mm, negative values shrink the paths
+    :return: Instance of Paths
+    """
+    pco = pyclipper.PyclipperOffset()
+    pco.AddPaths(paths, pyclipper.JT_MITER, pyclipper.ET_CLOSEDPOLYGON)
+
+    return Paths.from_pyclipper(pco.Execute(offset * cfg.VERTEX_PRECISION))
+
+
+def paths_digest(paths):
+    """
+    Paths with the same shape have the same digest, even if they differ by collinear points,
+    by their start points or by their order. E.g. the outlines of a prismatic part contain
+    different collinear points in each layer where the plane crosses diagonal edges.
+
+    :param paths: List of closed paths with integer coordinates or instance of Paths
+    :return: Digest of the shape of the paths
+    """
+    normalized = []
+
+    for path in pyclipper.CleanPolygons(paths):
+        path = np.asarray(path, np.int64)
+        start = np.lexsort((path[:, 1], path[:, 0]))[0]
+        normalized.append(np.roll(path, -start, axis=0).tobytes())
+
+    h = hashlib.blake2b(digest_size=16)
+
+    for path in sorted(normalized):
+        h.update(len(path).to_bytes(8, "little"))
+        h.update(path)
+
+    return h.digest()
+
+
+def clip_paths(subject, clip, clip_type):
+    """
+    :param subject: List of closed paths or instance of Paths
+    :param clip: List of closed paths or instance of Paths
+    :param clip_type: One of pyclipper.CT_INTERSECTION, pyclipper.CT_UNION, pyclipper.CT_DIFFERENCE or pyclipper.CT_XOR
+    :return: Instance of Paths, empty if subject is empty
+    """
+    pc = pyclipper.Pyclipper()
 
-    solution = pco.Execute(-offset * cfg.VERTEX_PRECISION)
+    try:
+        pc.AddPaths(subject, pyclipper.PT_SUBJECT, True)
+    except pyclipper.ClipperException:
+        # No valid paths in subject
+        return Paths()
 
-    pco.Clear()
-    pco.AddPaths(solution, pyclipper.JT_MITER, pyclipper.ET_CLOSEDPOLYGON)
+    try:
+        pc.AddPaths(clip, pyclipper.PT_CLIP, True)
+    except pyclipper.ClipperException:
+        pass  # Nothing to clip with
 
-    return pco.Execute(inset * cfg.VERTEX_PRECISION)
+    return Paths.from_pyclipper(pc.Execute(clip_type, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO))
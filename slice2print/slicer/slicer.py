@@ -17,290 +17,308 @@
 # construction using STL files" by Zhengyan Zhang and Sanjay Joshi
 
 import collections
-import math
+import concurrent.futures
+import copy
+import itertools
 
 import numpy
 
-from .sliced_model import SlicedModel
+from .config import SlicingEngine
+from .layerheights import adaptive_layers, uniform_layers
+from .parallel import SharedArrays
+from .paths import Paths
+from .sliced_model import SlicedModel, create_executor, merge_contour
+from .topology import EdgeTable
+from .triangles import TriangleTable
 
 
-class Vertex:
-    __slots__ = ["x", "y", "z", "flag"]
+class Contour:
+    """
+    Contains the contour of one layer
 
-    def __init__(self, x, y, z, flag=None):
-        self.x = x
-        self.y = y
+    The intersections are collected as arrays and linked into loops when the contour is used,
+    so all intersections have to be added before. An intersection is followed by the intersection
+    whose forward edge is its backward edge, so the successor of each intersection is found by a
+    binary search in the sorted edge ids.
+    """
+    def __init__(self, z, height):
+        """
+        :param z: z coordinate of the plane of the layer
+        :param height: Height of the layer
+        """
         self.z = z
-        self.flag = flag
-
-    def __eq__(self, other):
-        # We don't care about the flag here
-        return self.x == other.x and self.y == other.y and self.z == other.z
+        self.height = height
+        self.chunks = []  # List of tuples (x, y, forward edges, backward edges) added but not linked yet
+        self._loops = Paths()
+        self._closed = numpy.zeros(0, bool)
 
+    def add(self, x, y, forward_edges, backward_edges):
+        """
+        Adds intersections of the plane of the layer with triangles
 
-class Edge:
-    __slots__ = ["p", "q"]
+        :param x: numpy.array() with the x coordinates of the intersections
+        :param y: numpy.array() with the y coordinates of the intersections
+        :param forward_edges: numpy.array() with the ids of the edges the intersections are on
+        :param backward_edges: numpy.array() with the ids of the edges where the contour enters the triangles
+        """
+        self.chunks.append((x, y, forward_edges, backward_edges))
 
-    def __init__(self, p, q):
+    @property
+    def loops(self):
         """
-        :param p: Instance of Vertex
-        :param q: Instance of Vertex
+        :return: Instance of Paths, each path with the points of the linked intersections
         """
-        self.p = p
-        self.q = q
+        self._link()
+        return self._loops
 
-    def get_point_at_z(self, z):
+    @property
+    def closed(self):
         """
-        Calculates point at z between p and q
-        :param z: z
-        :return: Calculated point as tuple(x, y)
+        :return: numpy.array() which is True for each loop whose last intersection is followed by its first
         """
-        # Vector form of the equation of a line
-        #     X = P + s * U with U = Q - P
-        #
-        # Parametric form of the equation of a line
-        #     x1 = p1 + s * u1 with u1 = q1 - p1
-        #     x2 = p2 + s * u2 with u2 = q2 - p2
-        #     x3 = p3 + s * u3 with u3 = q3 - p3
-        #
-        # Known values for variables
-        #     x3 = z, p3 = p.z, u3 = q.z - p.z
-        #
-        # s can be calculated
-        #     s = (z - p.z) / (q.z - p.z)
-
-        s = (z - self.p.z) / (self.q.z - self.p.z)
-
-        return int(self.p.x + s * (self.q.x - self.p.x)), \
-            int(self.p.y + s * (self.q.y - self.p.y))
-
-    def __eq__(self, other):
-        return self.p == other.p and self.q == other.q
-
-
-class Intersection:
-    """
-    Contains the intersection of a z plane with a triangle
-    and the two edges of the triangle which were intersected
-    """
-    __slots__ = ["vertex", "forward_edge", "backward_edge", "layer"]
+        self._link()
+        return self._closed
 
-    def __init__(self, vertex, forward_edge, backward_edge, layer):
-        self.vertex = vertex
-        self.forward_edge = forward_edge
-        self.backward_edge = backward_edge
-        self.layer = layer
+    def _link(self):
+        if not self.chunks:
+            return
 
-    @property
-    def xy(self):
-        return self.vertex.x, self.vertex.y
+        x, y, forward_edges, backward_edges = (numpy.concatenate(a) for a in zip(*self.chunks))
+        self.chunks = []
 
+        successors = self._successors(forward_edges, backward_edges)
 
-class Triangle:
-    __slots__ = ["v1", "v2", "v3", "vz_min", "vz_med", "vz_max", "s1", "s2", "s3"]
+        has_predecessor = numpy.zeros(len(successors), bool)
+        has_predecessor[successors[successors >= 0]] = True
+
+        if has_predecessor.all():
+            # Every intersection has exactly one predecessor, so the intersections form closed loops only
+            sequence, lengths = self._follow_loops(successors)
+            closed = numpy.ones(len(lengths), bool)
+        else:
+            sequence, lengths, closed = self._follow_chains(successors, numpy.flatnonzero(~has_predecessor))
 
-    def __init__(self, v1, v2, v3):
+        offsets = numpy.zeros(len(lengths) + 1, numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+
+        self._loops = Paths(numpy.stack((x[sequence], y[sequence]), axis=1).astype(numpy.int32), offsets)
+        self._closed = numpy.asarray(closed, bool)
+
+    @staticmethod
+    def _follow_loops(successors):
         """
-        :param v1: numpy.array([x1, y1, z1])
-        :param v2: numpy.array([x2, y2, z2])
-        :param v3: numpy.array([x3, y3, z3])
+        Orders the intersections loop by loop without visiting them one after another. Each loop starts
+        at its intersection with the highest index, its other intersections are ranked by their distance
+        to the end of the loop. Both are found by pointer jumping, every step doubles the distance covered.
+
+        Linking the intersections one by one in the order they were added closes each loop with its
+        last intersection, which becomes its first. Starting there keeps the outlines merged from the
+        loops the same, as they are thinned out from the start of each loop.
+
+        :param successors: numpy.array() with the successor of each intersection, see _successors()
+        :return: Tuple (indices of the intersections in order of the loops, list with the length of each loop)
         """
-        self.v1 = Vertex(*v1, 0)
-        self.v2 = Vertex(*v2, 1)
-        self.v3 = Vertex(*v3, 2)
-
-        if self.v1.z >= self.v2.z >= self.v3.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v1, self.v2, self.v3
-        elif self.v1.z >= self.v3.z >= self.v2.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v1, self.v3, self.v2
-        elif self.v2.z >= self.v1.z >= self.v3.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v2, self.v1, self.v3
-        elif self.v2.z >= self.v3.z >= self.v1.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v2, self.v3, self.v1
-        elif self.v3.z >= self.v1.z >= self.v2.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v3, self.v1, self.v2
-        elif self.v3.z >= self.v2.z >= self.v1.z:
-            self.vz_max, self.vz_med, self.vz_min = self.v3, self.v2, self.v1
-
-        self.s1 = Edge(self.vz_min, self.vz_max)
-        self.s2 = Edge(self.vz_min, self.vz_med)
-        self.s3 = Edge(self.vz_med, self.vz_max)
-
-    def get_forward_edge(self):
+        steps = max(1, len(successors).bit_length())
+
+        start = numpy.arange(len(successors))
+        jump = successors
+        for _ in range(steps):
+            start = numpy.maximum(start, start[jump])
+            jump = jump[jump]
+
+        # Last intersection of each loop is followed by its start
+        jump = numpy.where(successors == start, -1, successors)
+        distance = (jump >= 0).astype(numpy.int64)
+        for _ in range(steps):
+            valid = jump >= 0
+            distance = distance + numpy.where(valid, distance[jump], 0)
+            jump = numpy.where(valid, jump[jump], -1)
+
+        sequence = numpy.lexsort((-distance, start))
+        lengths = numpy.unique(start, return_counts=True)[1]
+
+        return sequence, lengths
+
+    @staticmethod
+    def _follow_chains(successors, heads):
         """
-        :return: tuple (lower forward edge, upper forward edge, lower backward edge, upper backward edge)
+        Orders the intersections by following each chain from its first intersection, used if there are
+        open chains, e.g. at non manifold edges
+
+        :param successors: numpy.array() with the successor of each intersection, see _successors()
+        :param heads: numpy.array() with the intersections without predecessor
+        :return: Tuple (indices of the intersections in order of the chains, list with the length of each chain,
+                 list which is True for each closed chain)
         """
+        successors = successors.tolist()
+        visited = bytearray(len(successors))
+        sequence = []
+        lengths = []
+        closed = []
+
+        # Closed loops start at their intersection with the highest index, see _follow_loops()
+        for start in itertools.chain(heads.tolist(), range(len(successors) - 1, -1, -1)):
+            if visited[start]:
+                continue
+
+            i = start
+            length = len(sequence)
+
+            while i >= 0 and not visited[i]:
+                visited[i] = 1
+                sequence.append(i)
+                i = successors[i]
+
+            lengths.append(len(sequence) - length)
+            closed.append(i == start)
+
+        return sequence, lengths, closed
 
-        if self.vz_min.flag == 0:
-            if self.vz_max.flag == 1:
-                return self.s2, self.s3, self.s1, self.s1
-            elif self.vz_max.flag == 2:
-                return self.s1, self.s1, self.s2, self.s3
-        elif self.vz_min.flag == 1:
-            if self.vz_max.flag == 0:
-                return self.s1, self.s1, self.s2, self.s3
-            elif self.vz_max.flag == 2:
-                return self.s2, self.s3, self.s1, self.s1
-        elif self.vz_min.flag == 2:
-            if self.vz_max.flag == 0:
-                return self.s2, self.s3, self.s1, self.s1
-            elif self.vz_max.flag == 1:
-                return self.s1, self.s1, self.s2, self.s3
-
-    def slice(self, first_layer_height, layer_height):
+    @staticmethod
+    def _successors(forward_edges, backward_edges):
         """
-        Yields for each z plane intersection an instance of Intersection
+        :return: numpy.array() with the index of the intersection following each intersection or -1 if there is none
         """
-        start = max(0, math.floor((self.vz_min.z - first_layer_height) / layer_height) + 1)
-        middle = max(0, math.floor((self.vz_med.z - first_layer_height) / layer_height) + 1)
-        end = max(0, math.floor((self.vz_max.z - first_layer_height) / layer_height) + 1)
+        if len(forward_edges) == 0:
+            return numpy.zeros(0, numpy.int64)
 
-        lower_forward_edge, upper_forward_edge, lower_backward_edge, upper_backward_edge = self.get_forward_edge()
+        order = numpy.argsort(forward_edges, kind="stable")
+        position = numpy.searchsorted(forward_edges, backward_edges, sorter=order)
+        candidates = order[numpy.minimum(position, len(order) - 1)]
 
-        for layer in range(start, middle):
-            z = first_layer_height + layer * layer_height
-            x, y = lower_forward_edge.get_point_at_z(z)
+        return numpy.where(forward_edges[candidates] == backward_edges, candidates, -1)
 
-            yield Intersection(Vertex(x, y, z), lower_forward_edge, lower_backward_edge, layer)
+    def __iter__(self):
+        yield from self.loops
+
+    def __len__(self):
+        return len(self.loops)
+
+    def __getstate__(self):
+        # Only the linked loops are needed after pickling
+        return self.z, self.height, self.loops, self.closed
 
-        for layer in range(middle, end):
-            z = first_layer_height + layer * layer_height
-            x, y = upper_forward_edge.get_point_at_z(z)
+    def __setstate__(self, state):
+        self.z, self.height, self._loops, self._closed = state
+        self.chunks = []
 
-            yield Intersection(Vertex(x, y, z), upper_forward_edge, upper_backward_edge, layer)
 
+PreprocessedModel = collections.namedtuple("PreprocessedModel", ["vertices", "indices", "edges", "triangles"])
 
-class Intersections:
+
+def preprocess(model, precision):
     """
-    Contains the intersections of one layer
+    Converts a model into the integer representation used for slicing
+
+    :param model: Instance of model.Model
+    :param precision: Factor to scale the coordinates with before converting them to integers
+    :return: Instance of PreprocessedModel
     """
-    def __init__(self, first):
-        self.intersections = collections.deque()
-        self.intersections.append(first)
+    # center model and set its z_min to 0
+    t = numpy.array([-(model.bounding_box.x_max+model.bounding_box.x_min) / 2,
+                     -(model.bounding_box.y_max+model.bounding_box.y_min) / 2,
+                     -model.bounding_box.z_min], numpy.float32)
 
-    @property
-    def first(self):
-        return self.intersections[0]
+    vertices = numpy.add(model.vertices, t)
+    vertices = numpy.multiply(vertices, precision)
+    vertices = vertices.astype(numpy.int32)
 
-    @property
-    def last(self):
-        return self.intersections[-1]
+    # Reshape indices list to make iterating in chunks easier
+    indices = model.indices.reshape((-1, 3))
 
-    @property
-    def closed(self):
-        return self.last.backward_edge == self.first.forward_edge
+    # Topology only depends on the model, not on the layer heights
+    edges = EdgeTable(vertices, indices)
+    triangles = TriangleTable(vertices, indices, edges)
 
-    def is_adjacent_to_first_element(self, intersection):
-        """
-        :param intersection: Instance if Intersection
-        :return: True if backward edge of intersection is adjacent to forward edge of first element
-        """
-        return intersection.backward_edge == self.first.forward_edge
+    return PreprocessedModel(vertices, indices, edges, triangles)
 
-    def is_adjacent_to_last_element(self, intersection):
-        """
-        :param intersection: Instance of Intersection
-        :return: True if forward edge of intersection is adjacent to backward edge of last element
-        """
-        return intersection.forward_edge == self.last.backward_edge
 
-    def add_to_front_if_adjacent(self, intersection):
-        """
-        If intersection is adjacent to first element, intersection is added as new first element
-        :param intersection: Instance of Intersection
-        :return: True if intersection was added
-        """
-        result = self.is_adjacent_to_first_element(intersection)
-        if result:
-            self.intersections.appendleft(intersection)
+def add_intersections(contours, intersections):
+    """
+    Adds intersections to the contours of their layers
 
-        return result
+    :param contours: List of Contour, one for each plane the intersections were created with
+    :param intersections: Instance of triangles.PlaneIntersections
+    """
+    for plane, x, y, forward_edges, backward_edges in intersections.per_plane():
+        contours[plane].add(x, y, forward_edges, backward_edges)
 
-    def add_to_back_if_adjacent(self, intersection):
-        """
-        If intersection is adjacent to last element, intersection is added as new last element
-        :param intersection: Instance of Intersection
-        :return: True if intersection was added
-        """
-        result = self.is_adjacent_to_last_element(intersection)
-        if result:
-            self.intersections.append(intersection)
 
-        return result
+def slice_planes(triangles, planes, heights):
+    """
+    Slices consecutive layers, only the triangles spanning their planes are intersected
 
-    def add_intersections_to_front(self, intersections):
-        """
-        :param intersections: Instance of Intersections
-        """
-        self.intersections.extendleft(reversed(intersections.intersections))
+    :param triangles: Instance of TriangleTable
+    :param planes: numpy.array() with z coordinates of the layers
+    :param heights: List with heights of the layers
+    :return: List of Contour
+    """
+    contours = [Contour(z, height) for z, height in zip(planes.tolist(), heights)]
 
-    def add_intersections_to_back(self, intersections):
-        """
-        :param intersections: Instance of Intersections
-        """
-        self.intersections.extend(intersections.intersections)
+    if len(planes) > 0:
+        intersections = triangles.intersect(planes, triangles.spanning(planes[0], planes[-1]))
+        add_intersections(contours, intersections)
 
-    def __iter__(self):
-        yield from self.intersections
+    return contours
 
-    def __len__(self):
-        return len(self.intersections)
 
+def sweep_planes(triangles, planes, heights):
+    """
+    Same as slice_planes(), but the planes are swept upwards, see TriangleTable.sweep()
 
-class Contour:
+    :param triangles: Instance of TriangleTable
+    :param planes: numpy.array() with z coordinates of the layers
+    :param heights: List with heights of the layers
+    :return: List of Contour
     """
-    Contains the contour of one layer
+    contours = [Contour(z, height) for z, height in zip(planes.tolist(), heights)]
+
+    for plane, intersections in triangles.sweep(planes):
+        add_intersections(contours[plane:plane + 1], intersections)
+
+    return contours
+
+
+def slice_band(shared_triangles, planes, heights, engine):
     """
-    def __init__(self, z):
-        self.contour = collections.deque()
-        self.z = z
+    Slices a band of consecutive layers, runs in a worker process
 
-    def add(self, intersection):
-        """
-        :param intersection: Instance of Intersection
-        """
-        for intersections in self.contour:
-            if intersections.add_to_front_if_adjacent(intersection):
-                self.add_to_back_if_adjacent(intersections)
-                break
-            elif intersections.add_to_back_if_adjacent(intersection):
-                self.add_to_front_if_adjacent(intersections)
-                break
+    :param shared_triangles: Instance of SharedArrays containing the arrays of a TriangleTable
+    :param planes: numpy.array() with z coordinates of the layers in the band
+    :param heights: List with heights of the layers in the band
+    :param engine: Instance of SlicingEngine
+    :return: List of Contour
+    """
+    with shared_triangles:
+        triangles = TriangleTable.from_arrays(shared_triangles.arrays())
+
+        if engine == SlicingEngine.SWEEP_PLANE:
+            contours = sweep_planes(triangles, planes, heights)
         else:
-            # intersection was not added to an existing intersection list so create a new one
-            self.contour.append(Intersections(intersection))
+            contours = slice_planes(triangles, planes, heights)
 
-    def add_to_back_if_adjacent(self, intersections_to_add):
-        """
-        :param intersections_to_add: Instance of Intersections
-        """
-        for intersections in self.contour:
-            if intersections == intersections_to_add:
-                continue
+        # Views on shared memory have to be released before it is closed
+        del triangles
 
-            if intersections.is_adjacent_to_last_element(intersections_to_add.first):
-                intersections.add_intersections_to_back(intersections_to_add)
-                self.contour.remove(intersections_to_add)
-                break
+    return contours
 
-    def add_to_front_if_adjacent(self, intersections_to_add):
-        """
-        :param intersections_to_add: Instance of Intersections
-        """
-        for intersections in self.contour:
-            if intersections == intersections_to_add:
-                continue
 
-            if intersections.is_adjacent_to_first_element(intersections_to_add.last):
-                intersections.add_intersections_to_front(intersections_to_add)
-                self.contour.remove(intersections_to_add)
-                break
+def merge_band(cfg, shared_triangles, planes, heights, engine):
+    """
+    Slices a band of consecutive layers like slice_band() and merges their contours into outlines
+    in the same worker process, so only the outlines are passed back
 
-    def __iter__(self):
-        yield from self.contour
+    :param cfg: Instance of SlicerConfig
+    :return: List with the result of sliced_model.merge_contour() for each layer in the band
+    """
+    return [merge_contour(cfg, contour) for contour in slice_band(shared_triangles, planes, heights, engine)]
 
 
 class Slicer:
+    BAND_COUNT = 100  # Number of z bands for slicing with multiple processes
+    PARALLEL_MIN_FACETS = 50000  # Smaller models are sliced without starting worker processes
+    LAYER_BATCH_SIZE = 16  # Number of layers sliced at once by layers()
+
     def __init__(self, slicer_config, model, update_func=None):
         """
         :param slicer_config: Instance of SlicerConfig
@@ -311,50 +329,175 @@ class Slicer:
         self.slicer_config = slicer_config
         self.model = model
         self.update_func = update_func
-        self.first_layer_height = int(slicer_config.first_layer_height * slicer_config.VERTEX_PRECISION)
-        self.layer_height = int(slicer_config.layer_height * slicer_config.VERTEX_PRECISION)
 
         self.update_interval = max(1, self.model.facet_count // 100)
-
-        self.layer_count = math.ceil((self.model.dimensions.z - slicer_config.first_layer_height) /
-                                     slicer_config.layer_height + 1)
         self.contours = []
-        for i in range(self.layer_count):
-            z = self.first_layer_height + i * self.layer_height
-            self.contours.append(Contour(z))
 
-        # center model and set its z_min to 0
-        t = numpy.array([-(model.bounding_box.x_max+model.bounding_box.x_min) / 2,
-                         -(model.bounding_box.y_max+model.bounding_box.y_min) / 2,
-                         -model.bounding_box.z_min], numpy.float32)
+        # Preprocessing only depends on the model, so it is done once for each model
+        # and reused when the model is sliced again e.g. with other layer heights
+        key = (PreprocessedModel.__name__, slicer_config.VERTEX_PRECISION)
+        if key not in model.cache:
+            model.cache[key] = preprocess(model, slicer_config.VERTEX_PRECISION)
+
+        self.vertices, self.indices, self.edges, self.triangles = model.cache[key]
 
-        vertices = numpy.add(model.vertices, t)
-        vertices = numpy.multiply(vertices, slicer_config.VERTEX_PRECISION)
-        self.vertices = vertices.astype(numpy.int32)
+        if slicer_config.adaptive_layer_height:
+            self.planes, self.layer_heights = adaptive_layers(slicer_config, self.triangles, model.dimensions.z)
+        else:
+            self.planes, self.layer_heights = uniform_layers(slicer_config, model.dimensions.z)
 
-        # Reshape indices list to make iterating in chunks easier
-        self.indices = model.indices.reshape((-1, 3))
+        self.layer_count = len(self.planes)
 
     def slice(self):
         """
         :return: Instance of SlicedModel if not cancelled else None
         """
-        triangle_no = 0
-        for i, j, k in self.indices:
-            triangle_no += 1
-            v1, v2, v3 = self.vertices[i], self.vertices[j], self.vertices[k]
+        cfg = self.slicer_config
+
+        if cfg.processes > 1 and self.model.facet_count < self.PARALLEL_MIN_FACETS:
+            # Starting the worker processes takes longer than processing a small model in this process
+            cfg = copy.copy(cfg)
+            cfg.processes = 1
+
+        # With more than one process the worker processes are started once and passed on to the sliced model
+        executor = create_executor(cfg) if cfg.processes > 1 else None
+
+        if executor is not None and self.layer_count > 1:
+            # The contours are merged into outlines by the worker processes which sliced them
+            layers = self._slice_bands(executor, merge_band, cfg)
+            merged = True
+        else:
+            layers = self.slice_contours()
+            merged = False
+
+        if layers is None:
+            if executor is not None:
+                executor.shutdown()
+
+            return None
+
+        return SlicedModel(cfg, self.model.bounding_box, layers, executor, merged)
+
+    def slice_contours(self, executor=None):
+        """
+        Intersects the triangles with the planes of all layers and assembles the contours with
+        the configured engine. If an executor is given, z bands of layers are sliced in its
+        worker processes with the same engine.
+
+        :param executor: Executor returned by sliced_model.create_executor() or None
+        :return: List of Contour, one for each layer, if not cancelled else None
+        """
+        self.contours = [Contour(z, height) for z, height in zip(self.planes.tolist(), self.layer_heights)]
 
-            triangle = Triangle(v1, v2, v3)
+        if executor is not None and self.layer_count > 1:
+            self.contours = self._slice_bands(executor, slice_band)
+            return self.contours
 
-            if triangle.vz_min.z != triangle.vz_max.z:
-                for intersection in triangle.slice(self.first_layer_height, self.layer_height):
-                    self.contours[intersection.layer].add(intersection)
+        if self.slicer_config.slicing_engine == SlicingEngine.SWEEP_PLANE:
+            return self._slice_sweep()
 
-                if self.update_func is not None and triangle_no % self.update_interval == 0:
-                    msg = "%s/%s triangles sliced" % (triangle_no, self.model.facet_count)
+        # Triangles are intersected in chunks with all planes at once, the
+        # chunks are only needed to report the progress and to allow cancelling
+        for start in range(0, len(self.triangles), self.update_interval):
+            end = min(start + self.update_interval, len(self.triangles))
 
-                    self.cancelled = self.update_func(int(triangle_no / self.model.facet_count * 100), msg)
+            add_intersections(self.contours, self.triangles.intersect(self.planes, slice(start, end)))
+
+            if self.update_func is not None:
+                msg = "%s/%s triangles sliced" % (end, self.model.facet_count)
+
+                self.cancelled = self.update_func(int(end / self.model.facet_count * 100), msg)
+                if self.cancelled:
+                    return None
+
+        return self.contours
+
+    def layers(self, batch_size=LAYER_BATCH_SIZE):
+        """
+        Generator which yields the contours of the layers bottom-up as soon as they are sliced
+
+        Layers are sliced in batches, only the triangles spanning the layers of a batch are
+        intersected. SlicedModel merges each contour into the outlines of its layer while it
+        consumes the generator, so only the contours of a few batches are kept in memory at
+        a time instead of the contours of all layers as with slice(), e.g.:
+
+            sliced_model = SlicedModel(cfg, model.bounding_box, slicer.layers())
+
+        The memory needed for the outlines of all layers still grows with the height of the model.
+
+        :param batch_size: Number of layers sliced at once
+        :return: Generator yielding a Contour for each layer
+        """
+        for start in range(0, self.layer_count, batch_size):
+            yield from self.slice_layers(start, start + batch_size)
+
+    def slice_layers(self, start, stop):
+        """
+        Slices a range of layers, e.g. for a preview. Only the triangles
+        spanning these layers are intersected.
+
+        :param start: Number of first layer
+        :param stop: Number of layer after last layer
+        :return: List of Contour, one for each layer in range(start, stop)
+        """
+        start, stop, _ = slice(start, stop).indices(self.layer_count)
+
+        return slice_planes(self.triangles, self.planes[start:stop], self.layer_heights[start:stop])
+
+    def _slice_sweep(self):
+        """
+        Sweeps the planes upwards and intersects each of them only with the triangles spanning it
+
+        :return: List of Contour if not cancelled else None
+        """
+        update_interval = max(1, self.layer_count // 100)
+
+        for layer, intersections in self.triangles.sweep(self.planes):
+            add_intersections(self.contours[layer:layer + 1], intersections)
+
+            if self.update_func is not None and (layer + 1) % update_interval == 0:
+                msg = "%s/%s layers sliced" % (layer + 1, self.layer_count)
+
+                self.cancelled = self.update_func(int((layer + 1) / self.layer_count * 100), msg)
+                if self.cancelled:
+                    return None
+
+        return self.contours
+
+    def _slice_bands(self, executor, func, *args):
+        """
+        Splits the layers into z bands which are sliced in worker processes,
+        the triangles are passed to the workers in shared memory
+
+        :param executor: Executor with the worker processes
+        :param func: slice_band() or merge_band(), called in the worker processes as
+                     func(*args, shared triangles, planes, layer heights, slicing engine) for each band
+        :return: List with the results of func for each layer if not cancelled else None
+        """
+        bands = numpy.array_split(numpy.arange(self.layer_count), min(self.layer_count, self.BAND_COUNT))
+        results = [None] * self.layer_count
+
+        with SharedArrays(self.triangles.arrays()) as shared_triangles:
+            futures = {executor.submit(func, *args, shared_triangles, self.planes[band],
+                                       self.layer_heights[band[0]:band[-1] + 1],
+                                       self.slicer_config.slicing_engine): band[0]
+                       for band in bands}
+
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                first_layer = futures[future]
+                band_results = future.result()
+                results[first_layer:first_layer + len(band_results)] = band_results
+
+                if self.update_func is not None:
+                    msg = "%s/%s layer bands sliced" % (done, len(bands))
+
+                    self.cancelled = self.update_func(int(done / len(bands) * 100), msg)
                     if self.cancelled:
+                        for f in futures:
+                            f.cancel()
+
+                        # Bands already running have to finish before the shared memory is released
+                        concurrent.futures.wait(futures)
                         return None
 
-        return SlicedModel(self.slicer_config, self.model.bounding_box, self.contours)
+        return results
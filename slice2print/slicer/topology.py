@@ -0,0 +1,83 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+
+
+class EdgeTable:
+    """
+    Undirected edges of a mesh with integer ids
+
+    Vertices are identified by their position, so vertices which only differ
+    by their normal share their edges. Edge k of a face connects its corners
+    k and (k + 1) % 3.
+    """
+    def __init__(self, vertices, indices):
+        """
+        :param vertices: numpy.array() of shape (n, 3) with integer coordinates
+        :param indices: numpy.array() of shape (m, 3)
+        """
+        _, positions = numpy.unique(vertices, axis=0, return_inverse=True)
+        corners = numpy.ravel(positions)[indices].astype(numpy.int64)
+
+        a = numpy.ravel(corners)
+        b = numpy.ravel(numpy.roll(corners, -1, axis=1))
+        p = numpy.minimum(a, b)
+        q = numpy.maximum(a, b)
+
+        keys, first, edges = numpy.unique(p * (numpy.max(corners, initial=0) + 1) + q,
+                                          return_index=True, return_inverse=True)
+        edges = numpy.ravel(edges)
+
+        # key: id of the edge, value: ids of the positions of both of its vertices
+        self.vertices = numpy.stack((p[first], q[first]), axis=1)
+        # key: face, value: ids of its three edges
+        self.face_edges = numpy.reshape(edges, (-1, 3))
+        # key: id of the edge, value: the two faces on both sides of the edge, -1 if there is none
+        self.edge_faces = self._adjacent_faces(edges, len(keys))
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def edge_between(self, faces, corner_a, corner_b):
+        """
+        :param faces: numpy.array() of face numbers
+        :param corner_a: numpy.array() with corner (0, 1 or 2) of each face
+        :param corner_b: numpy.array() with another corner of each face
+        :return: numpy.array() with ids of the edges between the corners
+        """
+        k = numpy.where((corner_a + 1) % 3 == corner_b, corner_a, corner_b)
+
+        return self.face_edges[faces, k]
+
+    @staticmethod
+    def _adjacent_faces(edges, count):
+        """
+        Non manifold edges with more than two faces keep the first two of them
+        """
+        order = numpy.argsort(edges, kind="stable")
+        sorted_edges = edges[order]
+        faces = order // 3
+
+        starts = numpy.searchsorted(sorted_edges, numpy.arange(count))
+        ends = numpy.append(starts[1:], len(sorted_edges))
+
+        result = numpy.full((count, 2), -1, numpy.int64)
+        result[:, 0] = faces[starts]
+
+        has_second = ends - starts > 1
+        result[has_second, 1] = faces[starts[has_second] + 1]
+
+        return result
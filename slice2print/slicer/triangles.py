@@ -0,0 +1,227 @@
+# This file is part of Slice2Print.
+#
+# Slice2Print is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Slice2Print is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Slice2Print.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+
+
+class TriangleTable:
+    """
+    Contains all triangles of a model as struct of arrays, the vertices of
+    each triangle are sorted by their z coordinate
+    """
+    ARRAYS = ("v_min", "v_med", "v_max", "short_edge_forward", "long_edge", "lower_edge", "upper_edge",
+              "by_z_min", "sorted_z_min", "height_class_starts", "height_class_bounds")
+
+    def __init__(self, vertices, indices, edges):
+        """
+        :param vertices: numpy.array() of shape (n, 3) with integer coordinates
+        :param indices: numpy.array() of shape (m, 3)
+        :param edges: Instance of EdgeTable for vertices and indices
+        """
+        corners = vertices[indices]
+
+        # A stable sort of the descending z coordinates picks the same order of vertices with equal z
+        # as comparing them one after another in the order v1, v2, v3
+        order = numpy.argsort(-corners[:, :, 2].astype(numpy.int64), axis=1, kind="stable")
+        sorted_corners = numpy.take_along_axis(corners, order[:, :, numpy.newaxis], axis=1)
+
+        self.v_max = sorted_corners[:, 0]
+        self.v_med = sorted_corners[:, 1]
+        self.v_min = sorted_corners[:, 2]
+
+        # Depending on the order of v_min and v_max within the triangle, the contour enters the triangle
+        # through the long edge (v_min, v_max) and leaves it through one of the short edges or vice versa
+        self.short_edge_forward = (order[:, 0] - order[:, 2]) % 3 == 1
+
+        # An edge is shared by the triangles on both of its sides, so contours are linked by comparing edge ids
+        faces = numpy.arange(len(indices))
+        self.long_edge = edges.edge_between(faces, order[:, 2], order[:, 0])
+        self.lower_edge = edges.edge_between(faces, order[:, 2], order[:, 1])
+        self.upper_edge = edges.edge_between(faces, order[:, 1], order[:, 0])
+
+        self._create_z_index()
+
+    def __len__(self):
+        return len(self.v_min)
+
+    def arrays(self):
+        """
+        :return: Dict with all arrays of the table
+        """
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        :param arrays: Dict as returned by arrays()
+        :return: Instance of TriangleTable
+        """
+        table = cls.__new__(cls)
+
+        for name in cls.ARRAYS:
+            setattr(table, name, arrays[name])
+
+        return table
+
+    def _create_z_index(self):
+        """
+        Creates an index to find the triangles within a range of z coordinates
+
+        Triangles are grouped into classes of heights below a power of two and sorted by their
+        z_min within each class. A triangle of a class whose z_max reaches z must start above
+        z minus the height bound of its class, so the triangles spanning a range of z coordinates
+        are found with two binary searches per class. Grouping by height keeps a few tall
+        triangles from widening the search for all other triangles.
+        """
+        z_min = self.v_min[:, 2].astype(numpy.int64)
+        height = self.v_max[:, 2].astype(numpy.int64) - z_min
+
+        # Heights of class k are below 2**k
+        _, height_class = numpy.frexp(height)
+        classes, counts = numpy.unique(height_class, return_counts=True)
+
+        # key: position in index, value: number of triangle
+        self.by_z_min = numpy.lexsort((z_min, height_class))
+        self.sorted_z_min = z_min[self.by_z_min]
+        self.height_class_starts = numpy.append(0, numpy.cumsum(counts))
+        self.height_class_bounds = numpy.left_shift(1, classes.astype(numpy.int64))
+
+    def spanning(self, z_low, z_high):
+        """
+        :return: Sorted numpy.array() with the numbers of all triangles which intersect at
+                 least one plane in [z_low, z_high]
+        """
+        candidates = []
+
+        for start, end, bound in zip(self.height_class_starts[:-1].tolist(), self.height_class_starts[1:].tolist(),
+                                     self.height_class_bounds.tolist()):
+            z_min = self.sorted_z_min[start:end]
+            first = start + numpy.searchsorted(z_min, z_low - bound, side="right")
+            last = start + numpy.searchsorted(z_min, z_high, side="left")
+            candidates.append(self.by_z_min[first:last])
+
+        candidates = numpy.sort(numpy.concatenate(candidates)) if candidates else numpy.zeros(0, numpy.int64)
+
+        return candidates[self.v_max[candidates, 2] >= z_low]
+
+    def sweep(self, planes):
+        """
+        Generator which sweeps the planes upwards and intersects each plane only with the active
+        triangles. Triangles become active as soon as the sweep passes their z_min and are retired
+        after it passes their z_max, so the total work only grows with the number of intersections.
+        Only the triangles spanning the range of the planes take part, so a band of planes within
+        the model is swept without visiting the triangles below it.
+
+        :param planes: Sorted numpy.array() with z coordinates of the planes
+        :return: Generator yielding a tuple (plane, instance of PlaneIntersections) for each plane
+        """
+        if len(planes) == 0:
+            return
+
+        candidates = self.spanning(planes[0], planes[-1])
+        by_z_min = candidates[numpy.argsort(self.v_min[candidates, 2], kind="stable")]
+        sorted_z_min = self.v_min[by_z_min, 2]
+        added = 0
+        active = numpy.zeros(0, numpy.int64)
+
+        for plane in range(len(planes)):
+            z = planes[plane]
+
+            end = numpy.searchsorted(sorted_z_min, z, side="left")
+            # Sorting the active triangles by number intersects them in the same order as intersect()
+            active = numpy.sort(numpy.concatenate((active, by_z_min[added:end])), kind="stable")
+            active = active[self.v_max[active, 2] >= z]
+            added = end
+
+            yield plane, self.intersect(planes[plane:plane + 1], active)
+
+    def intersect(self, planes, triangles=slice(None)):
+        """
+        Intersects triangles with z planes
+
+        A plane at z intersects a triangle if z_min < z <= z_max. Each intersection is
+        the point where the plane crosses the forward edge of the triangle, together with
+        the ids of the forward and the backward edge. Intersections are sorted by plane
+        and then by triangle.
+
+        :param planes: Sorted numpy.array() with z coordinates of the planes
+        :param triangles: Slice or index array selecting the triangles to intersect
+        :return: Instance of PlaneIntersections
+        """
+        v_min = self.v_min[triangles]
+        v_med = self.v_med[triangles]
+        v_max = self.v_max[triangles]
+
+        start = numpy.searchsorted(planes, v_min[:, 2], side="right")
+        middle = numpy.searchsorted(planes, v_med[:, 2], side="right")
+        end = numpy.searchsorted(planes, v_max[:, 2], side="right")
+
+        # One row for each pair of triangle and intersecting plane
+        count = end - start
+        triangle = numpy.repeat(numpy.arange(len(count)), count)
+        plane = numpy.arange(len(triangle)) - numpy.repeat(numpy.cumsum(count) - count, count) + start[triangle]
+
+        # Below v_med the plane crosses the lower short edge, above it the upper short edge
+        lower = plane < middle[triangle]
+        short_edge_forward = self.short_edge_forward[triangles][triangle]
+
+        short_p = numpy.where(lower[:, numpy.newaxis], v_min[triangle], v_med[triangle])
+        short_q = numpy.where(lower[:, numpy.newaxis], v_med[triangle], v_max[triangle])
+        short_edge = numpy.where(lower, self.lower_edge[triangles][triangle], self.upper_edge[triangles][triangle])
+        long_edge = self.long_edge[triangles][triangle]
+
+        p = numpy.where(short_edge_forward[:, numpy.newaxis], short_p, v_min[triangle]).astype(numpy.int64)
+        q = numpy.where(short_edge_forward[:, numpy.newaxis], short_q, v_max[triangle]).astype(numpy.int64)
+        forward_edge = numpy.where(short_edge_forward, short_edge, long_edge)
+        backward_edge = numpy.where(short_edge_forward, long_edge, short_edge)
+
+        # Point on forward edge at z, see equation of a line in parametric form:
+        #     X = P + s * (Q - P) with s = (z - P.z) / (Q.z - P.z)
+        z = planes[plane]
+        s = (z - p[:, 2]) / (q[:, 2] - p[:, 2])
+        x = (p[:, 0] + s * (q[:, 0] - p[:, 0])).astype(numpy.int64)
+        y = (p[:, 1] + s * (q[:, 1] - p[:, 1])).astype(numpy.int64)
+
+        order = numpy.argsort(plane, kind="stable")
+
+        return PlaneIntersections(plane[order], x[order], y[order], forward_edge[order], backward_edge[order])
+
+
+class PlaneIntersections:
+    """
+    Intersections of triangles with z planes as struct of arrays, sorted by plane
+    """
+    __slots__ = ["plane", "x", "y", "forward_edge", "backward_edge"]
+
+    def __init__(self, plane, x, y, forward_edge, backward_edge):
+        self.plane = plane
+        self.x = x
+        self.y = y
+        self.forward_edge = forward_edge
+        self.backward_edge = backward_edge
+
+    def per_plane(self):
+        """
+        Yields for each plane with intersections a tuple (plane, x, y, forward edges, backward edges)
+        """
+        planes, starts = numpy.unique(self.plane, return_index=True)
+        ends = numpy.append(starts[1:], len(self.plane))
+
+        for plane, start, end in zip(planes.tolist(), starts.tolist(), ends.tolist()):
+            yield plane, self.x[start:end], self.y[start:end], \
+                self.forward_edge[start:end], self.backward_edge[start:end]
+
+    def __len__(self):
+        return len(self.plane)
@@ -24,6 +24,7 @@ class SlicerDialog(wx.Dialog):
 
         self.cancel = False
         self.sliced_model = None
+        self.travel_saved = 0.0
         self.model = model
         self.slicer_config = slicer_config
 
@@ -32,7 +33,7 @@ class SlicerDialog(wx.Dialog):
         self.staticText = wx.StaticText(self, -1, "")
         sizer.Add(self.staticText, 0, wx.EXPAND | wx.ALL, 7)
 
-        self.gauge = wx.Gauge(self, -1, 120)
+        self.gauge = wx.Gauge(self, -1, 140)
         self.gauge.SetValue(0)
         sizer.Add(self.gauge, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 7)
 
@@ -63,11 +64,20 @@ class SlicerDialog(wx.Dialog):
         self.sliced_model = s.slice()
 
         if self.sliced_model:
-            self.update(110, "Creating perimeters")
-            self.sliced_model.create_perimeters()
+            # Worker processes are kept for all steps
+            with self.sliced_model:
+                self.update(110, "Creating perimeters")
+                self.sliced_model.create_perimeters()
 
-            self.update(120, "Creating top and bottom infill")
-            self.sliced_model.create_infill()
+                self.update(120, "Creating top and bottom infill")
+                self.sliced_model.create_infill()
+
+                self.update(130, "Ordering paths")
+                self.travel_saved = self.sliced_model.order_paths()
+
+                if self.slicer_config.arc_fitting:
+                    self.update(140, "Fitting arcs")
+                    self.sliced_model.fit_arcs()
 
             self.EndModal(wx.ID_OK)
         else:
@@ -5,3 +5,4 @@ from .boxsliced import *
 from .plussquare import *
 from .boxtop import *
 from .image import *
+from .download import *
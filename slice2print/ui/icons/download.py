@@ -0,0 +1,16 @@
+#----------------------------------------------------------------------
+# This file contains resources/download.svg as embedded PNG images
+#
+from wx.lib.embeddedimage import PyEmbeddedImage
+
+download24 = PyEmbeddedImage(
+    b'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAAjklEQVR42u2WywnAIBBEPVjE'
+    b'lmGnlpaDBwvZAjY5jCCyifGTi3FhITDynoEhxJi/zYH9bAS7BVvwvpLhWnoQEM50VTcAFjNJ'
+    b'LiBkgrPNkwOSJAm0zMyQSPE8BNckUkho1neGlDegVk6tgqkxoXLzW86sji8sYARuAO7AYC30'
+    b'ShV712sCi4AHwAyGXecv4QRx8XDLSwBE1gAAAABJRU5ErkJggg==')
+
+download24_disabled = PyEmbeddedImage(
+    b'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAAnklEQVR42u2VywnAIBBEPVjE'
+    b'lmGntpSDdw8eUogFmARGMLIYPwhCPAwIK+9FHIw4jBEzI1YTWGSaICBbsAV1gqeO7g4VBIQ9'
+    b'tkfgADsTSSogzAL2NgtSQJREATfruoMcFLJ1EV57yZTBQy08F5TeGWJOQDXvVUsFY2Pcx5e/'
+    b'OEMd/5/AY6AG4AoMzwk0U8XeaE4gMfADYA+GXPan35wL8DeTFsNYiogAAAAASUVORK5CYII=')
@@ -94,56 +94,84 @@ class LayerMesh:
         normals = numpy.zeros((self.sliced_model.node_count * NORMALS_PER_NODE, 3), numpy.float32)
         indices = numpy.zeros((self.sliced_model.node_count * INDEX_ARRAYS_PER_NODE, 6), numpy.uint32)
 
-        p2m = PathToMesh(self.sliced_model.cfg)
-        l2m = LinesToMesh(self.sliced_model.cfg)
+        p2m = PathToMesh()
+        cfg = self.sliced_model.cfg
+
+        # Layers sharing their perimeters and infill with a lower layer get a copy of its mesh
+        meshes = {}  # key: (perimeters, infill, layer height), value: (start node, end node, z) of mesh
 
         node_count = 0
-        for layer_no, layer in enumerate(self.sliced_model.layers):
-            for perimeter_no, perimeter in enumerate(layer.perimeters):
-                for path in perimeter:
-                    # Slicer worked with integers, needs to be reverted
-                    # Also, append first node of path to its end to close it
-                    # (assuming that a perimeter ist a closed loop, this might change in the future)
-                    path_ = numpy.divide(path + [path[0]], self.sliced_model.cfg.VERTEX_PRECISION)
-                    path_length = len(path_) - 1
+        for layer in self.sliced_model.layers:
+            z = layer.z / cfg.VERTEX_PRECISION
+            key = (id(layer.perimeters), id(layer.infill) if layer.infill else None, layer.layer_height)
 
-                    start = node_count
-                    end = node_count + path_length
+            if key in meshes:
+                node_count = self._copy_layer_mesh(vertices, normals, indices, *meshes[key], z, node_count)
+            else:
+                start_node = node_count
 
-                    v = vertices[start * VERTICES_PER_NODE:end * VERTICES_PER_NODE]
-                    n = normals[start * NORMALS_PER_NODE:end * NORMALS_PER_NODE]
-                    i = indices[start * INDEX_ARRAYS_PER_NODE:end * INDEX_ARRAYS_PER_NODE]
+                # Perimeters are closed loops, infill consists of open zig-zag paths
+                paths = [(perimeter, True, cfg.extrusion_width_external_perimeter if perimeter_no == 0 else
+                          cfg.extrusion_width) for perimeter_no, perimeter in enumerate(layer.perimeters)]
+                paths.append((layer.infill, False, cfg.extrusion_width_infill))
 
-                    p2m.create_mesh(v, n, i, path_, perimeter_no == 0, layer_no)
+                for paths_, closed, extrusion_width in paths:
+                    # Arcs of perimeters are shown as straight segments
+                    paths_ = paths_.tessellate()
 
-                    i += node_count * VERTICES_PER_NODE
+                    # Slicer worked with integers, needs to be reverted
+                    coords = numpy.divide(paths_.coords, cfg.VERTEX_PRECISION)
 
-                    node_count += path_length
+                    for path_start, path_end in zip(paths_.offsets[:-1].tolist(), paths_.offsets[1:].tolist()):
+                        if closed:
+                            # Append first node of path to its end to close it
+                            path_ = numpy.concatenate((coords[path_start:path_end],
+                                                       coords[path_start:path_start + 1]))
+                        else:
+                            path_ = coords[path_start:path_end]
+                        path_length = len(path_) - 1
 
-            if len(layer.infill):
-                lines_length = 2 * len(layer.infill)
+                        start = node_count
+                        end = node_count + path_length
 
-                start = node_count
-                end = node_count + lines_length
+                        v = vertices[start * VERTICES_PER_NODE:end * VERTICES_PER_NODE]
+                        n = normals[start * NORMALS_PER_NODE:end * NORMALS_PER_NODE]
+                        i = indices[start * INDEX_ARRAYS_PER_NODE:end * INDEX_ARRAYS_PER_NODE]
 
-                v = vertices[start * VERTICES_PER_NODE:end * VERTICES_PER_NODE]
-                n = normals[start * NORMALS_PER_NODE:end * NORMALS_PER_NODE]
-                i = indices[start * INDEX_ARRAYS_PER_NODE:end * INDEX_ARRAYS_PER_NODE]
+                        p2m.create_mesh(v, n, i, path_, extrusion_width, z, layer.layer_height, closed)
 
-                l2m.create_mesh(v,
-                                n,
-                                i,
-                                numpy.divide(layer.infill, self.sliced_model.cfg.VERTEX_PRECISION),
-                                layer_no)
+                        i += node_count * VERTICES_PER_NODE
 
-                i += node_count * VERTICES_PER_NODE
+                        node_count += path_length
 
-                node_count += lines_length
+                meshes[key] = (start_node, node_count, z)
 
             self.vertices_count_at_layer.append(node_count * INDEX_ARRAYS_PER_NODE * 6)
 
         return vertices.ravel(), normals.ravel(), indices.ravel()
 
+    @staticmethod
+    def _copy_layer_mesh(vertices, normals, indices, start_node, end_node, source_z, z, node_count):
+        """
+        Copies the mesh of a layer to the next free nodes and moves it to z
+
+        :return: New node count
+        """
+        length = end_node - start_node
+
+        v = vertices[node_count * VERTICES_PER_NODE:(node_count + length) * VERTICES_PER_NODE]
+        v[:] = vertices[start_node * VERTICES_PER_NODE:end_node * VERTICES_PER_NODE]
+        v[:, 2] += z - source_z
+
+        normals[node_count * NORMALS_PER_NODE:(node_count + length) * NORMALS_PER_NODE] = \
+            normals[start_node * NORMALS_PER_NODE:end_node * NORMALS_PER_NODE]
+
+        i = indices[node_count * INDEX_ARRAYS_PER_NODE:(node_count + length) * INDEX_ARRAYS_PER_NODE]
+        i[:] = indices[start_node * INDEX_ARRAYS_PER_NODE:end_node * INDEX_ARRAYS_PER_NODE]
+        i += (node_count - start_node) * VERTICES_PER_NODE
+
+        return node_count + length
+
     def delete(self):
         self.vertex_buffer.delete()
         self.normal_buffer.delete()
@@ -179,19 +207,15 @@ class LayerMesh:
 
 
 class PathToMesh:
-    def __init__(self, cfg):
-        self.extrusion_width_external_perimeter = cfg.extrusion_width_external_perimeter
-        self.extrusion_width = cfg.extrusion_width
-        self.first_layer_height = cfg.first_layer_height
-        self.layer_height = cfg.layer_height
-
-    def create_mesh(self, vertices, vertex_normals, indices, path, external_perimeter, layer_no):
+    def create_mesh(self, vertices, vertex_normals, indices, path, extrusion_width, z_height, layer_height,
+                    closed=True):
+        """
+        :param path: numpy.array() with the points of the path, the first point repeated at the end if closed
+        :param extrusion_width: Width of the extruded path
+        :param closed: False if the path is open, its ends get no corner then
+        """
         path_length = len(path) - 1
 
-        z_height = self.first_layer_height + layer_no * self.layer_height
-        layer_height = self.first_layer_height if layer_no == 0 else self.layer_height
-        extrusion_width = self.extrusion_width_external_perimeter if external_perimeter else self.extrusion_width
-
         normals = self._create_normals_from_path(path)
         # Add to every vertex a third column with value zero
         normals = numpy.append(normals, numpy.zeros((len(normals), 1), numpy.float32), axis=1)
@@ -213,7 +237,8 @@ class PathToMesh:
                                       path_,
                                       normals,
                                       layer_height,
-                                      extrusion_width)
+                                      extrusion_width,
+                                      closed)
 
     def _create_line_meshes(self, vertices, vertex_normals, indices, path, normals, layer_height, extrusion_width):
         path_length = len(path) - 1
@@ -261,7 +286,8 @@ class PathToMesh:
 
         numpy.copyto(indices[:path_length * INDEX_ARRAYS_PER_LINE], indices_)
 
-    def _create_corner_triangles(self, vertices, vertex_normals, indices, path, normals, layer_height, extrusion_width):
+    def _create_corner_triangles(self, vertices, vertex_normals, indices, path, normals, layer_height, extrusion_width,
+                                 closed):
         path_length = len(path) - 1
 
         a = numpy.roll(path, -1, 0) - path  # create vectors from vertices
@@ -307,7 +333,11 @@ class PathToMesh:
         last = path[-1] - path[-2]
         determinant = last[0] * first[1] - last[1] * first[0]
 
-        if determinant >= 0:
+        if not closed:
+            # No corner between the last and the first path segment
+            vertices_[:3] = path[0]
+            vertices_[path_length * 3:path_length * 3 + 3] = path[0]
+        elif determinant >= 0:
             vertices_[0] = path[0]
             vertices_[1] = path[0] - [0.0, 0.0, layer_height]
             vertices_[2] = path[0] + offsets[0] - [0.0, 0.0, layer_height / 2]
@@ -350,89 +380,6 @@ class PathToMesh:
         return normalize_2d(normals)
 
 
-class LinesToMesh:
-    def __init__(self, cfg):
-        self.extrusion_width = cfg.extrusion_width_infill
-        self.first_layer_height = cfg.first_layer_height
-        self.layer_height = cfg.layer_height
-
-    def create_mesh(self, vertices, vertex_normals, indices, lines, layer_no):
-        z_height = self.first_layer_height + layer_no * self.layer_height
-        layer_height = self.first_layer_height if layer_no == 0 else self.layer_height
-
-        lines_ = numpy.reshape(lines, (len(lines) * 2, 2))
-        lines_length = len(lines_)
-
-        normals = self._create_normals_from_lines(lines_)
-        # Add to every vertex a third column with value zero
-        normals = numpy.append(normals, numpy.zeros((len(normals), 1), numpy.float32), axis=1)
-
-        # Add to every vertex a third column with the layer height
-        lines_ = numpy.append(lines_, numpy.full((lines_length, 1), z_height, numpy.float32), axis=1)
-
-        self._create_line_meshes(vertices[:lines_length * VERTICES_PER_LINE],
-                                 vertex_normals[:lines_length * VERTICES_PER_LINE],
-                                 indices[:lines_length * INDEX_ARRAYS_PER_LINE],
-                                 lines_,
-                                 normals,
-                                 layer_height,
-                                 self.extrusion_width)
-
-    def _create_line_meshes(self, vertices, vertex_normals, indices, lines, normals, layer_height, extrusion_width):
-        lines_length = len(lines)
-
-        normals2x = numpy.repeat(normals, 2, 0)
-        offsets = -normals2x * extrusion_width / 2
-
-        center_path = lines
-
-        inner_path = center_path - offsets
-        outer_path = center_path + offsets
-
-        # .\
-        # ..
-        vertices[:lines_length * 2:2] = center_path
-        vertices[1:lines_length * 2:2] = outer_path - [0.0, 0.0, layer_height / 2]
-
-        # /.
-        # ..
-        vertices[lines_length * 2:2 * lines_length * 2:2] = inner_path - [0.0, 0.0, layer_height / 2]
-        vertices[lines_length * 2 + 1:2 * lines_length * 2:2] = center_path
-
-        # ..
-        # ./
-        vertices[2 * lines_length * 2:3 * lines_length * 2:2] = outer_path - [0.0, 0.0, layer_height / 2]
-        vertices[2 * lines_length * 2 + 1:3 * lines_length * 2:2] = center_path - [0.0, 0.0, layer_height]
-
-        # ..
-        # \.
-        vertices[3 * lines_length * 2:4 * lines_length * 2:2] = center_path - [0.0, 0.0, layer_height]
-        vertices[3 * lines_length * 2 + 1:4 * lines_length * 2:2] = inner_path - [0.0, 0.0, layer_height / 2]
-
-        vertex_normals_ = numpy.cross(vertices[1:lines_length * VERTICES_PER_LINE:4] - vertices[:lines_length * 16:4],
-                                      vertices[2:lines_length * VERTICES_PER_LINE:4] - vertices[:lines_length * 16:4])
-        vertex_normals_ = normalize_3d(vertex_normals_)
-        vertex_normals_ = numpy.repeat(vertex_normals_, 4, 0)
-
-        numpy.copyto(vertex_normals[:lines_length * 16], vertex_normals_)
-
-        indices_ = numpy.array([[0, 1, 2, 2, 1, 3]], numpy.uint32)
-        indices_ = numpy.repeat(indices_, lines_length * INDEX_ARRAYS_PER_LINE, 0)
-        indices_ += numpy.arange(0, lines_length * 4 * 4, 4, dtype=numpy.uint32)[:, numpy.newaxis]
-
-        numpy.copyto(indices[:lines_length * INDEX_ARRAYS_PER_LINE], indices_)
-
-    def _create_normals_from_lines(self, lines):
-        # calculate direction vectors
-        vectors = lines[1::2] - lines[::2]
-
-        # calculate normals of each vector
-        normals = numpy.empty_like(vectors)
-        normals[:, 0], normals[:, 1] = -vectors[:, 1], vectors[:, 0]
-
-        return normalize_2d(normals)
-
-
 def normalize_2d(a):
     """
     Normalizes each 2D vector in given array
@@ -48,7 +48,7 @@ class ParameterPanel(wx.Panel):
         sizer.Add(wx.StaticText(self, wx.ID_ANY, label), 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT | margin, 7)
 
         # The control itself
-        ctrl = wx.SpinCtrlDouble(self, wx.ID_ANY, min=0.0, style=wx.ALIGN_RIGHT | wx.SP_ARROW_KEYS)
+        ctrl = wx.SpinCtrlDouble(self, wx.ID_ANY, min=min_, max=max_, style=wx.ALIGN_RIGHT | wx.SP_ARROW_KEYS)
         ctrl.SetDigits(2)
         ctrl.SetIncrement(0.1)
         sizer.Add(ctrl, 0, wx.EXPAND | wx.ALIGN_CENTER_VERTICAL | wx.LEFT | margin, 7)
@@ -60,6 +60,34 @@ class ParameterPanel(wx.Panel):
 
         return ctrl
 
+    def add_check_box(self, label, offset_bottom=False):
+        """
+        Adds a wx.CheckBox to the Panel and sets its event handler for wx.EVT_CHECKBOX to self.on_update
+
+        :param label: Text for label in front of control
+        :param offset_bottom: Should the control be rendered with a bottom margin
+        :return: Instance of wx.CheckBox
+        """
+        sizer = self.GetSizer()
+
+        margin = wx.TOP
+        if offset_bottom:
+            margin |= wx.BOTTOM
+
+        # Label in front of control
+        sizer.Add(wx.StaticText(self, wx.ID_ANY, label), 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT | margin, 7)
+
+        # The control itself
+        ctrl = wx.CheckBox(self, wx.ID_ANY)
+        sizer.Add(ctrl, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT | margin, 7)
+
+        # Empty cell behind control
+        sizer.Add(wx.StaticText(self, wx.ID_ANY, ""), 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT | wx.RIGHT | margin, 7)
+
+        ctrl.Bind(wx.EVT_CHECKBOX, self.on_update)
+
+        return ctrl
+
     def add_spin_ctrl(self, label, min_, max_, unit="", offset_bottom=False):
         """
         Adds a wx.SpinCtrl to the Panel and sets its event handler for wx.EVT_SPINCTRL to self.on_update
@@ -98,7 +126,10 @@ class PrintOptionsPanel(ParameterPanel):
         ParameterPanel.__init__(self, parent)
 
         self.ctrl_first_layer_height = self.add_spin_ctrl_double("First layer height", 0.0, 10.0, "mm")
-        self.ctrl_layer_height = self.add_spin_ctrl_double("Layer height", 0.0, 10.0, "mm", True)
+        self.ctrl_layer_height = self.add_spin_ctrl_double("Layer height", 0.0, 10.0, "mm")
+        self.ctrl_adaptive_layer_height = self.add_check_box("Adaptive layer height")
+        self.ctrl_min_layer_height = self.add_spin_ctrl_double("Min. layer height", 0.05, 10.0, "mm")
+        self.ctrl_max_layer_height = self.add_spin_ctrl_double("Max. layer height", 0.05, 10.0, "mm", True)
 
         self.ctrl_perimeters = self.add_spin_ctrl("Perimeters", 1, 100, "", True)
 
@@ -135,6 +166,12 @@ class PrinterSettingsPanel(ParameterPanel):
 
         self.ctrl_filament_diameter = self.add_spin_ctrl_double("Filament diameter", 1.0, 5.0, "mm", True)
 
+        self.ctrl_nozzle_temperature = self.add_spin_ctrl("Nozzle temperature", 0, 400, "°C")
+        self.ctrl_bed_temperature = self.add_spin_ctrl("Bed temperature", 0, 150, "°C", True)
+
+        self.ctrl_arc_fitting = self.add_check_box("Arc fitting (G2/G3)")
+        self.ctrl_arc_tolerance = self.add_spin_ctrl_double("Arc tolerance", 0.0, 1.0, "mm", True)
+
         self.Layout()
 
         self.controller.init_printer_settings(self)
@@ -27,6 +27,8 @@ class MainFrameToolBar(wx.ToolBar):
         self.tool_layer_view = None
         self.tool_view_all = None
         self.tool_view_from_top = None
+        self.tool_svg = None
+        self.tool_gcode = None
 
         self._create_tools()
 
@@ -38,6 +40,7 @@ class MainFrameToolBar(wx.ToolBar):
     def enable_layer_view_tool(self, enable=True):
         self.EnableTool(self.tool_layer_view.GetId(), enable)
         self.EnableTool(self.tool_svg.GetId(), enable)
+        self.EnableTool(self.tool_gcode.GetId(), enable)
 
     def toggle_model_view(self):
         self.EnableTool(self.tool_svg.GetId(), False)
@@ -94,6 +97,12 @@ class MainFrameToolBar(wx.ToolBar):
                                      icons.image24_disabled.GetBitmap(),
                                      shortHelp="Layer outline to SVG")
 
+        self.tool_gcode = self.AddTool(wx.ID_ANY,
+                                       "Export G-code",
+                                       icons.download24.GetBitmap(),
+                                       icons.download24_disabled.GetBitmap(),
+                                       shortHelp="Export G-code")
+
         self.Realize()
 
         self.frame.Bind(wx.EVT_TOOL, self.controller.load_model, id=tool_open.GetId())
@@ -103,6 +112,7 @@ class MainFrameToolBar(wx.ToolBar):
         self.frame.Bind(wx.EVT_TOOL, self.controller.show_layer_mesh, id=self.tool_layer_view.GetId())
         self.frame.Bind(wx.EVT_TOOL, self.controller.view_from_top, id=self.tool_view_from_top.GetId())
         self.frame.Bind(wx.EVT_TOOL, self.controller.layer_to_svg, id=self.tool_svg.GetId())
+        self.frame.Bind(wx.EVT_TOOL, self.controller.export_gcode, id=self.tool_gcode.GetId())
 
         self.enable_model_tools(False)
         self.enable_layer_view_tool(False)
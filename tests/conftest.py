@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The modules of Slice2Print are imported from its folder, as done by slice2print.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "slice2print"))
+
+
+@pytest.fixture
+def cfg():
+    """
+    :return: Instance of slicer.SlicerConfig with the default settings
+    """
+    import slicer
+
+    c = slicer.SlicerConfig()
+    c.first_layer_height = 0.2
+    c.layer_height = 0.2
+    c.min_layer_height = 0.1
+    c.max_layer_height = 0.3
+    c.nozzle_diameter = 0.4
+    c.filament_diameter = 1.75
+    c.nozzle_temperature = 200
+    c.bed_temperature = 60
+    c.arc_tolerance = 0.02
+    c.first_layer_speed = 35
+    c.print_speed = 50
+    c.travel_speed = 150
+    c.perimeters = 2
+    c.top_layers = 4
+    c.bottom_layers = 4
+    c.infill_overlap = 25
+    c.infill_angle = 45
+
+    return c
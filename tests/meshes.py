@@ -0,0 +1,159 @@
+"""
+Meshes and STL files used by the tests
+"""
+
+import numpy
+
+import model
+
+
+def box(x=10.0, y=10.0, z=10.0, origin=(0.0, 0.0, 0.0)):
+    """
+    :return: numpy.array() of shape (12, 3, 3) with the facets of a box, counterclockwise seen from outside
+    """
+    c = numpy.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                     [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], numpy.float64) * [x, y, z] + origin
+    faces = [(0, 2, 1), (0, 3, 2), (4, 5, 6), (4, 6, 7),
+             (0, 1, 5), (0, 5, 4), (1, 2, 6), (1, 6, 5),
+             (2, 3, 7), (2, 7, 6), (3, 0, 4), (3, 4, 7)]
+
+    return c[numpy.array(faces)]
+
+
+def stepped_part():
+    """
+    :return: Facets of a 20 x 20 x 4 mm base with a 10 x 10 x 4 mm block on top, the top of the
+             base is partly covered by the block
+    """
+    base = box(20.0, 20.0, 4.0)
+    block = box(10.0, 10.0, 4.0, origin=(5.0, 5.0, 4.0))
+
+    return numpy.concatenate((base, block))
+
+
+def cylinder(radius=10.0, height=5.0, segments=64, center=(0.0, 0.0)):
+    """
+    :return: Facets of a closed cylinder standing on the xy plane
+    """
+    angles = numpy.linspace(0, 2 * numpy.pi, segments, endpoint=False)
+    ring = numpy.column_stack((center[0] + radius * numpy.cos(angles), center[1] + radius * numpy.sin(angles)))
+
+    facets = []
+    for i in range(segments):
+        a, b = ring[i], ring[(i + 1) % segments]
+        bottom_a, bottom_b = [*a, 0.0], [*b, 0.0]
+        top_a, top_b = [*a, height], [*b, height]
+
+        facets.append([bottom_a, bottom_b, top_b])
+        facets.append([bottom_a, top_b, top_a])
+        facets.append([[*center, 0.0], bottom_b, bottom_a])
+        facets.append([[*center, height], top_a, top_b])
+
+    return numpy.array(facets)
+
+
+def normals(facets):
+    n = numpy.cross(facets[:, 1] - facets[:, 0], facets[:, 2] - facets[:, 0])
+
+    return n / numpy.linalg.norm(n, axis=1)[:, numpy.newaxis]
+
+
+def write_binary_stl(path, facets):
+    data = numpy.zeros(len(facets), model.STL_BINARY_FACET)
+    data["normal"] = normals(facets)
+    data["vertices"] = facets
+
+    with open(path, "wb") as f:
+        f.write(b"binary stl".ljust(80, b" "))
+        f.write(numpy.uint32(len(facets)).tobytes())
+        f.write(data.tobytes())
+
+    return str(path)
+
+
+def ascii_solid(facets, name="part"):
+    """
+    :return: Text of one solid in an ASCII STL file
+    """
+    lines = ["solid %s" % name]
+
+    for normal, facet in zip(normals(facets), facets):
+        lines.append("  facet normal %r %r %r" % tuple(float(v) for v in normal))
+        lines.append("    outer loop")
+        for vertex in facet:
+            lines.append("      vertex %r %r %r" % tuple(float(v) for v in numpy.float32(vertex)))
+        lines.append("    endloop")
+        lines.append("  endfacet")
+
+    lines.append("endsolid %s" % name)
+
+    return "\n".join(lines) + "\n"
+
+
+def write_ascii_stl(path, *solids):
+    """
+    :param solids: Facets of each solid in the file
+    """
+    with open(path, "w") as f:
+        f.write("".join(ascii_solid(facets, "part%d" % i) for i, facets in enumerate(solids)))
+
+    return str(path)
+
+
+def model_of(facets):
+    """
+    :return: Instance of model.Model with the facets, welded like a model loaded from a file
+    """
+    facets = numpy.asarray(facets, numpy.float32)
+    facet_normals = numpy.repeat(normals(facets).astype(numpy.float32), 3, axis=0)
+    vertices, normals_, indices = model.weld_vertices(facets.reshape((-1, 3)), facet_normals)
+
+    bb = model.BoundingBox()
+    v_min = vertices.min(axis=0).tolist()
+    v_max = vertices.max(axis=0).tolist()
+    bb.set_boundaries(v_min[0], v_max[0], v_min[1], v_max[1], v_min[2], v_max[2])
+
+    return model.Model(vertices, normals_, indices, bb, len(facets))
+
+
+def cone(radius=10.0, height=10.0, segments=64):
+    """
+    :return: Facets of a cone standing on the xy plane with its tip at the top
+    """
+    angles = numpy.linspace(0, 2 * numpy.pi, segments, endpoint=False)
+    ring = numpy.column_stack((radius * numpy.cos(angles), radius * numpy.sin(angles), numpy.zeros(segments)))
+    tip = numpy.array([0.0, 0.0, height])
+    center = numpy.zeros(3)
+
+    facets = []
+    for i in range(segments):
+        a, b = ring[i], ring[(i + 1) % segments]
+        facets.append([a, b, tip])
+        facets.append([center, b, a])
+
+    return numpy.array(facets)
+
+
+def sphere(radius=10.0, rings=24, segments=48):
+    """
+    :return: Facets of a sphere resting on the xy plane, counterclockwise seen from outside
+    """
+    theta = numpy.linspace(0, numpy.pi, rings + 1)[:, numpy.newaxis]
+    phi = numpy.linspace(0, 2 * numpy.pi, segments, endpoint=False)
+    points = numpy.stack((radius * numpy.sin(theta) * numpy.cos(phi),
+                          radius * numpy.sin(theta) * numpy.sin(phi),
+                          numpy.broadcast_to(radius - radius * numpy.cos(theta), (rings + 1, segments))), axis=-1)
+
+    facets = []
+    for i in range(rings):
+        for j in range(segments):
+            a, b = points[i, j], points[i, (j + 1) % segments]
+            c, d = points[i + 1, j], points[i + 1, (j + 1) % segments]
+
+            # The first and last ring are the poles
+            if i > 0:
+                facets.append([a, b, c])
+            if i < rings - 1:
+                facets.append([b, d, c])
+
+    return numpy.array(facets)
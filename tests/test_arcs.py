@@ -0,0 +1,180 @@
+import math
+
+import numpy
+import pytest
+
+from slicer import arcs
+from slicer.arcs import MAX_ARC_ANGLE, MIN_ARC_SEGMENTS, fit_arcs
+from slicer.paths import Paths
+
+PRECISION = 1000.0
+TOLERANCE = 0.02 * PRECISION
+PREVIEW_TOLERANCE = 0.02 * PRECISION
+
+
+def circle(radius, count, center=(0.0, 0.0), start=0.0, sweep=2 * math.pi, endpoint=False):
+    angles = start + numpy.linspace(0.0, sweep, count, endpoint=endpoint)
+    return numpy.column_stack((center[0] + radius * numpy.cos(angles), center[1] + radius * numpy.sin(angles)))
+
+
+def rounded_rectangle(width, height, radius, corner_points):
+    corners = [(width - radius, radius), (width - radius, height - radius), (radius, height - radius), (radius, radius)]
+    # Each corner is a quarter circle, the straight edges connect them
+    return numpy.concatenate([circle(radius, corner_points, center, (i - 1) * math.pi / 2, math.pi / 2, True)
+                              for i, center in enumerate(corners)])
+
+
+def fit(points):
+    path = numpy.rint(numpy.asarray(points) * PRECISION).astype(numpy.int32)
+    paths = Paths.from_pyclipper([path.tolist()])
+
+    return paths, fit_arcs(paths, TOLERANCE, PREVIEW_TOLERANCE)
+
+
+def polyline_length(paths):
+    path = paths[0].astype(numpy.float64)
+    return numpy.sum(numpy.hypot(*numpy.diff(numpy.concatenate((path, path[:1])), axis=0).T))
+
+
+def max_deviation(paths, arcs):
+    """
+    :return: Maximum distance of the points of paths from the segments of arcs
+    """
+    result = 0.0
+    starts = arcs.coords[arcs.segment_starts()].astype(numpy.float64)
+    sweeps = arcs.sweeps()
+
+    for point in paths.coords.astype(numpy.float64):
+        distances = []
+        for start, end, center, direction, sweep in zip(starts, arcs.coords, arcs.centers, arcs.directions, sweeps):
+            if direction:
+                # Distance from the circle if the point lies within the sweep of the arc, else from the ends
+                radius = numpy.hypot(*(start - center))
+                a = math.atan2(*(start - center)[::-1])
+                b = math.atan2(*(point - center)[::-1])
+                within = numpy.mod((b - a) * direction, 2 * math.pi) <= abs(sweep) + 1e-9
+                if within:
+                    distances.append(abs(numpy.hypot(*(point - center)) - radius))
+                    continue
+
+            d = end - start
+            t = numpy.clip(numpy.dot(point - start, d) / max(numpy.dot(d, d), 1e-9), 0, 1)
+            distances.append(numpy.hypot(*(start + t * d - point)))
+
+        result = max(result, min(distances))
+
+    return result
+
+
+def longest_arc_one_by_one(points, first, end):
+    """
+    :return: Last point of the longest arc starting at point first, found by doubling and bisecting with
+             one candidate end point at a time, or None if no arc fits
+    """
+    def fits(last):
+        return bool(arcs._fit_arcs(points, first, numpy.array([last]), TOLERANCE)[0][0])
+
+    length = MIN_ARC_SEGMENTS
+    if first + length > end or not fits(first + length):
+        return None
+
+    while first + 2 * length <= end and fits(first + 2 * length):
+        length *= 2
+
+    low, high = first + length, min(first + 2 * length, end + 1)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle
+
+    return low
+
+
+@pytest.mark.parametrize("radius, count", [(10.0, 64), (100.0, 2000), (0.5, 16)])
+def test_circle(radius, count):
+    paths, arcs = fit(circle(radius, count))
+
+    # Arcs span at most half a circle
+    assert len(arcs.coords) == math.ceil(2 * math.pi / MAX_ARC_ANGLE)
+    assert numpy.all(arcs.directions == 1)
+    assert numpy.allclose(numpy.hypot(*arcs.centers.T), 0, atol=TOLERANCE)
+    assert max_deviation(paths, arcs) <= TOLERANCE
+    assert numpy.sum(arcs.segment_lengths()) == pytest.approx(2 * math.pi * radius * PRECISION, rel=1e-3)
+    # The polygon is inscribed into the circle, coarse polygons are noticeably shorter
+    assert numpy.sum(arcs.segment_lengths()) == pytest.approx(polyline_length(paths), rel=1e-2)
+
+
+def test_noisy_circle():
+    # Like offset perimeters: short segments, and points jittered within a fraction of the tolerance
+    rng = numpy.random.default_rng(1)
+    points = circle(50.0, 3000) + rng.uniform(-0.004, 0.004, (3000, 2))
+    paths, arcs = fit(points)
+
+    # Noise may end an arc early, but a few arcs cover all but a few segments
+    assert len(arcs.coords) <= 4
+    assert numpy.all(arcs.directions[arcs.directions != 0] == 1)
+    assert numpy.sum(arcs.segment_lengths()[arcs.directions == 0]) < 3 * 2 * math.pi * 50.0 * PRECISION / 3000
+    assert max_deviation(paths, arcs) <= TOLERANCE
+
+
+def test_clockwise_circle():
+    paths, arcs = fit(circle(10.0, 64)[::-1])
+
+    assert len(arcs.coords) == 2
+    assert numpy.all(arcs.directions == -1)
+
+
+def test_rounded_rectangle():
+    paths, arcs = fit(rounded_rectangle(30.0, 20.0, 3.0, 12))
+
+    # Four arcs connected by four straight edges
+    assert len(arcs.coords) == 8
+    assert numpy.count_nonzero(arcs.directions == 1) == 4
+    assert max_deviation(paths, arcs) <= TOLERANCE
+    assert numpy.sum(arcs.segment_lengths()) == pytest.approx(polyline_length(paths), rel=1e-3)
+
+
+def test_square_keeps_its_points():
+    points = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    paths, arcs = fit(points)
+
+    assert numpy.array_equal(arcs.coords, paths.coords)
+    assert not numpy.any(arcs.directions)
+    assert numpy.sum(arcs.segment_lengths()) == pytest.approx(40.0 * PRECISION)
+
+
+def test_subdivided_square_keeps_its_points():
+    edge = numpy.linspace(0.0, 10.0, 20, endpoint=False)
+    points = numpy.concatenate((numpy.column_stack((edge, numpy.zeros(20))),
+                                numpy.column_stack((numpy.full(20, 10.0), edge)),
+                                numpy.column_stack((10.0 - edge, numpy.full(20, 10.0))),
+                                numpy.column_stack((numpy.zeros(20), 10.0 - edge))))
+    paths, arcs = fit(points)
+
+    assert not numpy.any(arcs.directions)
+    assert numpy.sum(arcs.segment_lengths()) == pytest.approx(40.0 * PRECISION)
+
+
+def test_tessellation_is_within_preview_tolerance():
+    paths, arcs = fit(circle(10.0, 64))
+    tessellated = arcs.tessellate()
+
+    assert tessellated.node_count == arcs.node_count
+    assert numpy.all(numpy.abs(numpy.hypot(*tessellated.coords.T) - 10.0 * PRECISION) <= TOLERANCE)
+
+
+@pytest.mark.parametrize("points", [circle(10.0, 64), circle(100.0, 2000)[:1500],
+                                    rounded_rectangle(30.0, 20.0, 3.0, 12),
+                                    circle(50.0, 3000)[:500]
+                                    + numpy.random.default_rng(1).uniform(-0.004, 0.004, (500, 2))],
+                         ids=["circle", "large circle", "rounded rectangle", "noisy circle"])
+def test_batched_search_finds_same_arcs_as_bisection(points):
+    points = numpy.rint(points * PRECISION)
+    end = len(points) - 1
+
+    for first in range(0, end, 7):
+        arc = arcs._longest_arc(points, first, end, TOLERANCE)
+
+        assert (arc and arc[0]) == longest_arc_one_by_one(points, first, end)
@@ -0,0 +1,114 @@
+import io
+import re
+
+import numpy
+import pytest
+
+import meshes
+import slicer
+from slicer import gcode
+
+MOVE = re.compile(r"^G([0-3]) X(\S+) Y(\S+)(?: I(\S+) J(\S+))?(?: E(\S+))?(?: F\d+)?$")
+
+
+def sliced(cfg, facets):
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(facets)).slice()
+
+    with sliced_model:
+        sliced_model.create_perimeters()
+        sliced_model.create_infill()
+        sliced_model.order_paths()
+        if cfg.arc_fitting:
+            sliced_model.fit_arcs()
+
+    return sliced_model
+
+
+def write(cfg, sliced_model):
+    stream = io.StringIO()
+    assert gcode.GCodeWriter(cfg).write(sliced_model.layers, stream)
+
+    header, layers = stream.getvalue().split(";LAYER:", 1)
+
+    return header, layers
+
+
+def path_length(paths, closed):
+    if isinstance(paths, slicer.arcs.ArcPaths):
+        return paths.segment_lengths().sum() / slicer.SlicerConfig.VERTEX_PRECISION
+
+    length = 0.0
+    for path in paths:
+        if closed:
+            path = numpy.concatenate((path, path[:1]))
+        length += numpy.hypot(*numpy.diff(path, axis=0).T).sum()
+
+    return length / slicer.SlicerConfig.VERTEX_PRECISION
+
+
+def expected_extrusion(cfg, sliced_model):
+    writer = gcode.GCodeWriter(cfg)
+    total = 0.0
+
+    for layer in sliced_model.layers:
+        for perimeter_no, perimeter in enumerate(layer.perimeters):
+            width = cfg.extrusion_width_external_perimeter if perimeter_no == 0 else cfg.extrusion_width
+            total += path_length(perimeter, True) * writer.e_per_mm(width, layer.layer_height)
+
+        total += path_length(layer.infill, False) * writer.e_per_mm(cfg.extrusion_width_infill, layer.layer_height)
+
+    return total
+
+
+@pytest.mark.parametrize("arc_fitting", [False, True])
+def test_extrusion_matches_path_length(cfg, arc_fitting):
+    cfg.arc_fitting = arc_fitting
+    cfg.bed_center = (100.0, 80.0)
+    sliced_model = sliced(cfg, meshes.cylinder(10.0, 3.0, 64))
+    _, layers = write(cfg, sliced_model)
+
+    moves = [MOVE.match(line) for line in layers.splitlines()]
+    moves = [m.groups() for m in moves if m is not None]
+    extrusion = sum(float(e) for *_, e in moves if e is not None)
+
+    assert extrusion == pytest.approx(expected_extrusion(cfg, sliced_model), rel=1e-4)
+    assert any(g in ("2", "3") for g, *_ in moves) == arc_fitting
+
+    # The model is placed around the bed center
+    xy = numpy.array([(float(x), float(y)) for _, x, y, *_ in moves])
+    assert numpy.all(numpy.abs(xy - cfg.bed_center) <= 10.0 + 1e-3)
+    if not arc_fitting:
+        assert numpy.allclose(xy.min(axis=0), numpy.subtract(cfg.bed_center, 10.0), atol=0.5)
+
+
+def test_arc_centers_are_relative_to_the_start(cfg):
+    cfg.arc_fitting = True
+    cfg.bed_center = (100.0, 80.0)
+    _, layers = write(cfg, sliced(cfg, meshes.cylinder(10.0, 1.0, 64)))
+
+    previous = None
+    for line in layers.splitlines():
+        m = MOVE.match(line)
+        if m is None:
+            continue
+
+        g, x, y, i, j, _ = m.groups()
+        point = numpy.array([float(x), float(y)])
+
+        if g in ("2", "3"):
+            center = previous + (float(i), float(j))
+            assert numpy.linalg.norm(point - center) == pytest.approx(numpy.linalg.norm(previous - center), abs=0.01)
+            assert numpy.linalg.norm(center - cfg.bed_center) < 1.0
+
+        previous = point
+
+
+def test_header_heats_and_primes(cfg):
+    cfg.nozzle_temperature = 215
+    cfg.bed_temperature = 55
+    header, _ = write(cfg, sliced(cfg, meshes.box(10.0, 10.0, 1.0)))
+    lines = [line.split(";")[0].strip() for line in header.splitlines()]
+
+    assert lines.index("M140 S55") < lines.index("G28") < lines.index("M190 S55")
+    assert lines.index("M104 S215") < lines.index("G28") < lines.index("M109 S215")
+    assert lines.index("M109 S215") < [i for i, line in enumerate(lines) if " E" in line][0]
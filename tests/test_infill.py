@@ -0,0 +1,81 @@
+import numpy
+import pyclipper
+import pytest
+
+import meshes
+import slicer
+from slicer.infill import line_infill, link_lines
+from slicer.paths import Paths
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size]]
+
+
+# Outlines in slicer units, holes run clockwise
+OUTLINES = {
+    "c shape": [[[0, 0], [20000, 0], [20000, 5000], [5000, 5000], [5000, 15000], [20000, 15000],
+                 [20000, 20000], [0, 20000]]],
+    "comb": [[[0, 0], [25000, 0], [25000, 20000], [20000, 20000], [20000, 5000], [15000, 5000], [15000, 20000],
+              [10000, 20000], [10000, 5000], [5000, 5000], [5000, 20000], [0, 20000]]],
+    "islands": [square(0, 0, 10000), square(12000, 3000, 10000)],
+    "ring": [square(0, 0, 20000), square(6000, 6000, 8000)[::-1]],
+}
+
+
+def grown(outlines, delta):
+    pco = pyclipper.PyclipperOffset()
+    pco.AddPaths(outlines, pyclipper.JT_MITER, pyclipper.ET_CLOSEDPOLYGON)
+
+    return pco.Execute(delta)
+
+
+def within(point, outlines):
+    # Even-odd rule, points on an edge are within
+    results = [pyclipper.PointInPolygon(point, outline) for outline in outlines]
+
+    return -1 in results or results.count(1) % 2 == 1
+
+
+@pytest.mark.parametrize("name", OUTLINES)
+@pytest.mark.parametrize("layer_no", [0, 1])
+def test_links_stay_within_outlines(cfg, name, layer_no):
+    outlines = OUTLINES[name]
+    lines = line_infill(cfg, layer_no, outlines)
+    paths = link_lines(cfg, layer_no, lines, outlines)
+
+    # Lines were linked, and each line is part of exactly one path
+    assert len(paths) < len(lines)
+    assert sum(len(path) // 2 for path in paths) >= len(lines)
+
+    # Rounding of the line ends may place points a few units outside of the outlines
+    tolerance = grown(outlines, 5)
+    for path in paths:
+        for a, b in zip(path[:-1], path[1:]):
+            for t in numpy.linspace(0.0, 1.0, 9):
+                point = numpy.rint(a + (b - a) * t).astype(numpy.int64).tolist()
+                assert within(point, tolerance), (a, b)
+
+
+def test_open_node_count():
+    paths = Paths.from_pyclipper([[[0, 0], [1, 0], [1, 1]], [[5, 5], [6, 6]]])
+
+    assert paths.node_count == 5
+    assert paths.open_node_count == 3
+    assert Paths().open_node_count == 0
+
+
+def test_layer_node_count_matches_segments(cfg):
+    facets = numpy.concatenate((meshes.box(10.0, 10.0, 2.0), meshes.box(10.0, 10.0, 2.0, (15.0, 0.0, 0.0))))
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(facets)).slice()
+    sliced_model.create_perimeters()
+    sliced_model.create_infill()
+
+    layer = sliced_model.layers[0]
+    assert len(layer.infill) > 1
+
+    # Perimeters are closed, each point starts a segment, open infill paths have one segment less than points
+    segments = sum(perimeter.node_count for perimeter in layer.perimeters) + \
+        sum(len(path) - 1 for path in layer.infill)
+    assert layer.node_count == segments
+    assert sliced_model.node_count == sum(layer.node_count for layer in sliced_model.layers)
@@ -0,0 +1,71 @@
+import copy
+
+import numpy
+import pytest
+
+import meshes
+from slicer import layerheights
+from slicer.slicer import Slicer
+
+
+def adaptive_slicer(cfg, facets, min_layer_height=0.1, max_layer_height=0.3):
+    cfg = copy.copy(cfg)
+    cfg.adaptive_layer_height = True
+    cfg.min_layer_height = min_layer_height
+    cfg.max_layer_height = max_layer_height
+
+    return cfg, Slicer(cfg, meshes.model_of(facets))
+
+
+def check_bounds(cfg, s, min_layer_height):
+    height = s.model.dimensions.z
+    planes = s.planes / cfg.VERTEX_PRECISION
+
+    assert s.layer_heights[0] == cfg.first_layer_height
+    assert all(min_layer_height - 1e-9 <= h <= cfg.max_layer_height + 1e-9 for h in s.layer_heights[1:])
+    assert numpy.all(numpy.diff(planes) > 0)
+    assert numpy.allclose(numpy.diff(planes), s.layer_heights[1:])
+    # The last plane reaches the top, the one before stays below it
+    assert planes[-1] >= height
+    assert len(planes) == 1 or planes[-2] < height
+
+
+@pytest.mark.parametrize("facets", [meshes.box(10.0, 10.0, 7.0), meshes.cone(10.0, 6.0, 40), meshes.stepped_part()])
+def test_heights_within_bounds(cfg, facets):
+    cfg, s = adaptive_slicer(cfg, facets)
+
+    check_bounds(cfg, s, cfg.min_layer_height)
+
+
+def test_vertical_walls_get_max_height(cfg):
+    cfg, s = adaptive_slicer(cfg, meshes.cylinder(10.0, 6.0, 40))
+
+    assert s.layer_heights[1:-1] == [cfg.max_layer_height] * (len(s.layer_heights) - 2)
+
+
+def test_sloped_surfaces_get_thinner_layers(cfg):
+    cfg, s = adaptive_slicer(cfg, meshes.cone(10.0, 6.0, 40))
+
+    # The flank of the cone is shallower than the reference angle
+    assert max(s.layer_heights[1:]) < cfg.max_layer_height
+    assert len(s.layer_heights) > 6.0 / cfg.layer_height
+
+
+def test_min_height_is_limited(cfg):
+    # A flat cone with a small reference layer height constrains all layers to the minimum layer height
+    cfg.layer_height = 0.05
+    cfg, s = adaptive_slicer(cfg, meshes.cone(20.0, 2.0, 40), min_layer_height=0.0)
+
+    check_bounds(cfg, s, layerheights.ADAPTIVE_MIN_LAYER_HEIGHT)
+    assert min(s.layer_heights[1:]) == pytest.approx(layerheights.ADAPTIVE_MIN_LAYER_HEIGHT)
+
+
+def test_batches_give_identical_layers(cfg, monkeypatch):
+    cfg, s = adaptive_slicer(cfg, meshes.cone(10.0, 6.0, 40))
+    planes, heights = layerheights.adaptive_layers(cfg, s.triangles, s.model.dimensions.z)
+
+    monkeypatch.setattr(layerheights, "ADAPTIVE_BIN_BATCH_SIZE", 7)
+    batched_planes, batched_heights = layerheights.adaptive_layers(cfg, s.triangles, s.model.dimensions.z)
+
+    assert numpy.array_equal(batched_planes, planes)
+    assert batched_heights == heights
@@ -0,0 +1,261 @@
+import struct
+
+import numpy
+import pytest
+
+import meshes
+import model
+from model import StlFileParser, StlParserError, WeldMode
+
+
+def facets_of(m):
+    """
+    :return: Facets of a model sorted, so models can be compared independent of the vertex order
+    """
+    facets = numpy.asarray(m.vertices)[numpy.asarray(m.indices)].reshape(-1, 3, 3)
+
+    return facets[numpy.lexsort(facets.reshape(len(facets), -1).T[::-1])]
+
+
+@pytest.fixture
+def part():
+    return numpy.concatenate((meshes.box(10.0, 20.0, 30.0), meshes.cylinder(5.0, 10.0, 16, (30.0, 0.0))))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """
+    Splits ASCII files into chunks of a few facets
+    """
+    split_facets = StlFileParser._split_facets
+    monkeypatch.setattr(StlFileParser, "_split_facets",
+                        staticmethod(lambda data, start, end: split_facets(data, start, end, 1000)))
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_binary(tmp_path, part, use_mmap):
+    filename = meshes.write_binary_stl(tmp_path / "part.stl", part)
+
+    m = model.Model.from_file(filename, use_mmap=use_mmap)
+
+    assert m.facet_count == len(part)
+    numpy.testing.assert_array_equal(facets_of(m), facets_of(model.Model.from_file(filename)))
+    numpy.testing.assert_allclose(m.vertices[m.indices].reshape(-1, 3, 3), part, atol=1e-5)
+    assert m.dimensions == pytest.approx((35.0, 25.0, 30.0))
+    assert m.bounding_box.x_min == pytest.approx(0.0)
+    assert m.bounding_box.y_min == pytest.approx(-5.0)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_binary_truncated(tmp_path, part, use_mmap):
+    filename = meshes.write_binary_stl(tmp_path / "part.stl", part)
+    with open(filename, "r+b") as f:
+        f.truncate(model.STL_BINARY_HEADER_SIZE + 10 * model.STL_BINARY_FACET.itemsize + 7)
+
+    with pytest.raises(struct.error):
+        model.Model.from_file(filename, use_mmap=use_mmap)
+
+
+def test_missing_normals_are_calculated(tmp_path):
+    facets = meshes.box()
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", facets)
+
+    with open(filename, "r+b") as f:
+        data = numpy.frombuffer(bytearray(f.read()), model.STL_BINARY_FACET, offset=model.STL_BINARY_HEADER_SIZE)
+        data["normal"] = 0.0
+        f.seek(model.STL_BINARY_HEADER_SIZE)
+        f.write(data.tobytes())
+
+    m = model.Model.from_file(filename)
+
+    numpy.testing.assert_allclose(numpy.unique(numpy.abs(m.normals), axis=0),
+                                  [[0, 0, 1], [0, 1, 0], [1, 0, 0]], atol=1e-6)
+
+
+def test_calculated_normals_are_welded_with_double_precision(tmp_path):
+    facets = meshes.sphere()
+    filename = meshes.write_binary_stl(tmp_path / "sphere.stl", facets)
+
+    with open(filename, "r+b") as f:
+        data = numpy.frombuffer(bytearray(f.read()), model.STL_BINARY_FACET, offset=model.STL_BINARY_HEADER_SIZE)
+        data["normal"] = 0.0
+        f.seek(model.STL_BINARY_HEADER_SIZE)
+        f.write(data.tobytes())
+
+    m = model.Model.from_file(filename)
+
+    # Normals which only differ in double precision are not merged, as when the facets were parsed one by one
+    expected = {}
+    for facet, normal in zip(data["vertices"].tolist(), StlFileParser._calc_normals(data["vertices"]).tolist()):
+        for vertex in facet:
+            expected.setdefault((tuple(vertex), tuple(normal)), len(expected))
+
+    assert len(m.vertices) == len(expected) == 6624
+    numpy.testing.assert_allclose(m.vertices[m.indices].reshape(-1, 3, 3), data["vertices"])
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_ascii(tmp_path, part, small_chunks, processes):
+    binary = model.Model.from_file(meshes.write_binary_stl(tmp_path / "part.stl", part))
+    ascii_ = model.Model.from_file(meshes.write_ascii_stl(tmp_path / "part_ascii.stl", part), processes=processes)
+
+    assert ascii_.facet_count == binary.facet_count
+    numpy.testing.assert_array_equal(ascii_.vertices, binary.vertices)
+    numpy.testing.assert_array_equal(ascii_.indices, binary.indices)
+    numpy.testing.assert_allclose(ascii_.normals, binary.normals, atol=1e-6)
+
+
+def test_ascii_several_solids(tmp_path, part):
+    box = meshes.box(10.0, 20.0, 30.0)
+    cylinder = meshes.cylinder(5.0, 10.0, 16, (30.0, 0.0))
+
+    m = model.Model.from_file(meshes.write_ascii_stl(tmp_path / "assembly.stl", box, cylinder))
+    expected = model.Model.from_file(meshes.write_ascii_stl(tmp_path / "part.stl", part))
+
+    assert m.facet_count == len(part)
+    numpy.testing.assert_array_equal(facets_of(m), facets_of(expected))
+
+
+def test_ascii_without_endsolid(tmp_path, part):
+    filename = meshes.write_ascii_stl(tmp_path / "part.stl", part)
+    with open(filename) as f:
+        lines = f.read().splitlines()
+
+    with open(filename, "w") as f:
+        f.write("\n".join(lines[:-1]))
+
+    assert model.Model.from_file(filename).facet_count == len(part)
+
+
+def write_lines(path, lines):
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return str(path)
+
+
+def ascii_lines(facets, name="part"):
+    return meshes.ascii_solid(facets, name).splitlines()
+
+
+@pytest.mark.parametrize("line_no, replacement, msg", [
+    (3, "    outer lop", "Expected keyword 'loop'"),
+    (4, "      vertex 1.0 x 2.0", "Expected number after keyword 'vertex'"),
+    (9, "  facet normal 0 0", "Expected number after keyword 'normal'"),
+    (30, "  endfacet", "Expected keyword 'facet'"),
+])
+def test_ascii_error_line_numbers(tmp_path, small_chunks, line_no, replacement, msg):
+    lines = ascii_lines(meshes.box())
+    lines[line_no - 1] = replacement
+
+    with pytest.raises(StlParserError) as e:
+        model.Model.from_file(write_lines(tmp_path / "broken.stl", lines))
+
+    assert e.value.line_no == line_no
+    assert e.value.msg == msg
+
+
+def test_ascii_error_after_last_facet(tmp_path):
+    lines = ascii_lines(meshes.box())
+    lines.insert(-1, "  facet normal 0 0 1")
+
+    with pytest.raises(StlParserError) as e:
+        model.Model.from_file(write_lines(tmp_path / "broken.stl", lines))
+
+    # The facet ends at the line with keyword 'endsolid'
+    assert e.value.line_no == len(lines)
+    assert e.value.msg == "Unexpected end of file"
+
+
+def test_ascii_error_line_numbers_in_second_solid(tmp_path):
+    first = ascii_lines(meshes.box(), "first")
+    second = ascii_lines(meshes.box(origin=(20.0, 0.0, 0.0)), "second")
+    second[3] = "      vortex 20.0 0.0 0.0"
+
+    with pytest.raises(StlParserError) as e:
+        model.Model.from_file(write_lines(tmp_path / "broken.stl", first + second))
+
+    assert e.value.line_no == len(first) + 4
+    assert e.value.msg == "Expected keyword 'vertex'"
+
+
+def test_ascii_data_after_last_solid_is_ignored(tmp_path):
+    lines = ascii_lines(meshes.box()) + ["", "garbage"]
+
+    assert model.Model.from_file(write_lines(tmp_path / "part.stl", lines)).facet_count == 12
+
+
+def test_ascii_error_in_worker_process(tmp_path, small_chunks):
+    lines = ascii_lines(numpy.concatenate([meshes.box(origin=(i * 20.0, 0.0, 0.0)) for i in range(10)]))
+    line_no = 7 * 12 * 7 + 5
+    lines[line_no - 1] = "      vertex 1.0 2.0 z"
+
+    with pytest.raises(StlParserError) as e:
+        model.Model.from_file(write_lines(tmp_path / "broken.stl", lines), processes=3)
+
+    assert e.value.line_no == line_no
+
+
+def test_weld_vertex_normal(tmp_path):
+    m = model.Model.from_file(meshes.write_binary_stl(tmp_path / "box.stl", meshes.box()))
+
+    # Each corner of a box belongs to three sides with different normals
+    assert len(m.vertices) == 24
+    assert len(m.indices) == 36
+    assert len(numpy.unique(m.vertices, axis=0)) == 8
+
+
+def test_weld_position(tmp_path):
+    facets = meshes.box()
+    m = model.Model.from_file(meshes.write_binary_stl(tmp_path / "box.stl", facets), weld_mode=WeldMode.POSITION)
+
+    assert len(m.vertices) == 8
+    numpy.testing.assert_allclose(m.vertices[m.indices].reshape(-1, 3, 3), facets)
+
+
+def test_weld_keeps_order_of_first_occurrence():
+    vertices = numpy.array([[2, 0, 0], [1, 0, 0], [2, 0, 0], [0, 0, 0], [1, 0, 0]], numpy.float32)
+    normals = numpy.zeros_like(vertices)
+
+    v, n, i = model.weld_vertices(vertices, normals)
+
+    numpy.testing.assert_array_equal(v, [[2, 0, 0], [1, 0, 0], [0, 0, 0]])
+    numpy.testing.assert_array_equal(i, [0, 1, 0, 2, 1])
+    assert i.dtype == numpy.uint32
+
+
+def test_weld_negative_zero():
+    vertices = numpy.array([[0.0, 1, 1], [-0.0, 1, 1]], numpy.float32)
+
+    v, n, i = model.weld_vertices(vertices, numpy.zeros_like(vertices))
+
+    assert len(v) == 1
+
+
+def test_weld_tolerance():
+    vertices = numpy.array([[1.0, 1, 1], [1.0004, 1, 1], [1.01, 1, 1]], numpy.float32)
+    normals = numpy.zeros_like(vertices)
+
+    assert len(model.weld_vertices(vertices, normals)[0]) == 3
+    assert len(model.weld_vertices(vertices, normals, tolerance=0.001)[0]) == 2
+
+
+def test_weld_normals_are_kept_apart():
+    vertices = numpy.array([[1, 1, 1], [1, 1, 1]], numpy.float32)
+    normals = numpy.array([[0, 0, 1], [0, 1, 0]], numpy.float32)
+
+    assert len(model.weld_vertices(vertices, normals, WeldMode.VERTEX_NORMAL)[0]) == 2
+    assert len(model.weld_vertices(vertices, normals, WeldMode.POSITION)[0]) == 1
+
+
+@pytest.mark.parametrize("weld_mode", list(WeldMode))
+def test_weld_in_partitions(tmp_path, part, monkeypatch, weld_mode):
+    filename = meshes.write_binary_stl(tmp_path / "part.stl", part)
+    expected = model.Model.from_file(filename, weld_mode=weld_mode)
+
+    monkeypatch.setattr(model, "WELD_PARTITION_SIZE", 10)
+    m = model.Model.from_file(filename, use_mmap=True, weld_mode=weld_mode)
+
+    numpy.testing.assert_array_equal(m.vertices, expected.vertices)
+    numpy.testing.assert_array_equal(m.normals, expected.normals)
+    numpy.testing.assert_array_equal(m.indices, expected.indices)
@@ -0,0 +1,120 @@
+import os
+
+import numpy
+
+import meshes
+import model
+from modelcache import ModelCache
+
+
+def entries(folder):
+    return sorted(entry.name for entry in os.scandir(folder) if not entry.name.startswith("."))
+
+
+def test_round_trip(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box(10.0, 20.0, 30.0))
+    cache = ModelCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    parsed = cache.load(filename)
+    cached = cache.load(filename)
+
+    assert len(entries(cache.path_to_folder)) == 1
+    assert isinstance(cached.vertices, numpy.memmap)
+
+    for name in ModelCache.ARRAYS:
+        numpy.testing.assert_array_equal(getattr(cached, name), getattr(parsed, name))
+
+    assert cached.facet_count == parsed.facet_count == 12
+    assert cached.dimensions == parsed.dimensions == (10.0, 20.0, 30.0)
+
+
+def test_options_are_part_of_key(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box())
+    cache = ModelCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    by_vertex_normal = cache.load(filename)
+    by_position = cache.load(filename, weld_mode=model.WeldMode.POSITION)
+    cache.load(filename, use_mmap=True)
+
+    assert len(entries(cache.path_to_folder)) == 2
+    assert len(by_position.vertices) == 8 < len(by_vertex_normal.vertices)
+
+
+def test_corrupt_entry_is_repaired(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box())
+    cache = ModelCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    expected = cache.load(filename)
+    (key,) = entries(cache.path_to_folder)
+    path = os.path.join(cache.path_to_folder, key)
+
+    # Truncated array, as left by an interrupted write
+    with open(os.path.join(path, "vertices.npy"), "r+b") as f:
+        f.truncate(100)
+
+    repaired = cache.load(filename)
+    numpy.testing.assert_array_equal(repaired.vertices, expected.vertices)
+
+    # The entry itself has been replaced, so it is read from the cache again
+    assert entries(cache.path_to_folder) == [key]
+    assert isinstance(cache.load(filename).vertices, numpy.memmap)
+
+
+def test_partial_entry_is_repaired(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box())
+    cache = ModelCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    cache.load(filename)
+    (key,) = entries(cache.path_to_folder)
+    os.remove(os.path.join(cache.path_to_folder, key, ModelCache.INFO_FILE_NAME))
+
+    cache.load(filename)
+
+    assert os.path.exists(os.path.join(cache.path_to_folder, key, ModelCache.INFO_FILE_NAME))
+    assert isinstance(cache.load(filename).vertices, numpy.memmap)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    filenames = [meshes.write_binary_stl(tmp_path / ("box%d.stl" % i), meshes.box(i + 1.0))
+                 for i in range(3)]
+    folder = str(tmp_path / "cache")
+
+    ModelCache(folder, 1024 * 1024).load(filenames[0])
+    (first,) = entries(folder)
+    entry_size = sum(f.stat().st_size for f in os.scandir(os.path.join(folder, first)))
+
+    # Room for two entries
+    cache = ModelCache(folder, int(2.5 * entry_size))
+    cache.load(filenames[1])
+    os.utime(os.path.join(folder, first), (0, 0))
+    cache.load(filenames[2])
+
+    remaining = entries(folder)
+    assert len(remaining) == 2
+    assert first not in remaining
+
+
+def test_entry_being_written_is_not_evicted(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box())
+    folder = str(tmp_path / "cache")
+
+    # Folder of another instance which has not renamed its entry yet
+    writing = os.path.join(folder, ModelCache.TMP_PREFIX + "other")
+    os.makedirs(writing)
+    with open(os.path.join(writing, "vertices.npy"), "wb") as f:
+        f.write(bytes(1024 * 1024))
+
+    cache = ModelCache(folder, 1024)
+    cache.load(filename)
+
+    assert os.path.exists(os.path.join(writing, "vertices.npy"))
+
+
+def test_clear(tmp_path):
+    filename = meshes.write_binary_stl(tmp_path / "box.stl", meshes.box())
+    cache = ModelCache(str(tmp_path / "cache"), 1024 * 1024)
+    cache.load(filename)
+
+    cache.clear()
+
+    assert not os.path.exists(cache.path_to_folder)
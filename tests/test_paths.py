@@ -0,0 +1,46 @@
+import numpy
+
+from slicer.paths import Paths
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10]]
+TRIANGLE = [[20, 0], [30, 0], [25, 5]]
+
+
+def test_from_pyclipper_round_trip():
+    paths = Paths.from_pyclipper([SQUARE, TRIANGLE])
+
+    assert len(paths) == 2
+    assert paths.coords.dtype == numpy.int32
+    assert paths.offsets.tolist() == [0, 4, 7]
+    assert [path.tolist() for path in paths] == [SQUARE, TRIANGLE]
+    assert paths[1].tolist() == TRIANGLE
+    assert Paths.from_pyclipper(paths) is paths
+
+
+def test_empty_paths():
+    for paths in [Paths(), Paths.from_pyclipper([]), Paths.from_pyclipper([[]])]:
+        assert paths.node_count == 0
+        assert paths.coords.shape == (0, 2)
+        assert [path.tolist() for path in paths] == [[]] * len(paths)
+
+    assert len(Paths.from_pyclipper([])) == 0
+    assert len(Paths.from_pyclipper([[]])) == 1
+
+
+def test_from_array():
+    array = numpy.array([[[0, 0], [10, 0]], [[0, 5], [10, 5]], [[0, 10], [10, 10]]], numpy.int64)
+    paths = Paths.from_array(array)
+
+    assert len(paths) == 3
+    assert paths.coords.dtype == numpy.int32
+    assert paths.offsets.tolist() == [0, 2, 4, 6]
+    assert [path.tolist() for path in paths] == array.tolist()
+
+
+def test_counts():
+    paths = Paths.from_pyclipper([SQUARE, TRIANGLE])
+
+    assert paths.lengths.tolist() == [4, 3]
+    assert paths.node_count == 7
+    assert paths.open_node_count == 5
+    assert paths.tessellate() is paths
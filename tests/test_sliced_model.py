@@ -0,0 +1,175 @@
+import copy
+
+import numpy
+import pyclipper
+import pytest
+
+import meshes
+import slicer
+from slicer.ordering import travel_distance
+from slicer import sliced_model as sliced_model_module
+from slicer.sliced_model import SlicedModel, create_perimeters, fit_layer_arcs, infill_inset, inset_outlines
+
+
+def process(cfg, facets):
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(facets)).slice()
+
+    with sliced_model:
+        sliced_model.create_perimeters()
+        sliced_model.create_infill()
+        sliced_model.order_paths()
+        sliced_model.fit_arcs()
+
+    return sliced_model
+
+
+def geometry(sliced_model):
+    return [(layer.layer_no, layer.z, layer.node_count, layer.travel_saved,
+             [(p.coords.tolist(), p.offsets.tolist()) for p in layer.perimeters],
+             (layer.infill.coords.tolist(), layer.infill.offsets.tolist()))
+            for layer in sliced_model.layers]
+
+
+@pytest.mark.parametrize("facets", [meshes.cylinder(10.0, 3.0, 48), meshes.stepped_part()],
+                         ids=["cylinder", "stepped part"])
+def test_worker_processes_give_same_result(cfg, facets, monkeypatch):
+    monkeypatch.setattr(slicer.Slicer, "PARALLEL_MIN_FACETS", 0)
+    cfg.arc_fitting = True
+    expected = process(cfg, facets)
+
+    cfg_parallel = copy.copy(cfg)
+    cfg_parallel.processes = 3
+    sliced_model = process(cfg_parallel, facets)
+
+    assert sliced_model.executor is None
+    assert geometry(sliced_model) == geometry(expected)
+
+
+def test_identical_layers_share_their_paths(cfg):
+    sliced_model = process(cfg, meshes.box(10.0, 10.0, 5.0))
+    middle = sliced_model.layers[5:-5]
+
+    assert len(middle) > 2
+    assert all(layer.perimeters is middle[0].perimeters for layer in middle)
+    assert all(layer.infill.node_count == 0 for layer in middle)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_arguments_are_consumed_while_results_are_produced(cfg, processes):
+    cfg.processes = processes
+    consumed = []
+
+    def args():
+        for i in range(200):
+            consumed.append(i)
+            yield [],
+
+    with SlicedModel(cfg, None, []) as sliced_model:
+        results = sliced_model._map(fit_layer_arcs, args())
+
+        assert next(results) == []
+        assert len(consumed) <= SlicedModel.LAYER_CHUNK_SIZE * (processes * SlicedModel.CHUNKS_PER_PROCESS + 1)
+
+        assert sum(1 for _ in results) == 199
+        assert len(consumed) == 200
+
+
+def test_perimeters_and_regions_share_offset(cfg, monkeypatch):
+    layer = slicer.Slicer(cfg, meshes.model_of(meshes.stepped_part())).slice().layers[3]
+    offset_outlines = sliced_model_module.offset_outlines
+    offsets = []
+
+    monkeypatch.setattr(sliced_model_module, "offset_outlines",
+                        lambda cfg, layer_height, outlines, nr: offsets.append(nr) or
+                        offset_outlines(cfg, layer_height, outlines, nr))
+
+    perimeters, regions = create_perimeters(cfg, layer.layer_height, layer.outlines)
+
+    assert len(perimeters) == cfg.perimeters
+    assert offsets == list(range(1, cfg.perimeters + 1))
+
+    expected = inset_outlines(cfg, layer.layer_height, layer.outlines, cfg.perimeters, infill_inset(cfg))
+    assert regions.coords.tolist() == expected.coords.tolist()
+
+
+def layer_travel(layer, position):
+    total = 0.0
+    for paths, closed in [(perimeter, True) for perimeter in layer.perimeters] + [(layer.infill, False)]:
+        travel, position = travel_distance(paths, position, closed)
+        total += travel
+
+    return total
+
+
+def islands():
+    # Pillars of different heights, placed so that the sliced order is not the shortest one
+    centers = [(20.0, 20.0), (-20.0, -20.0), (20.0, -20.0), (-20.0, 20.0), (0.0, 0.0)]
+    return numpy.concatenate([meshes.cylinder(4.0, 2.0 + i, 24, center) for i, center in enumerate(centers)])
+
+
+@pytest.mark.parametrize("two_opt", [False, True])
+def test_order_paths_never_increases_travel(cfg, two_opt):
+    cfg.two_opt = two_opt
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(islands())).slice()
+    sliced_model.create_perimeters()
+    sliced_model.create_infill()
+
+    corner = numpy.array([-24.0, -24.0]) * cfg.VERTEX_PRECISION
+    before = [layer_travel(layer, corner) for layer in sliced_model.layers]
+
+    travel_saved = sliced_model.order_paths()
+    after = [layer_travel(layer, corner) for layer in sliced_model.layers]
+
+    assert all(a <= b + 1e-6 for a, b in zip(after, before))
+    assert travel_saved == pytest.approx((sum(before) - sum(after)) / cfg.VERTEX_PRECISION)
+    assert travel_saved > 0
+
+
+def test_order_paths_starts_at_front_left_corner(cfg):
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(islands())).slice()
+    sliced_model.create_perimeters()
+    sliced_model.order_paths()
+
+    corner = numpy.array([-24.0, -24.0]) * cfg.VERTEX_PRECISION
+    for layer in sliced_model.layers:
+        outer = layer.perimeters[0]
+        distances = numpy.hypot(*(outer.coords - corner).T)
+
+        assert distances[0] == pytest.approx(distances.min())
+
+
+def solid_at(layer, x, y):
+    point = [int(x * slicer.SlicerConfig.VERTEX_PRECISION), int(y * slicer.SlicerConfig.VERTEX_PRECISION)]
+    results = [pyclipper.PointInPolygon(point, path) for path in layer.solid_regions]
+
+    return results.count(1) % 2 == 1
+
+
+@pytest.mark.parametrize("top_layers, bottom_layers", [(4, 4), (2, 3), (0, 1)])
+def test_solid_regions_of_stepped_part(cfg, top_layers, bottom_layers):
+    cfg.top_layers = top_layers
+    cfg.bottom_layers = bottom_layers
+    sliced_model = slicer.Slicer(cfg, meshes.model_of(meshes.stepped_part())).slice()
+    sliced_model.create_perimeters()
+    sliced_model.detect_solid_regions()
+
+    layers = sliced_model.layers
+    # The base ends at z = 4 mm, which is the top of layer 19
+    base_top = [layer.layer_no for layer in layers if layer.z == 4000][0]
+
+    bottom = set(range(bottom_layers))
+    below_step = set(range(base_top + 1 - top_layers, base_top + 1))
+    top = set(range(len(layers) - top_layers, len(layers)))
+
+    assert {layer.layer_no for layer in layers if layer.solid_regions} == bottom | below_step | top
+
+    for layer in layers:
+        if layer.layer_no in bottom or layer.layer_no in top:
+            # Entirely solid
+            assert solid_at(layer, 0.0, 0.0)
+            assert solid_at(layer, -3.0, 3.0)
+        elif layer.layer_no in below_step:
+            # Solid around the block only, the block covers the center
+            assert solid_at(layer, -8.0, -8.0)
+            assert solid_at(layer, 8.0, 0.0)
+            assert not solid_at(layer, 0.0, 0.0)
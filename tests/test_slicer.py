@@ -0,0 +1,251 @@
+import collections
+import copy
+import pickle
+
+import numpy
+import pytest
+
+import meshes
+import slicer
+from benchmark import contour_signature
+from slicer.config import SlicingEngine
+from slicer.parallel import SharedArrays
+from slicer import slicer as slicer_module
+from slicer.paths import Paths
+from slicer.slicer import Contour, Slicer, merge_band, slice_band
+from slicer.sliced_model import merge_contour
+
+
+@pytest.fixture(params=["cylinder", "stepped part", "cone"])
+def part(request):
+    facets = {"cylinder": lambda: meshes.cylinder(10.0, 5.0, 40),
+              "stepped part": meshes.stepped_part,
+              "cone": lambda: meshes.cone(10.0, 6.0, 40)}[request.param]()
+
+    return meshes.model_of(facets)
+
+
+def signature_of(cfg, m, engine, processes=1):
+    cfg = copy.copy(cfg)
+    cfg.slicing_engine = engine
+    cfg.processes = processes
+    s = Slicer(cfg, m)
+
+    if processes > 1:
+        executor = slicer.create_executor(cfg)
+        try:
+            return contour_signature(s.slice_contours(executor))
+        finally:
+            executor.shutdown()
+
+    return contour_signature(s.slice_contours())
+
+
+def test_engines_give_identical_contours(cfg, part):
+    expected = signature_of(cfg, part, SlicingEngine.PLANE_BATCH)
+
+    assert len(expected) > 10
+    assert all(len(contour) > 0 for contour in expected)
+
+    assert signature_of(cfg, part, SlicingEngine.SWEEP_PLANE) == expected
+    assert signature_of(cfg, part, SlicingEngine.PLANE_BATCH, processes=2) == expected
+    assert signature_of(cfg, part, SlicingEngine.SWEEP_PLANE, processes=2) == expected
+
+
+def test_layer_generator_gives_identical_contours(cfg, part):
+    s = Slicer(cfg, part)
+    expected = contour_signature(s.slice_contours())
+
+    assert contour_signature(s.layers(batch_size=3)) == expected
+    assert contour_signature(s.slice_layers(5, 9)) == expected[5:9]
+
+
+def test_reslicing_reuses_preprocessed_model(cfg, part, monkeypatch):
+    Slicer(cfg, part).slice_contours()
+
+    preprocess = slicer_module.preprocess
+    calls = []
+    monkeypatch.setattr(slicer_module, "preprocess", lambda *args: calls.append(args) or preprocess(*args))
+
+    cfg.layer_height = 0.15
+    s = Slicer(cfg, part)
+    contours = contour_signature(s.slice_contours())
+
+    assert calls == []
+    assert s.triangles is list(part.cache.values())[0].triangles
+
+    part.cache.clear()
+    assert contour_signature(Slicer(cfg, part).slice_contours()) == contours
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("engine", list(SlicingEngine))
+def test_band_uses_engine(cfg, part, engine, monkeypatch):
+    s = Slicer(cfg, part)
+    expected = contour_signature(s.slice_contours())
+    used = []
+
+    for name in ("slice_planes", "sweep_planes"):
+        original = getattr(slicer.slicer, name)
+        monkeypatch.setattr(slicer.slicer, name,
+                            lambda *args, name=name, original=original: used.append(name) or original(*args))
+
+    with SharedArrays(s.triangles.arrays()) as shared_triangles:
+        # As passed to a worker process
+        worker_triangles = pickle.loads(pickle.dumps(shared_triangles))
+        contours = slice_band(worker_triangles, s.planes[4:12], s.layer_heights[4:12], engine)
+
+    assert used == ["sweep_planes" if engine == SlicingEngine.SWEEP_PLANE else "slice_planes"]
+    assert contour_signature(contours) == expected[4:12]
+    assert [contour.z for contour in contours] == s.planes[4:12].tolist()
+
+
+def test_band_merges_contours(cfg, part):
+    s = Slicer(cfg, part)
+    expected = [merge_contour(cfg, contour) for contour in s.slice_layers(4, 12)]
+
+    with SharedArrays(s.triangles.arrays()) as shared_triangles:
+        worker_triangles = pickle.loads(pickle.dumps(shared_triangles))
+        layers = merge_band(cfg, worker_triangles, s.planes[4:12], s.layer_heights[4:12], cfg.slicing_engine)
+
+    assert [(z, height, outlines.coords.tolist(), outlines.offsets.tolist()) for z, height, outlines in layers] == \
+        [(z, height, outlines.coords.tolist(), outlines.offsets.tolist()) for z, height, outlines in expected]
+
+
+def test_slice_with_processes_keeps_executor(cfg, monkeypatch):
+    monkeypatch.setattr(Slicer, "PARALLEL_MIN_FACETS", 0)
+    cfg.processes = 2
+    cfg.slicing_engine = SlicingEngine.SWEEP_PLANE
+
+    with Slicer(cfg, meshes.model_of(meshes.box())).slice() as sliced_model:
+        assert sliced_model.executor is not None
+        assert sliced_model.layer_count == 50
+
+    assert sliced_model.executor is None
+
+
+def test_cancelled_slicing_with_processes(cfg, monkeypatch):
+    monkeypatch.setattr(Slicer, "PARALLEL_MIN_FACETS", 0)
+    cfg.processes = 2
+    updates = []
+
+    s = Slicer(cfg, meshes.model_of(meshes.box()), lambda progress, msg: updates.append(progress) or True)
+
+    assert s.slice() is None
+    assert s.cancelled
+    assert len(updates) == 1
+
+
+def test_small_model_is_sliced_without_processes(cfg):
+    cfg.processes = 2
+
+    sliced_model = Slicer(cfg, meshes.model_of(meshes.box())).slice()
+
+    assert sliced_model.executor is None
+    assert sliced_model.cfg.processes == 1
+    assert cfg.processes == 2
+
+
+def link_one_by_one(chunks):
+    """
+    Links intersections into loops one by one in the order they were added, like the assembler
+    which searched the open ends of all loops for each intersection
+
+    :param chunks: List of tuples (x, y, forward edges, backward edges) as passed to Contour.add()
+    :return: List of loops [[x1, y1], [x2, y2], ...]
+    """
+    loops = []
+
+    def join(loop, before):
+        for other in loops:
+            if other is loop:
+                continue
+
+            if before and other[-1][3] == loop[0][2]:
+                other.extend(loop)
+            elif not before and other[0][2] == loop[-1][3]:
+                other.extendleft(reversed(loop))
+            else:
+                continue
+
+            loops.remove(loop)
+            break
+
+    for intersection in zip(*(numpy.concatenate(a).tolist() for a in zip(*chunks))):
+        x, y, forward_edge, backward_edge = intersection
+
+        for loop in loops:
+            if backward_edge == loop[0][2]:
+                loop.appendleft(intersection)
+                join(loop, before=True)
+                break
+            elif forward_edge == loop[-1][3]:
+                loop.append(intersection)
+                join(loop, before=False)
+                break
+        else:
+            loops.append(collections.deque([intersection]))
+
+    return [[[x, y] for x, y, _, _ in loop] for loop in loops]
+
+
+@pytest.mark.parametrize("facets", [meshes.cylinder(10.0, 5.0, 40), meshes.stepped_part(), meshes.cone(10.0, 6.0, 40),
+                                    meshes.sphere(), numpy.concatenate((meshes.cylinder(5.0, 4.0, 48),
+                                                                        meshes.cylinder(5.0, 6.0, 48, (7.0, 0.0))))],
+                         ids=["cylinder", "stepped part", "cone", "sphere", "two cylinders"])
+def test_merged_outlines_match_linking_one_by_one(cfg, facets):
+    for contour in Slicer(cfg, meshes.model_of(facets)).slice_contours():
+        expected = Contour(contour.z, contour.height)
+        loops = link_one_by_one(contour.chunks)
+        expected.__setstate__((contour.z, contour.height, Paths.from_pyclipper(loops), numpy.ones(len(loops), bool)))
+
+        assert sorted(loop.tolist() for loop in contour) == sorted(loops)
+
+        merged, expected_merged = merge_contour(cfg, contour), merge_contour(cfg, expected)
+        if expected_merged is None:
+            assert merged is None
+        else:
+            assert merged[2].coords.tolist() == expected_merged[2].coords.tolist()
+            assert merged[2].offsets.tolist() == expected_merged[2].offsets.tolist()
+
+
+def test_closed_contours(cfg, part):
+    for contour in Slicer(cfg, part).slice_contours():
+        assert contour.closed.all()
+
+
+def test_box_contours(cfg):
+    contours = Slicer(cfg, meshes.model_of(meshes.box(10.0, 20.0, 5.0))).slice_contours()
+
+    assert len(contours) == 25
+
+    for contour in contours:
+        loop, = contour
+        # Each side of the box is split into two triangles
+        assert len(loop) == 8
+
+        for x, y in loop.tolist():
+            assert abs(x) == 5000 or abs(y) == 10000
+            assert abs(x) <= 5000 and abs(y) <= 10000
+
+
+def test_contour_links_intersections_by_edge_ids():
+    contour = Contour(200, 0.2)
+    # Square 0 -> 1 -> 2 -> 3 added in two chunks and out of order, an intersection on edge e
+    # enters its triangle through edge e - 1, the open chain on edges 21 -> 20 is not closed. The
+    # square starts at its intersection added last, which closes it.
+    contour.add(numpy.array([10, 0]), numpy.array([10, 0]), numpy.array([2, 0]), numpy.array([1, 3]))
+    contour.add(numpy.array([0, 7, 10]), numpy.array([10, 7, 0]), numpy.array([3, 21, 1]),
+                numpy.array([2, 20, 0]))
+    contour.add(numpy.array([8]), numpy.array([8]), numpy.array([20]), numpy.array([19]))
+
+    assert len(contour) == 2
+    assert [loop.tolist() for loop in contour] == [[[7, 7], [8, 8]], [[10, 0], [0, 0], [0, 10], [10, 10]]]
+    assert contour.closed.tolist() == [False, True]
+
+
+def test_uniform_layers(cfg):
+    s = Slicer(cfg, meshes.model_of(meshes.box(10.0, 10.0, 5.0)))
+
+    numpy.testing.assert_array_equal(s.planes, numpy.arange(200, 5001, 200))
+    assert s.layer_heights == [0.2] * 25
@@ -0,0 +1,67 @@
+import numpy
+
+import meshes
+from slicer.topology import EdgeTable
+
+
+def square():
+    """
+    :return: Tuple (vertices, indices) of a square of two faces sharing the diagonal from corner 0 to corner 2,
+             each face has its own vertices
+    """
+    corners = numpy.array([[0, 0, 0], [10, 0, 0], [10, 10, 0], [0, 10, 0]])
+    vertices = corners[[0, 1, 2, 0, 2, 3]]
+    indices = numpy.arange(6).reshape(2, 3)
+
+    return vertices, indices
+
+
+def test_adjacent_faces_share_edge():
+    edges = EdgeTable(*square())
+
+    assert len(edges) == 5
+    # Edge 2 of face 0 joins its corners 2 and 0, edge 0 of face 1 its corners 0 and 1
+    assert edges.face_edges[0, 2] == edges.face_edges[1, 0]
+    assert len(set(edges.face_edges.ravel().tolist())) == 5
+
+
+def test_edge_faces():
+    edges = EdgeTable(*square())
+    diagonal = edges.face_edges[0, 2]
+
+    assert sorted(edges.edge_faces[diagonal].tolist()) == [0, 1]
+
+    for face, k in [(0, 0), (0, 1), (1, 1), (1, 2)]:
+        assert edges.edge_faces[edges.face_edges[face, k]].tolist() == [face, -1]
+
+
+def test_vertices_at_same_position_are_merged():
+    vertices, indices = square()
+    edges = EdgeTable(vertices, indices)
+
+    # Both vertices of the diagonal appear twice, but are one position each
+    positions = numpy.unique(vertices, axis=0)
+    diagonal = positions[edges.vertices[edges.face_edges[0, 2]]]
+    assert sorted(diagonal.tolist()) == [[0, 0, 0], [10, 10, 0]]
+
+    assert edges.vertices.max() == len(positions) - 1
+    assert numpy.all(edges.vertices[:, 0] < edges.vertices[:, 1])
+
+
+def test_edge_between():
+    edges = EdgeTable(*square())
+    faces = numpy.array([0, 0, 1, 1])
+
+    result = edges.edge_between(faces, numpy.array([0, 2, 1, 0]), numpy.array([2, 1, 0, 2]))
+
+    assert result.tolist() == [edges.face_edges[0, 2], edges.face_edges[0, 1],
+                               edges.face_edges[1, 0], edges.face_edges[1, 2]]
+
+
+def test_closed_mesh_has_two_faces_at_each_edge():
+    facets = numpy.rint(meshes.box(10.0, 20.0, 30.0) * 1000).astype(numpy.int64)
+    edges = EdgeTable(facets.reshape(-1, 3), numpy.arange(facets.size // 3).reshape(-1, 3))
+
+    # 8 corners, 12 faces and by Euler's formula 18 edges
+    assert len(edges) == 18
+    assert numpy.all(edges.edge_faces >= 0)